@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import glob
+
+fixtures_directory = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+def get_fixture_paths(pattern=None):
+    """Returns the paths of the CONTRIBUTING files used by the benchmarks, sorted by size.
+
+    Args:
+        pattern: Optional glob pattern. By default, every fixture is returned.
+    """
+
+    paths = glob.glob(pattern or os.path.join(fixtures_directory, '*'))
+    paths = [path for path in paths if os.path.basename(path) != 'README.md']
+
+    return sorted(paths, key=os.path.getsize)
+
+def read_fixture(path):
+    with open(path, encoding='utf-8') as file:
+        return file.read()
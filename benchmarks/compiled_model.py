@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compares the compiled classifier against the reference pipeline.
+
+Checks that both produce the same predictions for every fixture, and
+reports the per-paragraph latency of each one and the load time and size
+of the saved compiled model against the three pickled artifacts.
+
+Example:
+    python -m benchmarks.compiled_model
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import numpy
+import pandas
+from scripts.get_contributing import escape_markdown_from_file
+from scripts.get_features import convert_paragraphs_into_features
+from scripts.classify_content import get_classification_model, get_compiled_classifier
+from scripts.compiled_model import CompiledClassifier
+from benchmarks.common import get_fixture_paths, read_fixture
+
+def predict_reference(paragraphs):
+    return get_classification_model().predict(convert_paragraphs_into_features(paragraphs))
+
+def measure(predict, paragraphs, repeat):
+    timings = []
+
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        predictions = predict(paragraphs)
+        timings.append(time.perf_counter() - start_time)
+
+    return predictions, numpy.median(timings)
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', help="glob of CONTRIBUTING files, each one classified as a request (default: benchmarks/fixtures)")
+    parser.add_argument('--repeat', type=int, default=5, help="number of measured runs per fixture")
+    arguments = parser.parse_args(arguments)
+
+    compiled_classifier = get_compiled_classifier()
+
+    with tempfile.TemporaryDirectory() as directory:
+        compiled_model_path = os.path.join(directory, 'compiled_model.npz')
+        compiled_classifier.save(compiled_model_path)
+
+        start_time = time.perf_counter()
+        CompiledClassifier.load(compiled_model_path)
+        compiled_load_time = time.perf_counter() - start_time
+        compiled_size = os.path.getsize(compiled_model_path)
+
+    start_time = time.perf_counter()
+    artifacts = ['resources/tf-idf.sav', 'resources/feature_selector.sav', 'resources/classification_model.sav']
+    for artifact in artifacts:
+        pandas.read_pickle(artifact)
+    reference_load_time = time.perf_counter() - start_time
+    reference_size = sum(os.path.getsize(artifact) for artifact in artifacts)
+
+    print('{:>10}: loaded in {:6.1f} ms, {:6.2f} MiB'.format('reference', reference_load_time * 1000, reference_size / 2 ** 20))
+    print('{:>10}: loaded in {:6.1f} ms, {:6.2f} MiB'.format('compiled', compiled_load_time * 1000, compiled_size / 2 ** 20))
+
+    for path in get_fixture_paths(arguments.fixtures):
+        paragraphs = escape_markdown_from_file(read_fixture(path)).splitlines()
+
+        reference_predictions, reference_time = measure(predict_reference, paragraphs, arguments.repeat)
+        compiled_predictions, compiled_time = measure(compiled_classifier.predict, paragraphs, arguments.repeat)
+
+        assert numpy.array_equal(reference_predictions, compiled_predictions)
+
+        print('{} ({} paragraphs): reference {:.3f} ms/paragraph, compiled {:.3f} ms/paragraph'.format(
+            os.path.basename(path), len(paragraphs),
+            reference_time * 1000 / len(paragraphs), compiled_time * 1000 / len(paragraphs)))
+
+if __name__ == '__main__':
+    main()
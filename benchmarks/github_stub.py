@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Local stand-in for the parts of GitHub used by the application.
+
+Serves the CONTRIBUTING files of a fixture directory through the same
+endpoints the application requests:
+
+    /api/repos/{owner}/{name}/community/profile
+    /api/repos/{owner}/{name}/contents/{path}
+    /raw/{owner}/{name}/HEAD/{path}
+
+Each file of the directory (e.g. benchmarks/fixtures/black.md) is the
+CONTRIBUTING file of the repository fixtures/{file name without extension}.
+Local copies of repositories (see scripts/local_repositories.py) are served
+as well, under their own owner and name. Repositories that are not found
+have a community profile without a CONTRIBUTING file.
+
+The server can add latency to every response, fail a share of the requests
+with a 5xx status, and enforce a rate limit per token on the API endpoints,
+with the same X-RateLimit headers as GitHub. Point the application to it with:
+
+    GITHUB_API_URL=http://localhost:8765/api GITHUB_RAW_URL=http://localhost:8765/raw
+
+Example:
+    python -m benchmarks.github_stub --port 8765 --latency 0.05 --rate-limit 5000
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks.common import fixtures_directory
+
+class GitHubStub:
+    def __init__(self, directory=fixtures_directory, latency=0.0, jitter=0.0, error_rate=0.0, error_status=502, rate_limit=None, window=3600):
+        """Creates a stand-in for GitHub serving the files of a directory.
+
+        Args:
+            directory: Directory with CONTRIBUTING files and local copies of repositories.
+            latency: Seconds added to every response.
+            jitter: Maximum number of seconds randomly added to the latency.
+            error_rate: Share of the requests answered with error_status.
+            error_status: HTTP status of the failed requests.
+            rate_limit: Number of API requests per token (or anonymous) in
+                each window, or None for no limit. Raw downloads are not charged.
+            window: Seconds until the rate limit is reset.
+        """
+
+        self.directory = directory
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.window = window
+        self.repositories = None # Found on first use (see get_repositories)
+        self.lock = threading.Lock()
+        self.quotas = {} # Authorization header -> (requests used, reset time)
+        self.counters = {'requests': 0, 'errors': 0, 'rate_limited': 0, 'not_found': 0}
+
+    def get_repositories(self):
+        with self.lock:
+            if self.repositories is None:
+                self.repositories = self.find_repositories()
+
+            return self.repositories
+
+    def find_repositories(self):
+        # Imported on first use, so the stub can be started before the
+        # application modules read GITHUB_API_URL and GITHUB_RAW_URL.
+        from scripts.local_repositories import find_local_repositories, read_local_contributing_file
+
+        # Repository (owner, name) -> (path of the CONTRIBUTING file, function that reads it)
+        repositories = {}
+
+        for entry in sorted(os.scandir(self.directory), key=lambda entry: entry.name):
+            name, extension = os.path.splitext(entry.name)
+
+            if entry.is_file() and extension in ('.md', '.rst', '.txt') and entry.name != 'README.md':
+                repositories[('fixtures', name.lower())] = ('CONTRIBUTING' + extension, lambda path=entry.path: open(path, encoding='utf-8').read())
+
+        for repository_name in find_local_repositories(self.directory):
+            owner, _, name = repository_name.rpartition('/')
+            repositories[((owner or 'local').lower(), name.lower())] = ('CONTRIBUTING.md', lambda repository_name=repository_name: read_local_contributing_file(self.directory, repository_name))
+
+        return repositories
+
+    def get_repository_urls(self):
+        return ['https://github.com/{}/{}'.format(owner, name) for owner, name in self.get_repositories()]
+
+    def charge(self, authorization):
+        """Uses one request of the quota of a token. Returns the rate limit headers, and whether the request is allowed."""
+
+        with self.lock:
+            used, reset = self.quotas.get(authorization, (0, time.time() + self.window))
+
+            if time.time() >= reset:
+                used, reset = 0, time.time() + self.window
+
+            allowed = used < self.rate_limit
+            used += allowed
+            self.quotas[authorization] = (used, reset)
+
+        headers = {'X-RateLimit-Limit': str(self.rate_limit),
+                   'X-RateLimit-Remaining': str(self.rate_limit - used),
+                   'X-RateLimit-Reset': str(int(reset))}
+
+        return headers, allowed
+
+    def handle(self, path, authorization, base_url):
+        """Answers a request.
+
+        Returns:
+            A tuple with the status, the headers and the body of the response.
+        """
+
+        with self.lock:
+            self.counters['requests'] += 1
+
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+
+        headers = {}
+
+        if path.startswith('/api/') and self.rate_limit is not None:
+            headers, allowed = self.charge(authorization)
+
+            if not allowed:
+                self.count('rate_limited')
+                return 403, headers, json.dumps({'message': 'API rate limit exceeded.'})
+
+        if random.random() < self.error_rate:
+            self.count('errors')
+            return self.error_status, headers, json.dumps({'message': 'Server Error'})
+
+        parts = path.strip('/').split('/')
+
+        if parts[:2] == ['api', 'repos'] and len(parts) == 6 and parts[4:] == ['community', 'profile']:
+            repository = self.get_repositories().get((parts[2].lower(), parts[3].lower()))
+
+            if repository is None:
+                return 200, headers, json.dumps({'health_percentage': 0, 'files': {'contributing': None}})
+
+            contents_url = '{}/api/repos/{}/{}/contents/{}'.format(base_url, parts[2], parts[3], repository[0])
+
+            return 200, headers, json.dumps({'health_percentage': 100, 'files': {'contributing': {'url': contents_url}}})
+
+        if parts[:2] == ['api', 'repos'] and len(parts) >= 6 and parts[4] == 'contents':
+            repository = self.get_repositories().get((parts[2].lower(), parts[3].lower()))
+            file_path = '/'.join(parts[5:])
+
+            if repository is not None and repository[0] == file_path:
+                download_url = '{}/raw/{}/{}/HEAD/{}'.format(base_url, parts[2], parts[3], file_path)
+                return 200, headers, json.dumps({'name': os.path.basename(file_path), 'path': file_path, 'download_url': download_url})
+
+        if parts[:1] == ['raw'] and len(parts) >= 5 and parts[3] == 'HEAD':
+            repository = self.get_repositories().get((parts[1].lower(), parts[2].lower()))
+
+            if repository is not None and repository[0] == '/'.join(parts[4:]):
+                return 200, headers, repository[1]()
+
+        self.count('not_found')
+
+        return 404, headers, json.dumps({'message': 'Not Found'})
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+def start_github_stub(stub, port=0, host='127.0.0.1'):
+    """Serves a stub in a background thread.
+
+    Returns:
+        The ThreadingHTTPServer, which can be stopped with its shutdown
+        method, and the base URL of the server.
+    """
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1' # Keeps the connections of the pooled session alive
+
+        def do_GET(self):
+            base_url = 'http://{}'.format(self.headers.get('Host'))
+            status, headers, body = stub.handle(self.path.split('?')[0], self.headers.get('Authorization'), base_url)
+            body = body.encode('utf-8')
+
+            self.send_response(status)
+
+            for name, value in headers.items():
+                self.send_header(name, value)
+
+            self.send_header('Content-Type', 'application/json' if self.path.startswith('/api/') else 'text/plain; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *arguments):
+            pass
+
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, 'http://{}:{}'.format(host, server.server_address[1])
+
+def add_stub_arguments(parser):
+    parser.add_argument('--directory', default=fixtures_directory, help="directory with the CONTRIBUTING files (default: benchmarks/fixtures)")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="maximum number of seconds randomly added to the latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of the requests that fail")
+    parser.add_argument('--error-status', type=int, default=502, help="HTTP status of the failed requests (default: 502)")
+    parser.add_argument('--rate-limit', type=int, help="API requests per token in each window (default: no limit)")
+    parser.add_argument('--window', type=float, default=3600, help="seconds until the rate limit is reset (default: 3600)")
+
+def create_stub(arguments):
+    return GitHubStub(arguments.directory, arguments.latency, arguments.jitter, arguments.error_rate,
+                      arguments.error_status, arguments.rate_limit, arguments.window)
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765, help="port of the server (default: 8765)")
+    add_stub_arguments(parser)
+    arguments = parser.parse_args(arguments)
+
+    stub = create_stub(arguments)
+    server, url = start_github_stub(stub, arguments.port)
+
+    print('Serving {} repositories at {}'.format(len(stub.get_repositories()), url))
+    print('GITHUB_API_URL={}/api GITHUB_RAW_URL={}/raw'.format(url, url))
+
+    try:
+        while True:
+            time.sleep(60)
+            print(json.dumps(stub.stats()), flush=True)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measures how long it takes to import the modules of the application.
+
+Each module is imported in a fresh interpreter, so nothing is shared
+between measurements. Besides the median import time, the benchmark lists
+the heavy dependencies (spaCy, NLTK, scikit-learn, Plotly) that were
+imported as a side effect, which should only happen on first use.
+
+Example:
+    python -m benchmarks.import_time --repeat 5
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+import numpy
+
+default_modules = ['scripts.get_features', 'scripts.classify_content', 'scripts.classify_repositories', 'classifier_section']
+heavy_modules = ['spacy', 'nltk', 'sklearn', 'plotly']
+
+measure_code = '''
+import sys, time, json
+start_time = time.perf_counter()
+import {module}
+elapsed_time = time.perf_counter() - start_time
+print(json.dumps([elapsed_time, [name for name in {heavy_modules!r} if name in sys.modules]]))
+'''
+
+def measure(module):
+    output = subprocess.run([sys.executable, '-c', measure_code.format(module=module, heavy_modules=heavy_modules)],
+                            check=True, capture_output=True, text=True).stdout
+
+    return json.loads(output.splitlines()[-1])
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('modules', nargs='*', default=default_modules, help="modules to import")
+    parser.add_argument('--repeat', type=int, default=3, help="number of measured imports per module")
+    arguments = parser.parse_args(arguments)
+
+    for module in arguments.modules:
+        measurements = [measure(module) for _ in range(arguments.repeat)]
+        import_time = numpy.median([elapsed_time for elapsed_time, _ in measurements])
+        imported_heavy_modules = measurements[-1][1]
+
+        print('{:>32}: {:7.1f} ms, heavy modules imported: {}'.format(module, import_time * 1000, ', '.join(imported_heavy_modules) or 'none'))
+
+if __name__ == '__main__':
+    main()
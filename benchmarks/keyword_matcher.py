@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compares the compiled keyword matcher against the spaCy entity ruler.
+
+Every CONTRIBUTING file is converted into paragraphs, and the heuristic
+features of all the paragraphs are created by both engines. The features
+must be the same: every paragraph that differs is printed, and the exit
+status is 1. The time spent by each engine (the best of the repetitions)
+is reported.
+
+Example:
+    python -m benchmarks.keyword_matcher --fixtures 'corpus/*.md'
+"""
+
+import sys
+import time
+import argparse
+import numpy
+from scripts.get_contributing import iter_paragraphs
+from scripts.get_features import get_heuristic_matcher, get_keyword_matcher, get_heuristic_ids
+from benchmarks.common import get_fixture_paths, read_fixture
+
+def create_spacy_features(paragraphs):
+    # Same as create_heuristic_features with CONTRIBUTING_HEURISTICS=spacy, without the sparse matrix.
+    heuristic_columns = {heuristic: column for column, heuristic in enumerate(get_heuristic_ids())}
+    features = numpy.zeros((len(paragraphs), len(heuristic_columns)), dtype=numpy.int64)
+
+    for row, doc in enumerate(get_heuristic_matcher().pipe(paragraphs, batch_size=256)):
+        for heuristic in doc.ents:
+            features[row, heuristic_columns[heuristic.ent_id_]] = 1
+
+    return features
+
+def measure(function, paragraphs, repeat):
+    elapsed_times = []
+
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = function(paragraphs)
+        elapsed_times.append(time.perf_counter() - start_time)
+
+    return result, min(elapsed_times)
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', help="glob of CONTRIBUTING files (default: benchmarks/fixtures)")
+    parser.add_argument('--segmentation', choices=['blocks', 'lines'], help="segmentation of the files (default: CONTRIBUTING_SEGMENTATION)")
+    parser.add_argument('--repeat', type=int, default=3, help="number of measured runs of each engine")
+    arguments = parser.parse_args(arguments)
+
+    paragraphs = [paragraph.text for path in get_fixture_paths(arguments.fixtures)
+                  for paragraph in iter_paragraphs(read_fixture(path), arguments.segmentation)]
+
+    # Builds both matchers before measuring.
+    get_keyword_matcher().transform(['Warm-up'])
+    create_spacy_features(['Warm-up'])
+
+    spacy_features, spacy_time = measure(create_spacy_features, paragraphs, arguments.repeat)
+    compiled_features, compiled_time = measure(lambda paragraphs: get_keyword_matcher().transform(paragraphs), paragraphs, arguments.repeat)
+
+    different_rows = numpy.flatnonzero((compiled_features.toarray() != spacy_features).any(axis=1))
+    heuristic_ids = numpy.array(get_heuristic_ids())
+
+    for row in different_rows:
+        print('different features: {!r}'.format(paragraphs[row][:100]))
+        print('  spacy:    {}'.format(', '.join(heuristic_ids[spacy_features[row] == 1])))
+        print('  compiled: {}'.format(', '.join(heuristic_ids[compiled_features[row].toarray()[0] == 1])))
+
+    print('{} paragraphs, {} heuristic features found, {} paragraphs with different features'.format(
+        len(paragraphs), int(spacy_features.sum()), len(different_rows)))
+    print('spacy entity ruler: {:8.1f} ms ({:.0f} paragraphs/s)'.format(spacy_time * 1000, len(paragraphs) / spacy_time))
+    print('keyword matcher:    {:8.1f} ms ({:.0f} paragraphs/s, {:.1f}x faster)'.format(
+        compiled_time * 1000, len(paragraphs) / compiled_time, spacy_time / compiled_time))
+
+    if len(different_rows):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Simulates concurrent users of the application against a local stand-in for GitHub.
+
+A GitHub stub (see benchmarks/github_stub.py) is started in the background,
+and the application is pointed to it with GITHUB_API_URL and GITHUB_RAW_URL,
+so no GitHub quota is used. Each user is a thread that analyzes random
+repositories of the fixtures one after the other, through the full path of
+a request: downloading the CONTRIBUTING file, classifying its paragraphs and
+counting the predictions per category.
+
+The latency percentiles (p50, p95, p99) of the successful analyses, the
+throughput and the failure rate are reported, with the number of requests
+the stub served, failed on purpose or rejected for the rate limit.
+
+The response, result and paragraph caches are disabled by default, so every
+analysis goes through the whole pipeline; use --caches to keep them.
+
+Example:
+    python -m benchmarks.load_test --users 16 --requests 20 --latency 0.05 --error-rate 0.01
+"""
+
+import os
+import time
+import random
+import argparse
+import threading
+import collections
+import numpy
+from benchmarks.github_stub import add_stub_arguments, create_stub, start_github_stub
+
+def simulate_user(repository_urls, n_requests, think_time, results, lock):
+    from scripts.get_contributing import download_contributing_file
+    from scripts.classify_content import classify_contributing_file
+    from classifier_section import count_predictions_per_class
+
+    for _ in range(n_requests):
+        repository_url = random.choice(repository_urls)
+        start_time = time.perf_counter()
+
+        try:
+            contributing_file = download_contributing_file(repository_url)
+            paragraphs, predictions = classify_contributing_file(contributing_file)
+            count_predictions_per_class(predictions, repository_url)
+            failure = None
+        except Exception as exception:
+            failure = '{}: {}'.format(type(exception).__name__, str(exception)[:80])
+
+        with lock:
+            results.append((time.perf_counter() - start_time, failure))
+
+        time.sleep(random.uniform(0, think_time))
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=8, help="number of concurrent users (default: 8)")
+    parser.add_argument('--requests', type=int, default=10, help="number of analyses made by each user (default: 10)")
+    parser.add_argument('--think-time', type=float, default=0.0, help="maximum number of seconds a user waits between analyses")
+    parser.add_argument('--caches', action='store_true', help="keep the response, result and paragraph caches enabled")
+    add_stub_arguments(parser)
+    arguments = parser.parse_args(arguments)
+
+    stub = create_stub(arguments)
+    server, url = start_github_stub(stub)
+
+    # The application modules read these variables when they are imported.
+    os.environ['GITHUB_API_URL'] = url + '/api'
+    os.environ['GITHUB_RAW_URL'] = url + '/raw'
+    # Raw downloads try the 6 usual locations of the file at once.
+    os.environ.setdefault('GITHUB_POOL_SIZE', str(max(10, 6 * arguments.users)))
+
+    if not arguments.caches:
+        os.environ['GITHUB_CACHE'] = ''
+        os.environ['CONTRIBUTING_RESULT_CACHE_SIZE'] = '0'
+        os.environ['CONTRIBUTING_PARAGRAPH_CACHE_SIZE'] = '0'
+
+    from scripts.classify_content import run_classification_model
+    from scripts.rate_limit import get_rate_limit_scheduler
+
+    # Loads the models before measuring.
+    run_classification_model(['Warm-up'])
+
+    repository_urls = stub.get_repository_urls()
+    results = []
+    lock = threading.Lock()
+    users = [threading.Thread(target=simulate_user, args=(repository_urls, arguments.requests, arguments.think_time, results, lock))
+             for _ in range(arguments.users)]
+
+    start_time = time.perf_counter()
+
+    for user in users:
+        user.start()
+
+    for user in users:
+        user.join()
+
+    elapsed_time = time.perf_counter() - start_time
+    server.shutdown()
+
+    latencies = numpy.array([latency for latency, failure in results if failure is None])
+    failures = collections.Counter(failure for _, failure in results if failure is not None)
+
+    print('{} users, {} analyses of {} repositories in {:.1f}s ({:.2f} analyses/sec)'.format(
+        arguments.users, len(results), len(repository_urls), elapsed_time, len(results) / elapsed_time))
+
+    if len(latencies):
+        p50, p95, p99 = numpy.percentile(latencies, [50, 95, 99]) * 1000
+        print('latency: p50 {:.1f} ms, p95 {:.1f} ms, p99 {:.1f} ms, max {:.1f} ms'.format(p50, p95, p99, latencies.max() * 1000))
+
+    print('failures: {} ({:.1%})'.format(sum(failures.values()), sum(failures.values()) / max(len(results), 1)))
+
+    for failure, count in failures.most_common():
+        print('  {:5d} {}'.format(count, failure))
+
+    stub_stats = stub.stats()
+    scheduler_stats = get_rate_limit_scheduler().stats()
+
+    print('stub: {} requests, {} failed on purpose, {} rate limited, {} not found'.format(
+        stub_stats['requests'], stub_stats['errors'], stub_stats['rate_limited'], stub_stats['not_found']))
+    print('rate limit scheduler: {} API requests, {} waits ({:.1f}s)'.format(
+        scheduler_stats['requests'], scheduler_stats['waits'], scheduler_stats['wait_time']))
+
+if __name__ == '__main__':
+    main()
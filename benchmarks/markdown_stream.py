@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compares the streaming Markdown conversion against converting whole documents.
+
+Before, every file was converted by a new Markdown converter into a single
+string, which was then split into lines. This benchmark checks that the
+streaming conversion yields the same non-empty lines, and reports the total
+time, the time until the first paragraph and the peak memory of each one.
+
+Example:
+    python -m benchmarks.markdown_stream --copies 20
+"""
+
+import os
+import time
+import argparse
+import tracemalloc
+from markdown import Markdown
+from scripts.get_contributing import markdown_to_plain_text, iter_paragraphs
+from benchmarks.common import get_fixture_paths, read_fixture
+
+def convert_whole_document(contributing_file):
+    Markdown.output_formats["plain"] = markdown_to_plain_text
+    converter = Markdown(output_format="plain")
+    converter.stripTopLevelTags = False
+
+    for line in converter.convert(contributing_file).splitlines():
+        yield line
+
+def measure(convert, contributing_file):
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    paragraphs = convert(contributing_file)
+    first_paragraph = next(paragraphs)
+    first_paragraph_time = time.perf_counter() - start_time
+    paragraphs = [first_paragraph] + list(paragraphs)
+    total_time = time.perf_counter() - start_time
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return paragraphs, first_paragraph_time, total_time, peak_memory
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', help="glob of CONTRIBUTING files (default: benchmarks/fixtures)")
+    parser.add_argument('--copies', type=int, default=1, help="number of times each file is repeated, to simulate larger files")
+    arguments = parser.parse_args(arguments)
+
+    for path in get_fixture_paths(arguments.fixtures):
+        contributing_file = '\n\n'.join([read_fixture(path)] * arguments.copies)
+
+        lines, whole_first_time, whole_time, whole_memory = measure(convert_whole_document, contributing_file)
+        paragraphs, stream_first_time, stream_time, stream_memory = measure(lambda contributing_file: iter_paragraphs(contributing_file, 'lines'), contributing_file)
+
+        assert [line for line in lines if line.strip()] == [paragraph.text for paragraph in paragraphs]
+
+        print('{} ({} paragraphs):'.format(os.path.basename(path), len(paragraphs)))
+        print('  whole document: {:7.1f} ms, first paragraph after {:7.1f} ms, peak {:6.2f} MiB'.format(
+            whole_time * 1000, whole_first_time * 1000, whole_memory / 2 ** 20))
+        print('       streaming: {:7.1f} ms, first paragraph after {:7.1f} ms, peak {:6.2f} MiB'.format(
+            stream_time * 1000, stream_first_time * 1000, stream_memory / 2 ** 20))
+
+if __name__ == '__main__':
+    main()
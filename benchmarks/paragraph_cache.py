@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measures how many paragraphs are shared between CONTRIBUTING files.
+
+Classifies every file twice, with and without the paragraph cache, checks
+that both produce the same predictions, and reports the hit rate of the
+cache (i.e. the share of duplicated paragraphs in the corpus) and the time
+spent by each approach.
+
+Example:
+    python -m benchmarks.paragraph_cache --fixtures 'corpus/*.md'
+"""
+
+import os
+import time
+import argparse
+import numpy
+from scripts.get_contributing import convert_contributing_file
+from scripts.classify_content import get_models_version, run_classification_model
+from scripts.result_cache import ParagraphCache
+from benchmarks.common import get_fixture_paths, read_fixture
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', help="glob of CONTRIBUTING files (default: benchmarks/fixtures)")
+    parser.add_argument('--maxsize', type=int, default=65536, help="maximum number of cached paragraphs")
+    parser.add_argument('--policy', choices=['lru', 'lfu'], default='lru', help="eviction policy of the cache")
+    arguments = parser.parse_args(arguments)
+
+    files = [convert_contributing_file(read_fixture(path)) for path in get_fixture_paths(arguments.fixtures)]
+    paragraph_cache = ParagraphCache(arguments.maxsize, arguments.policy)
+    models_version = get_models_version()
+
+    # Loads the models before measuring.
+    run_classification_model(['Warm-up'])
+
+    uncached_time = cached_time = 0
+
+    for paragraphs in files:
+        if not paragraphs:
+            continue
+
+        start_time = time.perf_counter()
+        uncached_predictions = run_classification_model(paragraphs)
+        uncached_time += time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        cached_predictions = paragraph_cache.predict(paragraphs, models_version, run_classification_model)
+        cached_time += time.perf_counter() - start_time
+
+        assert numpy.array_equal(uncached_predictions, cached_predictions)
+
+    stats = paragraph_cache.stats()
+
+    print('{} files, {} paragraphs, {} distinct'.format(len(files), stats['hits'] + stats['misses'], stats['misses']))
+    print('hit rate: {:.1%}, cached entries: {}'.format(stats['hit_rate'], stats['entries']))
+    print('without cache: {:.1f} ms, with cache: {:.1f} ms'.format(uncached_time * 1000, cached_time * 1000))
+
+if __name__ == '__main__':
+    main()
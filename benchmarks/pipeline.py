@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measures every stage of the classification pipeline on the fixture corpus.
+
+The fixtures and the artifacts bundled in the resources folder are used, so
+the benchmark runs offline. Each CONTRIBUTING file goes through the stages
+of a request, in order:
+
+    markdown       conversion of the raw file into paragraphs
+    tf-idf         statistic features (create_statistic_features)
+    heuristics     heuristic features (create_heuristic_features)
+    selection      selection of the best features (select_features)
+    predict        prediction of the classification model
+    compiled       prediction of the compiled pipeline, which replaces the
+                   three previous stages by default (run_classification_model)
+    aggregation    number of paragraphs per category (count_predictions_per_class)
+    rendering      charts and texts of the web application, drawn on a page
+                   that discards them
+
+For each stage, the median latency over the repetitions, the throughput in
+paragraphs per second and the peak memory are reported. The results can be
+saved as a baseline, and later runs compared against it: stages that got
+slower than the threshold are reported, and the exit status is 1.
+
+Example:
+    python -m benchmarks.pipeline --save baseline.json
+    python -m benchmarks.pipeline --compare baseline.json --threshold 0.1
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import contextlib
+import tracemalloc
+import numpy
+import pandas
+from scipy import sparse
+from scripts.get_contributing import convert_contributing_file, get_segmentation
+from scripts.get_features import create_statistic_features, create_heuristic_features, select_features
+from scripts.classify_content import get_classification_model, get_compiled_classifier
+from benchmarks.common import get_fixture_paths, read_fixture
+
+stages = ['markdown', 'tf-idf', 'heuristics', 'selection', 'predict', 'compiled', 'aggregation', 'rendering']
+
+class DiscardedPage:
+    """Streamlit page whose elements are built but never displayed."""
+
+    def selectbox(self, label, options):
+        return options[0]
+
+    def expander(self, label):
+        return contextlib.nullcontext()
+
+    def __getattr__(self, name):
+        return lambda *arguments, **keywords: None
+
+def render(predictions_per_class, paragraphs, predictions):
+    import classifier_section
+
+    page = DiscardedPage()
+    classifier_section.write_overview_reasoning(page, predictions_per_class)
+    classifier_section.write_dominant_categories(page, predictions_per_class)
+    classifier_section.write_missing_categories(page, predictions_per_class)
+    classifier_section.write_project_comparison(page, predictions_per_class)
+    classifier_section.write_annotated_paragraphs(page, paragraphs, predictions)
+
+def run_pipeline(contributing_file, measure):
+    """Runs one file through every stage, calling measure(stage, function) for each one."""
+
+    import classifier_section
+
+    paragraphs = measure('markdown', lambda: convert_contributing_file(contributing_file))
+
+    if not paragraphs:
+        return 0
+
+    dataframe = pandas.Series(paragraphs)
+    statistic_features = measure('tf-idf', lambda: create_statistic_features(dataframe))
+    heuristic_features = measure('heuristics', lambda: create_heuristic_features(dataframe))
+    features = measure('selection', lambda: select_features(sparse.hstack([statistic_features, heuristic_features], format='csr')))
+    predictions = measure('predict', lambda: get_classification_model().predict(features))
+    measure('compiled', lambda: get_compiled_classifier().predict(paragraphs))
+    predictions_per_class = measure('aggregation', lambda: classifier_section.count_predictions_per_class(predictions, 'github.com/fixture'))
+    measure('rendering', lambda: render(predictions_per_class, paragraphs, predictions))
+
+    return len(paragraphs)
+
+def measure_latency(contributing_files, repeat):
+    timings = {stage: [] for stage in stages}
+    n_paragraphs = 0
+
+    for _ in range(repeat):
+        elapsed_times = dict.fromkeys(stages, 0.0)
+
+        def measure(stage, function):
+            start_time = time.perf_counter()
+            result = function()
+            elapsed_times[stage] += time.perf_counter() - start_time
+            return result
+
+        n_paragraphs = sum(run_pipeline(contributing_file, measure) for contributing_file in contributing_files)
+
+        for stage in stages:
+            timings[stage].append(elapsed_times[stage])
+
+    return {stage: float(numpy.median(timings[stage])) for stage in stages}, n_paragraphs
+
+def measure_peak_memory(contributing_files):
+    # Tracing allocations slows everything down, so memory is measured in a separate pass.
+    peak_memory = dict.fromkeys(stages, 0)
+
+    def measure(stage, function):
+        tracemalloc.start()
+        result = function()
+        peak_memory[stage] = max(peak_memory[stage], tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        return result
+
+    for contributing_file in contributing_files:
+        run_pipeline(contributing_file, measure)
+
+    return peak_memory
+
+def run_benchmark(contributing_files, repeat):
+    # Loads the models, the heuristic matcher and the comparison index before measuring.
+    run_pipeline(contributing_files[0], lambda stage, function: function())
+
+    latencies, n_paragraphs = measure_latency(contributing_files, repeat)
+    peak_memory = measure_peak_memory(contributing_files)
+
+    return {'environment': {'python': platform.python_version(), 'machine': platform.machine(),
+                            'segmentation': get_segmentation(), 'inference': os.getenv('CONTRIBUTING_INFERENCE', 'compiled')},
+            'files': len(contributing_files),
+            'paragraphs': n_paragraphs,
+            'stages': {stage: {'latency_ms': latencies[stage] * 1000,
+                               'paragraphs_per_second': n_paragraphs / latencies[stage] if latencies[stage] else None,
+                               'peak_memory_mib': peak_memory[stage] / 2 ** 20} for stage in stages}}
+
+def print_results(results, baseline=None, threshold=0.1):
+    """Prints the results, compared with a baseline if given. Returns the stages that got slower."""
+
+    regressions = []
+
+    print('{} files, {} paragraphs ({} segmentation)'.format(results['files'], results['paragraphs'], results['environment']['segmentation']))
+    print('{:>12} {:>12} {:>14} {:>10}{}'.format('stage', 'latency (ms)', 'paragraphs/s', 'peak (MiB)', '  vs. baseline' if baseline else ''))
+
+    for stage, result in results['stages'].items():
+        comparison = ''
+
+        if baseline and stage in baseline['stages'] and baseline['stages'][stage]['latency_ms']:
+            change = result['latency_ms'] / baseline['stages'][stage]['latency_ms'] - 1
+            comparison = '  {:+7.1%}'.format(change)
+
+            if change > threshold:
+                regressions.append(stage)
+                comparison += ' slower'
+
+        print('{:>12} {:12.1f} {:14.0f} {:10.2f}{}'.format(stage, result['latency_ms'], result['paragraphs_per_second'] or 0, result['peak_memory_mib'], comparison))
+
+    if baseline and baseline['paragraphs'] != results['paragraphs']:
+        print('The baseline has {} paragraphs, so the fixtures or the segmentation are not the same.'.format(baseline['paragraphs']))
+
+    return regressions
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', help="glob of CONTRIBUTING files (default: benchmarks/fixtures)")
+    parser.add_argument('--repeat', type=int, default=5, help="number of measured runs over the fixtures")
+    parser.add_argument('--save', metavar='PATH', help="save the results as a JSON baseline")
+    parser.add_argument('--compare', metavar='PATH', help="compare the results with a saved baseline")
+    parser.add_argument('--threshold', type=float, default=0.1, help="relative slowdown reported as a regression (default: 0.1)")
+    arguments = parser.parse_args(arguments)
+
+    contributing_files = [read_fixture(path) for path in get_fixture_paths(arguments.fixtures)]
+    results = run_benchmark(contributing_files, arguments.repeat)
+
+    baseline = None
+
+    if arguments.compare:
+        with open(arguments.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+
+    regressions = print_results(results, baseline, arguments.threshold)
+
+    if arguments.save:
+        with open(arguments.save, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+    if regressions:
+        print('Slower than the baseline: ' + ', '.join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
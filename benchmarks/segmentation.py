@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compares the block segmentation of CONTRIBUTING files against the line segmentation.
+
+With the line segmentation, every wrapped line and list item line is
+classified as a paragraph of its own. This benchmark segments every file
+both ways and reports how many fewer rows reach the model with blocks, the
+time spent by the model, and how much the predictions agree:
+
+    - block agreement: share of blocks whose category was also predicted
+      for at least one line of the same chunk of the file;
+    - coverage agreement: mean Jaccard similarity between the categories
+      found in each file by both segmentations, which is what the web
+      application reports.
+
+Example:
+    python -m benchmarks.segmentation --fixtures 'corpus/*.md'
+"""
+
+import os
+import time
+import argparse
+import collections
+import numpy
+from scripts.get_contributing import iter_paragraphs
+from scripts.classify_content import run_classification_model
+from benchmarks.common import get_fixture_paths, read_fixture
+
+no_category = 'No categories identified.'
+
+def classify(paragraphs):
+    start_time = time.perf_counter()
+    predictions = run_classification_model([paragraph.text for paragraph in paragraphs]) if paragraphs else []
+
+    return list(predictions), time.perf_counter() - start_time
+
+def get_categories(predictions):
+    return set(predictions) - {no_category}
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', help="glob of CONTRIBUTING files (default: benchmarks/fixtures)")
+    arguments = parser.parse_args(arguments)
+
+    # Loads the models before measuring.
+    run_classification_model(['Warm-up'])
+
+    total_lines = total_blocks = agreeing_blocks = 0
+    lines_time = blocks_time = 0
+    similarities = []
+
+    for path in get_fixture_paths(arguments.fixtures):
+        contributing_file = read_fixture(path)
+        lines = list(iter_paragraphs(contributing_file, 'lines'))
+        blocks = list(iter_paragraphs(contributing_file, 'blocks'))
+
+        line_predictions, elapsed_time = classify(lines)
+        lines_time += elapsed_time
+        block_predictions, elapsed_time = classify(blocks)
+        blocks_time += elapsed_time
+
+        # Blocks and lines are matched by the chunk of the file they come from.
+        predictions_per_chunk = collections.defaultdict(set)
+
+        for line, prediction in zip(lines, line_predictions):
+            predictions_per_chunk[line.chunk_start_line].add(prediction)
+
+        agreeing = sum(prediction in predictions_per_chunk[block.chunk_start_line] for block, prediction in zip(blocks, block_predictions))
+
+        line_categories = get_categories(line_predictions)
+        block_categories = get_categories(block_predictions)
+        similarity = len(line_categories & block_categories) / len(line_categories | block_categories) if line_categories | block_categories else 1.0
+
+        total_lines += len(lines)
+        total_blocks += len(blocks)
+        agreeing_blocks += agreeing
+        similarities.append(similarity)
+
+        print('{}: {} lines -> {} blocks ({:.0%} fewer rows), block agreement {:.0%}, coverage agreement {:.0%}'.format(
+            os.path.basename(path), len(lines), len(blocks), 1 - len(blocks) / max(len(lines), 1),
+            agreeing / max(len(blocks), 1), similarity))
+
+        if line_categories != block_categories:
+            print('  only with lines: {}'.format(', '.join(sorted(line_categories - block_categories)) or 'none'))
+            print('  only with blocks: {}'.format(', '.join(sorted(block_categories - line_categories)) or 'none'))
+
+    print('total: {} lines -> {} blocks ({:.0%} fewer rows)'.format(total_lines, total_blocks, 1 - total_blocks / max(total_lines, 1)))
+    print('model time: {:.1f} ms with lines, {:.1f} ms with blocks'.format(lines_time * 1000, blocks_time * 1000))
+    print('block agreement: {:.1%}, mean coverage agreement: {:.1%}'.format(agreeing_blocks / max(total_blocks, 1), numpy.mean(similarities)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compares sharing the fitted TF-IDF vectorizer and feature selector against deep-copying them.
+
+Before, every classification deep-copied both artifacts before calling
+transform. This benchmark measures the latency and the memory allocated by
+both approaches, checks that they produce the same features, and checks
+that concurrent transforms over the shared artifacts are consistent.
+
+Example:
+    python -m benchmarks.shared_artifacts --repeat 20
+"""
+
+import os
+import copy
+import time
+import argparse
+import tracemalloc
+import numpy
+import pandas
+from concurrent.futures import ThreadPoolExecutor
+from scripts.get_contributing import escape_markdown_from_file
+from benchmarks.common import get_fixture_paths, read_fixture
+
+def load_paragraphs(path):
+    return pandas.Series(escape_markdown_from_file(read_fixture(path)).splitlines())
+
+def transform(vectorizer, selector, paragraphs, deep_copy):
+    if deep_copy:
+        vectorizer = copy.deepcopy(vectorizer)
+        selector = copy.deepcopy(selector)
+
+    statistic_features = vectorizer.transform(paragraphs)
+
+    # The heuristic columns are irrelevant here, only the selector's cost is measured.
+    n_heuristic_features = selector.n_features_in_ - statistic_features.shape[1]
+    features = numpy.hstack([statistic_features.toarray(), numpy.zeros((len(paragraphs), n_heuristic_features))])
+
+    return selector.transform(features)
+
+def measure(vectorizer, selector, paragraphs, deep_copy, repeat):
+    timings = []
+
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        transform(vectorizer, selector, paragraphs, deep_copy)
+        timings.append(time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    transform(vectorizer, selector, paragraphs, deep_copy)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return numpy.median(timings), peak_memory
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', help="glob of CONTRIBUTING files, each one transformed as a request (default: benchmarks/fixtures)")
+    parser.add_argument('--repeat', type=int, default=10, help="number of measured runs per approach")
+    parser.add_argument('--threads', type=int, default=8, help="number of threads used in the concurrency check")
+    arguments = parser.parse_args(arguments)
+
+    vectorizer = pandas.read_pickle('resources/tf-idf.sav')
+    selector = pandas.read_pickle('resources/feature_selector.sav')
+
+    # Each fixture represents one classification request.
+    for path in get_fixture_paths(arguments.fixtures):
+        paragraphs = load_paragraphs(path)
+
+        # Outputs must be identical, both sequentially and under concurrent use.
+        expected = transform(vectorizer, selector, paragraphs, deep_copy=True)
+        assert numpy.array_equal(expected, transform(vectorizer, selector, paragraphs, deep_copy=False))
+
+        with ThreadPoolExecutor(max_workers=arguments.threads) as executor:
+            results = executor.map(lambda _: transform(vectorizer, selector, paragraphs, deep_copy=False), range(arguments.threads))
+            assert all(numpy.array_equal(expected, result) for result in results)
+
+        print('{} ({} paragraphs, median of {} runs)'.format(os.path.basename(path), len(paragraphs), arguments.repeat))
+
+        for name, deep_copy in [('deep copy', True), ('shared', False)]:
+            latency, peak_memory = measure(vectorizer, selector, paragraphs, deep_copy, arguments.repeat)
+            print('{:>12}: {:8.1f} ms, {:8.1f} MiB allocated at peak'.format(name, latency * 1000, peak_memory / 2 ** 20))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compares the peak memory of the dense feature pipeline against the sparse one.
+
+The dense path is the previous implementation: the TF-IDF matrix is
+converted into a DataFrame with one column per vocabulary entry and
+concatenated with the heuristic features before the feature selection.
+The sparse path keeps a CSR matrix from the vectorizer to the classifier.
+Both paths must produce the same predictions.
+
+Example:
+    python -m benchmarks.sparse_features
+"""
+
+import os
+import time
+import argparse
+import tracemalloc
+import numpy
+import pandas
+from scripts.get_contributing import escape_markdown_from_file
+from scripts.classify_content import get_classification_model
+from scripts import get_features
+from benchmarks.common import get_fixture_paths, read_fixture
+
+def predict_dense(paragraphs):
+    paragraphs = pandas.Series(paragraphs)
+
+    statistic_features = get_features.create_statistic_features(paragraphs)
+    statistic_features = pandas.DataFrame(statistic_features.toarray(), columns=get_features.get_statistic_feature_names())
+
+    heuristic_features = get_features.create_heuristic_features(paragraphs)
+    heuristic_features = pandas.DataFrame(heuristic_features.toarray(), columns=get_features.get_heuristic_feature_names())
+
+    features = pandas.concat([statistic_features, heuristic_features], axis=1)
+    best_features = get_features.get_feature_selector().transform(features.values)
+
+    return get_classification_model().predict(best_features)
+
+def predict_sparse(paragraphs):
+    return get_classification_model().predict(get_features.convert_paragraphs_into_features(paragraphs))
+
+def measure(predict, paragraphs):
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    predictions = predict(paragraphs)
+    elapsed_time = time.perf_counter() - start_time
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return predictions, elapsed_time, peak_memory
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', help="glob of CONTRIBUTING files, each one classified as a request (default: benchmarks/fixtures)")
+    arguments = parser.parse_args(arguments)
+
+    # Loads the artifacts and the names of the columns before measuring.
+    get_classification_model()
+    get_features.get_feature_names()
+
+    for path in get_fixture_paths(arguments.fixtures):
+        paragraphs = escape_markdown_from_file(read_fixture(path)).splitlines()
+        print('{} ({} paragraphs)'.format(os.path.basename(path), len(paragraphs)))
+
+        dense_predictions, elapsed_time, peak_memory = measure(predict_dense, paragraphs)
+        print('{:>8}: {:8.1f} ms, {:8.1f} MiB peak'.format('dense', elapsed_time * 1000, peak_memory / 2 ** 20))
+
+        sparse_predictions, elapsed_time, peak_memory = measure(predict_sparse, paragraphs)
+        print('{:>8}: {:8.1f} ms, {:8.1f} MiB peak'.format('sparse', elapsed_time * 1000, peak_memory / 2 ** 20))
+
+        assert numpy.array_equal(dense_predictions, sparse_predictions)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compares the fused text preprocessing against applying each technique separately.
+
+The previous implementation applied each technique with its own pass over
+the paragraphs, and loaded the stopwords, the stemmer and the lemmatizer
+again for every paragraph. This benchmark checks that both produce the
+same text and reports the time spent by each one.
+
+Example:
+    python -m benchmarks.text_preprocessing --techniques lowercase remove-punctuations stemming
+"""
+
+import time
+import string
+import argparse
+import pandas
+from scripts.get_contributing import convert_contributing_file
+from scripts.get_features import text_preprocessing, load_nltk_corpus
+from benchmarks.common import get_fixture_paths, read_fixture
+
+def text_preprocessing_per_technique(X, techniques):
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+    from nltk.stem.porter import PorterStemmer
+
+    X = X.dropna()
+
+    if 'lowercase' in techniques:
+        X = X.apply(lambda paragraph: paragraph.lower())
+
+    if 'remove-punctuations' in techniques:
+        X = X.apply(lambda paragraph: paragraph.translate(str.maketrans('', '', string.punctuation)))
+
+    if 'remove-stopwords' in techniques:
+        load_nltk_corpus('stopwords')
+        X = X.apply(lambda paragraph: " ".join([word for word in paragraph.split() if word not in set(stopwords.words('english'))]))
+
+    if 'stemming' in techniques:
+        X = X.apply(lambda paragraph: " ".join([PorterStemmer().stem(word) for word in paragraph.split()]))
+
+    if 'lemmatization' in techniques:
+        load_nltk_corpus('wordnet')
+        X = X.apply(lambda paragraph: " ".join([WordNetLemmatizer().lemmatize(word) for word in paragraph.split()]))
+
+    return X
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', help="glob of CONTRIBUTING files (default: benchmarks/fixtures)")
+    parser.add_argument('--techniques', nargs='+', default=['lowercase', 'remove-punctuations', 'remove-stopwords', 'stemming', 'lemmatization'],
+                        help="preprocessing techniques to apply (the stopwords and lemmatization require the NLTK corpora)")
+    parser.add_argument('--copies', type=int, default=10, help="number of times the paragraphs of the fixtures are repeated")
+    arguments = parser.parse_args(arguments)
+
+    paragraphs = [paragraph for path in get_fixture_paths(arguments.fixtures) for paragraph in convert_contributing_file(read_fixture(path))]
+    X = pandas.Series(paragraphs * arguments.copies)
+
+    start_time = time.perf_counter()
+    expected = text_preprocessing_per_technique(X, arguments.techniques)
+    per_technique_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    result = text_preprocessing(X, arguments.techniques)
+    fused_time = time.perf_counter() - start_time
+
+    assert expected.equals(result)
+
+    print('{} paragraphs: per technique {:.1f} ms, fused {:.1f} ms'.format(len(X), per_technique_time * 1000, fused_time * 1000))
+
+if __name__ == '__main__':
+    main()
@@ -1,28 +1,85 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
+import time
+import numpy
 import pandas
 import collections
 import streamlit as st
-import plotly.express as plotly
+from cachetools import LRUCache
 from annotated_text import annotated_text
 from scripts.classify_content import get_contributing_predictions
+from scripts.comparison_index import get_comparison_index
+from scripts.get_contributing import get_segmentation
+import scripts.metrics as metrics
 
-@st.cache(allow_output_mutation=True)
-def get_projects():
-    return pandas.read_csv('https://raw.githubusercontent.com/fronchetti/contributing.info/main/resources/projects.csv', encoding='cp1252')
+def write_contributing_analysis(page, repository_url):
+    start_time = time.perf_counter()
+    paragraphs, predictions, is_memoized = get_session_predictions(page, repository_url)
+    analysis_time = time.perf_counter() - start_time
+
+    if len(paragraphs) > 0 and len(predictions) > 0:
+        with metrics.span('aggregation'):
+            predictions_per_class = count_predictions_per_class(predictions, repository_url)
 
+        with metrics.span('rendering'):
+            write_overview_reasoning(page, predictions_per_class)
+            write_dominant_categories(page, predictions_per_class)
+            write_missing_categories(page, predictions_per_class)
+            write_project_comparison(page, predictions_per_class)
+            write_annotated_paragraphs(page, paragraphs, predictions)
 
-def write_contributing_analysis(page, repository_url):
+        report_rerun_time(page, analysis_time, time.perf_counter() - start_time - analysis_time, is_memoized)
+
+
+def get_session_predictions(page, repository_url):
+    """Returns the paragraphs and predictions of a repository, computed once per session.
+
+    Every widget interaction (e.g. choosing a category in the project
+    comparison) reruns the whole page, so the predictions of the last few
+    repositories analyzed in the session are kept in its state, and only the
+    charts are drawn again. Failed analyses are not kept, so they are retried.
+
+    Returns:
+        A tuple with the list of paragraphs, the array of predictions, and
+        whether they were already computed in this session.
+    """
+
+    if 'contributing_predictions' not in st.session_state:
+        st.session_state['contributing_predictions'] = LRUCache(maxsize=8)
+
+    session_predictions = st.session_state['contributing_predictions']
+    repository_url = repository_url.strip()
+
+    if repository_url in session_predictions:
+        metrics.increment('contributing_cache_hits_total', cache='session')
+        paragraphs, predictions = session_predictions[repository_url]
+        return paragraphs, predictions, True
+
+    metrics.increment('contributing_cache_misses_total', cache='session')
     paragraphs, predictions = get_contributing_predictions(page, repository_url)
 
     if len(paragraphs) > 0 and len(predictions) > 0:
-        predictions_per_class = count_predictions_per_class(predictions, repository_url)
-        write_overview_reasoning(page, predictions_per_class)
-        write_dominant_categories(page, predictions_per_class)
-        write_missing_categories(page, predictions_per_class)
-        write_project_comparison(page, predictions_per_class)
-        write_annotated_paragraphs(page, paragraphs, predictions)
+        session_predictions[repository_url] = (paragraphs, predictions)
+
+    return paragraphs, predictions, False
+
+
+def report_rerun_time(page, analysis_time, rendering_time, is_memoized):
+    """Reports the time spent by a rerun of the page on the analysis and on drawing it.
+
+    The analysis time is added to the metrics (see scripts/metrics.py), in
+    the 'analysis' or 'memoized_analysis' stage, next to the 'rendering'
+    span. Times are also shown in the page when the environment variable
+    CONTRIBUTING_SHOW_TIMINGS is set to 1.
+    """
+
+    metrics.observe('memoized_analysis' if is_memoized else 'analysis', analysis_time)
+
+    if os.getenv('CONTRIBUTING_SHOW_TIMINGS', '0') == '1':
+        page.caption('Analysis: {:.1f} ms ({}), rendering: {:.1f} ms'.format(
+            analysis_time * 1000, 'memoized' if is_memoized else 'fetched and classified', rendering_time * 1000))
 
 
 def write_overview_reasoning(page, predictions):
@@ -92,6 +149,9 @@ def write_overview_reasoning(page, predictions):
     page.markdown("{}".format(coverage_reasonings[contributing_coverage]))
 
 def write_overview_barplot(page, predictions):
+    # Plotly is only imported when a chart is drawn, since it is slow to import.
+    import plotly.express as plotly
+
     barplot = plotly.bar(data_frame = predictions,
                      x = "Number of paragraphs", 
                      y = "Repository",
@@ -327,36 +387,43 @@ def write_missing_categories(page, predictions):
 
 
 def write_project_comparison(page, predictions):
+    import plotly.express as plotly
+
     page.write("<hr>", unsafe_allow_html=True)
     page.markdown('<p class="custom-page-title">This file compared to other projects:</p>', unsafe_allow_html=True)
 
-    projects_dataframe = get_projects()
+    comparison_index = get_comparison_index()
 
-    selected_category = page.selectbox('Choose a category of information:', tuple(classes_color.keys()))
+    # Files segmented into blocks have fewer paragraphs than the projects counted in lines, and vice versa.
+    if comparison_index.segmentation != get_segmentation():
+        page.warning('This file cannot be compared to other projects: its paragraphs were split into ' + get_segmentation() +
+                     ', while the paragraphs of the projects we analyzed were split into ' + comparison_index.segmentation + '.')
+        return
 
-    sorted_dataframe = projects_dataframe.sample(frac=0.01)
-    sorted_dataframe = sorted_dataframe.sort_values(by=[selected_category], ascending=True)
+    selected_category = page.selectbox('Choose a category of information:', tuple(classes_color.keys()))
 
     # Get values from project
-    project_name = (predictions['Repository'].iloc[0]).replace('github.com/', '')
     project_value = predictions.loc[predictions['Category'] == selected_category, 'Number of paragraphs'].iloc[0]
-
-    project_values = []
-    for column in list(sorted_dataframe):
-        if column == 'Repository':
-            project_values.append(project_name)
-        elif column == selected_category:
-            project_values.append(project_value)
-        else:
-            project_values.append(None)
-
-    sorted_dataframe.loc[len(sorted_dataframe.index)] = project_values
-
-    barplot = plotly.bar(sorted_dataframe, x = 'Repository', y = selected_category, color=selected_category, template = 'ggplot2')
-    barplot.update_layout(paper_bgcolor='rgb(245, 245, 245)', showlegend=False, yaxis_title='# Paragraphs', font_color='black')
-    barplot.update_coloraxes(showscale=False)
-    barplot.update_xaxes(tickangle=45)
-    page.markdown('This file has ' + str(int(project_value)) + ' paragraphs in the category ' + selected_category + '. The average of the following sample for this category is ' + str(int(sorted_dataframe[selected_category].mean())) + '.')
+    percentile_rank = comparison_index.get_percentile_rank(selected_category, project_value)
+
+    # The chart is drawn from the histogram of the corpus, with the bin of the project highlighted
+    bin_counts, bin_edges = comparison_index.get_histogram(selected_category)
+    project_bin = min(max(numpy.searchsorted(bin_edges, project_value, side='right') - 1, 0), len(bin_counts) - 1)
+
+    histogram = pandas.DataFrame({'# Paragraphs': [str(start) if end - start == 1 else '{}–{}'.format(start, end - 1) for start, end in zip(bin_edges[:-1], bin_edges[1:])],
+                                  '# Projects': bin_counts,
+                                  'Bin': ['This file' if position == project_bin else 'Other projects' for position in range(len(bin_counts))]})
+
+    barplot = plotly.bar(histogram, x = '# Paragraphs', y = '# Projects', color = 'Bin',
+                         color_discrete_map = {'This file': classes_color[selected_category], 'Other projects': '#bcbcbc'},
+                         category_orders = {'# Paragraphs': list(histogram['# Paragraphs'])},
+                         template = 'ggplot2')
+    barplot.update_layout(paper_bgcolor='rgb(245, 245, 245)', showlegend=False, xaxis_title='# Paragraphs', yaxis_title='# Projects', font_color='black')
+    barplot.update_xaxes(type='category', tickangle=45)
+    page.markdown('This file has ' + str(int(project_value)) + ' paragraphs in the category ' + selected_category +
+                  ', more than ' + str(int(percentile_rank)) + '% of the ' + str(comparison_index.get_number_of_projects()) + ' projects we analyzed.' +
+                  ' The average of these projects for this category is ' + str(int(comparison_index.get_mean(selected_category))) +
+                  ', and the median is ' + str(int(comparison_index.get_median(selected_category))) + '.')
     page.plotly_chart(barplot, use_container_width = True)
 
 
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Loads the fitted artifacts of the classifier (vectorizer, feature selector and model).
+
+The artifacts are read from the `resources` folder that ships with the
+application. A different folder, or a base URL, can be configured with the
+environment variable CONTRIBUTING_ARTIFACTS. When an artifact is not found
+locally, it is downloaded from the contributing.info repository on GitHub.
+
+Local artifacts are memory-mapped: on first use, each pickle is converted
+into a joblib file, whose NumPy arrays are then mapped read-only into
+memory. Every process that loads the same artifact shares the same memory
+pages, instead of keeping its own copy.
+
+Loading a joblib file runs pickled code, so the files are kept in a cache
+directory private to the user (see scripts/private_cache.py):
+CONTRIBUTING_ARTIFACTS_CACHE, or $XDG_CACHE_HOME/contributing-artifacts
+(~/.cache by default). If the directory or a file in it belongs to another
+user or can be written by others, it is not used, and the pickle is loaded
+without memory mapping.
+
+Memory mapping only benefits the reference pipeline (CONTRIBUTING_INFERENCE=reference).
+The compiled classifier, used by default, is loaded from its own .npz file
+(see scripts/compiled_model.py), whose arrays (about 1.5 MB) are copied
+into each process.
+"""
+
+import os
+import sys
+import hashlib
+import threading
+import pandas
+from scripts.private_cache import get_cache_home, is_private_path, make_private_directory
+
+resources_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resources')
+remote_artifacts_url = 'https://github.com/fronchetti/contributing.info/blob/main/resources/{}?raw=true'
+
+artifacts_lock = threading.Lock()
+
+def get_artifacts_location():
+    return os.getenv('CONTRIBUTING_ARTIFACTS', resources_directory)
+
+def get_artifacts_cache_directory():
+    return os.getenv('CONTRIBUTING_ARTIFACTS_CACHE', os.path.join(get_cache_home(), 'contributing-artifacts'))
+
+def get_artifact_path(name):
+    """Returns the local path of an artifact, or None if it is only available remotely."""
+
+    location = get_artifacts_location()
+
+    if location.startswith(('http://', 'https://')):
+        return None
+
+    path = os.path.join(location, name)
+
+    return path if os.path.exists(path) else None
+
+def get_artifact_version(name):
+    """Returns a string that changes whenever the given artifact file changes.
+
+    Args:
+        name: File name of the artifact, e.g. 'tf-idf.sav'.
+    Returns:
+        A short hexadecimal digest of the path, size and modification time of
+        the artifact, or of its remote URL when it is not available locally.
+    """
+
+    path = get_artifact_path(name)
+
+    if path is None:
+        fingerprint = get_artifact_url(name)
+    else:
+        status = os.stat(path)
+        fingerprint = '{}:{}:{}'.format(os.path.abspath(path), status.st_size, status.st_mtime_ns)
+
+    return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+
+def get_artifact_url(name):
+    location = get_artifacts_location()
+
+    if location.startswith(('http://', 'https://')):
+        return location.rstrip('/') + '/' + name
+
+    return remote_artifacts_url.format(name)
+
+def load_artifact(name):
+    """Loads a fitted artifact.
+
+    Artifacts are immutable once loaded: their arrays are mapped read-only,
+    so they must only be used for inference (e.g. transform and predict).
+
+    Args:
+        name: File name of the artifact, e.g. 'tf-idf.sav'.
+    Returns:
+        The unpickled object.
+    """
+
+    path = get_artifact_path(name)
+
+    if path is None:
+        return pandas.read_pickle(get_artifact_url(name))
+
+    return load_memory_mapped_artifact(name, path)
+
+def load_memory_mapped_artifact(name, path):
+    import joblib
+
+    cache_directory = get_artifacts_cache_directory()
+    cache_path = os.path.join(cache_directory, '{}-{}.joblib'.format(name, get_artifact_version(name)))
+
+    with artifacts_lock:
+        if not make_private_directory(cache_directory) or (os.path.lexists(cache_path) and not is_private_path(cache_path)):
+            print('The artifacts cache ' + cache_directory + ' is not private to the current user, ' + name + ' is loaded without memory mapping.',
+                  file=sys.stderr)
+            return pandas.read_pickle(path)
+
+        if not os.path.exists(cache_path):
+            # Other processes may be converting the same artifact, so the file is
+            # written under a temporary name and then atomically renamed.
+            temporary_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+            joblib.dump(pandas.read_pickle(path), temporary_path)
+            os.replace(temporary_path, cache_path)
+
+    return joblib.load(cache_path, mmap_mode='r')
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Downloads the CONTRIBUTING files of many repositories concurrently with asyncio.
+
+Each repository needs a chain of three requests (community profile ->
+contents -> raw file), unless its file is found directly in one of the
+usual locations (see get_contributing.download_raw_contributing_file).
+Instead of running the chain of one repository after the other, the chains
+of many repositories are interleaved: while a repository waits for its
+profile, others are downloading their files. The requests of each chain,
+and which file is kept, are decided by the same helpers as the synchronous
+download (see get_contributing.iter_community_profile_requests).
+
+Requests are made by scrap_github_api.Create, in a pool of threads, so they
+keep its semantics: the pooled session, retries, the response cache and the
+rate limit scheduler (see scripts/rate_limit.py). A semaphore limits the
+number of requests in flight, and the rate limit is a budget shared by
+every repository: once the scheduler gives up waiting for the quota, the
+remaining repositories fail fast instead of making more requests, until
+the quota of one of the tokens is reset.
+
+Example:
+    python -m scripts.async_github_api resources/projects.csv --concurrency 32
+"""
+
+import json
+import time
+import asyncio
+import weakref
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import scripts.get_contributing as get_contributing
+from scripts.get_contributing import parse_repository_from_url
+import scripts.scrap_github_api as scraper
+import scripts.metrics as metrics
+from scripts.rate_limit import wait_for_rate_limit_reset
+
+class AsyncGitHubClient:
+    def __init__(self, concurrency=16, github_api=None):
+        """Creates a client that makes at most `concurrency` requests at a time.
+
+        Args:
+            concurrency: Maximum number of requests in flight.
+            github_api: Optional scrap_github_api.Create instance shared by
+                every request. By default, one with a connection pool as
+                large as the concurrency limit is created.
+        """
+
+        self.concurrency = concurrency
+        self.github_api = github_api or scraper.Create(pool_size=concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.semaphores = weakref.WeakKeyDictionary() # Created lazily, one per event loop
+        self.rate_limit_error = None # Set while the shared rate limit is exhausted
+        self.rate_limit_reset = None # Unix time when the first token is reset
+
+    def get_semaphore(self):
+        # A semaphore is bound to the event loop it is first used in, and the
+        # client can be used by several loops (e.g. successive asyncio.run).
+        loop = asyncio.get_running_loop()
+
+        if loop not in self.semaphores:
+            self.semaphores[loop] = asyncio.Semaphore(self.concurrency)
+
+        return self.semaphores[loop]
+
+    async def request(self, url, parameters=None, file_type='json'):
+        """Executes a request to GitHub API without blocking the event loop.
+
+        Args:
+            url: String representing the GitHub API url to be requested.
+            parameters: Dictionary of GET parameters to be used in the request.
+            file_type: String representing the type of data to be returned
+                after the request. The available types are 'json' and 'text'.
+        Returns:
+            The same as scrap_github_api.Create.request.
+        """
+
+        async with self.get_semaphore():
+            if self.rate_limit_error and time.time() < self.rate_limit_reset:
+                raise self.rate_limit_error
+
+            self.rate_limit_error = None
+            loop = asyncio.get_running_loop()
+
+            try:
+                return await loop.run_in_executor(self.executor, lambda: self.github_api.request(url, parameters or {}, file_type=file_type))
+            except ConnectionError as exception:
+                # Requests fail fast until the quota of a token is reset.
+                resets = [token['reset'] for token in self.github_api.scheduler.stats()['tokens'] if token['reset'] is not None]
+                self.rate_limit_error = exception
+                self.rate_limit_reset = min(resets, default=time.time())
+                raise
+
+    async def download_contributing_file(self, repository_url):
+        """Downloads the raw CONTRIBUTING file of a repository hosted on GitHub.
+
+        See get_contributing.download_contributing_file, which makes the same
+        requests, from the same helpers, and raises the same exceptions.
+        """
+
+        repository_owner, repository_name = parse_repository_from_url(repository_url)
+
+        contributing_file = await self.download_raw_contributing_file(repository_owner, repository_name)
+
+        if contributing_file is not None:
+            return contributing_file
+
+        requests = get_contributing.iter_community_profile_requests(repository_owner, repository_name)
+
+        try:
+            url, file_type, stage = next(requests)
+
+            while True:
+                with metrics.span(stage):
+                    response = await self.request(url, file_type=file_type)
+
+                url, file_type, stage = requests.send(response)
+        except StopIteration as stop:
+            return stop.value
+        except Exception as exception:
+            raise get_contributing.get_community_profile_error(exception)
+
+    async def download_raw_contributing_file(self, repository_owner, repository_name):
+        """Downloads the CONTRIBUTING file directly from its most likely locations.
+
+        See get_contributing.download_raw_contributing_file.
+        """
+
+        async def download(path):
+            try:
+                return await self.request(get_contributing.raw_contributing_url.format(repository_owner, repository_name, path), file_type='text')
+            except Exception:
+                return None
+
+        for paths in get_contributing.iter_raw_contributing_paths(repository_owner, repository_name):
+            contributing_files = await asyncio.gather(*[download(path) for path in paths])
+            contributing_file = get_contributing.find_raw_contributing_file(repository_owner, repository_name, paths, contributing_files)
+
+            if contributing_file is not None:
+                return contributing_file
+
+        return None
+
+    async def download_contributing_files(self, repository_urls):
+        """Downloads the CONTRIBUTING files of many repositories.
+
+        Args:
+            repository_urls: Iterable of GitHub repository URLs. It is consumed
+                lazily, so it can be a generator over a large list.
+        Yields:
+            Tuples (repository_url, contributing_file, exception), as soon as
+            each download finishes (not in the order of the input). Either the
+            file or the exception is None.
+        """
+
+        repository_urls = iter(repository_urls)
+        downloading = {}
+
+        def schedule_downloads():
+            # Enough repositories are started to keep every request slot busy,
+            # without creating one task per repository upfront.
+            while len(downloading) < 2 * self.concurrency:
+                repository_url = next(repository_urls, None)
+
+                if repository_url is None:
+                    return
+
+                downloading[asyncio.ensure_future(self.download_contributing_file(repository_url))] = repository_url
+
+        schedule_downloads()
+
+        while downloading:
+            done, _ = await asyncio.wait(list(downloading), return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                repository_url = downloading.pop(task)
+
+                if task.exception():
+                    yield repository_url, None, task.exception()
+                else:
+                    yield repository_url, task.result(), None
+
+            schedule_downloads()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+async def print_downloads(repository_urls, concurrency):
+    client = AsyncGitHubClient(concurrency)
+
+    try:
+        async for repository_url, contributing_file, exception in client.download_contributing_files(repository_urls):
+            result = {'repository': repository_url,
+                      'size': len(contributing_file) if contributing_file is not None else None,
+                      'error': str(exception) or type(exception).__name__ if exception else None}
+            print(json.dumps(result), flush=True)
+    finally:
+        client.close()
+
+def main(arguments=None):
+    from scripts.classify_repositories import read_repositories
+
+    parser = argparse.ArgumentParser(description='Downloads the CONTRIBUTING files of a list of GitHub repositories.')
+    parser.add_argument('repositories', help="text file with one repository per line, CSV file with a 'Repository' column, or '-' for stdin")
+    parser.add_argument('--concurrency', type=int, default=16, help="maximum number of requests in flight (default: 16)")
+    arguments = parser.parse_args(arguments)
+
+    wait_for_rate_limit_reset()
+    asyncio.run(print_downloads(read_repositories(arguments.repositories), arguments.concurrency))
+
+if __name__ == '__main__':
+    main()
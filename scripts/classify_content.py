@@ -1,15 +1,139 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import pandas
-import streamlit as st
+import os
+from functools import lru_cache
 from urllib.error import URLError
-from scripts.get_contributing import get_contributing_file
-from scripts.get_features import convert_paragraphs_into_features
+from scripts.get_contributing import download_contributing_file, convert_contributing_file, get_segmentation
+from scripts.get_features import convert_paragraphs_into_features, get_tf_idf_vectorizer, get_feature_selector
+from scripts.compiled_model import CompiledClassifier, get_source_hashes
+from scripts.artifacts import load_artifact, get_artifact_path, get_artifact_version
+from scripts.result_cache import get_result_cache, get_paragraph_cache
+import scripts.metrics as metrics
 
-@st.cache
+@lru_cache(maxsize=None)
 def get_classification_model():
-    return pandas.read_pickle('https://github.com/fronchetti/contributing.info/blob/main/resources/classification_model.sav?raw=true')
+    return load_artifact('classification_model.sav')
+
+@lru_cache(maxsize=None)
+def get_compiled_classifier():
+    """Loads the compiled version of the classification pipeline.
+
+    The compiled model is loaded from the environment variable
+    CONTRIBUTING_COMPILED_MODEL if it is set, or from compiled_model.npz in
+    the artifacts folder (see scripts/artifacts.py), without unpickling the
+    vectorizer, the feature selector and the classifier. The bundled model
+    is only used if it was compiled from the current artifacts. Otherwise,
+    or when there is no compiled model, the model is compiled from the
+    three pickled artifacts.
+    """
+
+    compiled_model_path = os.getenv('CONTRIBUTING_COMPILED_MODEL')
+
+    if compiled_model_path and os.path.exists(compiled_model_path):
+        return CompiledClassifier.load(compiled_model_path)
+
+    compiled_model_path = get_artifact_path('compiled_model.npz')
+
+    if compiled_model_path:
+        compiled_classifier = CompiledClassifier.load(compiled_model_path)
+
+        if compiled_classifier.source_hashes == get_source_hashes():
+            return compiled_classifier
+
+    return CompiledClassifier.from_artifacts(get_tf_idf_vectorizer(), get_feature_selector(), get_classification_model())
+
+def predict_paragraphs(paragraphs):
+    """Predicts the category of information of each paragraph.
+
+    Predictions are cached by paragraph (see scripts/result_cache.py), and
+    only the paragraphs that were not classified before are run through the
+    models.
+
+    Args:
+        paragraphs: List of strings extracted from a CONTRIBUTING file.
+    Returns:
+        An array with one category per paragraph, in the same order.
+    """
+
+    paragraph_cache = get_paragraph_cache()
+
+    if paragraph_cache is None:
+        return run_classification_model(paragraphs)
+
+    return paragraph_cache.predict(paragraphs, get_models_version(), run_classification_model)
+
+def run_classification_model(paragraphs):
+    """Runs the classification models on a list of paragraphs, without caching.
+
+    By default, the compiled version of the pipeline is used. Set the
+    environment variable CONTRIBUTING_INFERENCE to 'reference' to run the
+    vectorizer, the feature selector and the classifier in sequence instead.
+
+    Args:
+        paragraphs: List of strings.
+    Returns:
+        An array with one category per paragraph, in the same order.
+    """
+
+    metrics.increment('contributing_paragraphs_classified_total', len(paragraphs))
+
+    if os.getenv('CONTRIBUTING_INFERENCE', 'compiled') == 'compiled':
+        with metrics.span('compiled_predict'):
+            return get_compiled_classifier().predict(paragraphs)
+
+    # Loads the classification model.
+    model = get_classification_model()
+    features = convert_paragraphs_into_features(paragraphs)
+
+    # Using the estimator, predicts the classes for the paragraphs in the file
+    with metrics.span('predict'):
+        return model.predict(features)
+
+def get_models_version():
+    """Returns a string that changes whenever the artifacts, the inference mode or the segmentation change."""
+
+    version = [get_artifact_version(name) for name in ('tf-idf.sav', 'feature_selector.sav', 'classification_model.sav')]
+    version.append(os.getenv('CONTRIBUTING_INFERENCE', 'compiled'))
+    version.append(get_segmentation())
+
+    compiled_model_path = os.getenv('CONTRIBUTING_COMPILED_MODEL')
+
+    if compiled_model_path and os.path.exists(compiled_model_path):
+        version.append(str(os.stat(compiled_model_path).st_mtime_ns))
+    else:
+        version.append(get_artifact_version('compiled_model.npz'))
+
+    return ':'.join(version)
+
+def classify_contributing_file(contributing_file):
+    """Converts a raw CONTRIBUTING file into paragraphs and predicts their categories.
+
+    Results are cached by the content of the file (see scripts/result_cache.py),
+    so a file that was already classified skips the whole pipeline.
+
+    Args:
+        contributing_file: String with the raw content of the file.
+    Returns:
+        A tuple with the list of paragraphs and the array of predictions.
+    """
+
+    result_cache = get_result_cache()
+    models_version = get_models_version() if result_cache else None
+
+    if result_cache:
+        cached_result = result_cache.get(contributing_file, models_version)
+
+        if cached_result:
+            return cached_result
+
+    paragraphs = convert_contributing_file(contributing_file)
+    predictions = predict_paragraphs(paragraphs) if paragraphs else []
+
+    if result_cache:
+        result_cache.store(contributing_file, models_version, paragraphs, predictions)
+
+    return paragraphs, predictions
 
 def get_contributing_predictions(page, repository_url):
 
@@ -18,15 +142,10 @@ def get_contributing_predictions(page, repository_url):
             if 'github.com' not in repository_url:
                 raise URLError('The URL must refer to a public repository hosted on GitHub with a CONTRIBUTING.md file.')
 
-            paragraphs = get_contributing_file(repository_url)
+            contributing_file = download_contributing_file(repository_url)
+            paragraphs, predictions = classify_contributing_file(contributing_file)
 
             if paragraphs:
-                # Loads the classification model.
-                model = get_classification_model()
-
-                # Using the estimator, predicts the classes for the paragraphs in the file
-                predictions = model.predict(convert_paragraphs_into_features(paragraphs))
-
                 return paragraphs, predictions
             else:
                 raise Exception("The CONTRIBUTING.md file of the requested project is empty.")
@@ -42,4 +161,3 @@ def get_contributing_predictions(page, repository_url):
         page.warning("Traceback: " + str(generic_exception))
 
     return [], []
-
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Classifies the CONTRIBUTING files of many repositories from the command line.
+
+This is the headless counterpart of the web application. It reads a list of
+repositories, downloads their CONTRIBUTING files with a bounded number of
+concurrent requests, classifies the paragraphs in a pool of processes and
+streams the number of paragraphs per category to a CSV or JSONL file.
+
+Example:
+    python -m scripts.classify_repositories resources/projects.csv -o predictions.csv
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+import functools
+import collections
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from scripts.get_contributing import download_contributing_file
+from scripts.classify_content import classify_contributing_file
+from scripts.local_repositories import find_local_repositories, read_local_contributing_file
+from scripts.rate_limit import wait_for_rate_limit_reset
+import scripts.metrics as metrics
+
+# Same order used by the columns of resources/projects.csv
+categories = ['CF – Contribution flow',
+    'CT – Choose a task',
+    'TC – Talk to the community',
+    'BW – Build local workspace',
+    'DC – Deal with the code',
+    'SC – Submit the changes',
+    'No categories identified.']
+
+output_columns = ['Repository', '# Paragraphs'] + categories + ['# Categories Identified', 'Error']
+
+def read_repositories(path):
+    """Reads the repositories to be classified.
+
+    Args:
+        path: Path to a text file with one repository per line (either a GitHub
+            URL or owner/name), or to a CSV file with a 'Repository' column
+            (and optionally an 'Organization' column), such as the files in
+            the resources folder. Use '-' to read from the standard input.
+    Returns:
+        A generator of GitHub repository URLs.
+    """
+
+    if path == '-':
+        lines = (line.strip() for line in sys.stdin)
+        repositories = (line for line in lines if line and not line.startswith('#'))
+    elif path.endswith('.csv'):
+        repositories = read_repositories_from_csv(path)
+    else:
+        with open(path, encoding='utf-8') as file:
+            repositories = [line.strip() for line in file]
+        repositories = (line for line in repositories if line and not line.startswith('#'))
+
+    for repository in repositories:
+        if 'github.com' in repository:
+            yield repository
+        else:
+            yield 'https://github.com/' + repository.strip('/')
+
+def read_repositories_from_csv(path):
+    # resources/projects.csv is encoded as cp1252, but only the ASCII
+    # repository names are read from it.
+    with open(path, encoding='utf-8', errors='replace', newline='') as file:
+        for row in csv.DictReader(file):
+            if row.get('Organization'):
+                yield row['Organization'] + '/' + row['Repository']
+            else:
+                yield row['Repository']
+
+def count_predictions(contributing_file):
+    """Classifies the paragraphs of a file and counts the predictions per category.
+
+    This function runs inside the worker processes, where the classification
+    model is loaded once and reused for every file.
+    """
+
+    paragraphs, predictions = classify_contributing_file(contributing_file)
+
+    if not paragraphs:
+        raise Exception("The CONTRIBUTING.md file of the requested project is empty.")
+
+    counter = collections.Counter(predictions)
+
+    return {category: int(counter.get(category, 0)) for category in categories}
+
+def create_result(repository_url, counts=None, error=None):
+    result = {column: 0 for column in output_columns}
+    result['Repository'] = repository_url.split('github.com/')[-1].strip('/')
+    result['Error'] = error or ''
+
+    if counts:
+        result.update(counts)
+        result['# Paragraphs'] = sum(counts.values())
+        result['# Categories Identified'] = sum(1 for category in categories[:-1] if counts[category] > 0)
+
+    return result
+
+class CSVWriter:
+    def __init__(self, stream):
+        self.stream = stream
+        self.writer = csv.DictWriter(stream, fieldnames=output_columns)
+        self.writer.writeheader()
+
+    def write(self, result):
+        self.writer.writerow(result)
+        self.stream.flush()
+
+class JSONLinesWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, result):
+        self.stream.write(json.dumps(result, ensure_ascii=False) + '\n')
+        self.stream.flush()
+
+def classify_repositories(repositories, writer, fetch_workers=8, classify_workers=None, progress_interval=100, download=download_contributing_file):
+    """Downloads and classifies the CONTRIBUTING files of a list of repositories.
+
+    Downloads run in a pool of threads (they are bound by network latency),
+    while the classification runs in a pool of processes (it is bound by CPU).
+    The number of files waiting in each stage is limited, so that memory
+    usage stays constant regardless of how many repositories are given.
+
+    Args:
+        repositories: Iterable of GitHub repository URLs.
+        writer: Object with a write(result) method, called once per repository
+            as soon as its file is classified.
+        fetch_workers: Maximum number of concurrent downloads.
+        classify_workers: Number of classification processes. Defaults to the
+            number of CPUs.
+        progress_interval: Number of repositories between progress reports.
+        download: Function that returns the raw CONTRIBUTING file of a
+            repository. By default, files are downloaded from GitHub.
+    Returns:
+        A tuple with the number of repositories processed and the elapsed time in seconds.
+    """
+
+    repositories = iter(repositories)
+    fetching = {}
+    classifying = {}
+    n_processed = 0
+    start_time = time.perf_counter()
+
+    classify_workers = classify_workers or os.cpu_count() or 1
+    max_classifying = 4 * classify_workers
+
+    # Worker processes are started while the download threads are running, so
+    # they are forked from a clean server process instead of the current one
+    # (forking a process while another thread holds a lock can deadlock the child).
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+    else:
+        context = multiprocessing.get_context()
+
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetcher, ProcessPoolExecutor(max_workers=classify_workers, mp_context=context) as classifier:
+
+        def schedule_downloads():
+            while len(fetching) < 2 * fetch_workers and len(classifying) < max_classifying:
+                repository_url = next(repositories, None)
+
+                if repository_url is None:
+                    return
+
+                fetching[fetcher.submit(download, repository_url)] = repository_url
+
+        schedule_downloads()
+
+        while fetching or classifying:
+            done, _ = wait(list(fetching) + list(classifying), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future in fetching:
+                    repository_url = fetching.pop(future)
+
+                    try:
+                        contributing_file = future.result()
+                    except Exception as exception:
+                        result = create_result(repository_url, error=str(exception) or type(exception).__name__)
+                    else:
+                        classifying[classifier.submit(count_predictions, contributing_file)] = repository_url
+                        continue
+                else:
+                    repository_url = classifying.pop(future)
+
+                    try:
+                        result = create_result(repository_url, counts=future.result())
+                    except Exception as exception:
+                        result = create_result(repository_url, error=str(exception) or type(exception).__name__)
+
+                writer.write(result)
+                n_processed += 1
+
+                if progress_interval and n_processed % progress_interval == 0:
+                    report_throughput(n_processed, time.perf_counter() - start_time)
+
+            schedule_downloads()
+
+    elapsed_time = time.perf_counter() - start_time
+
+    return n_processed, elapsed_time
+
+def report_throughput(n_processed, elapsed_time):
+    throughput = n_processed / elapsed_time if elapsed_time > 0 else 0
+    print('{} repositories classified in {:.1f}s ({:.2f} repos/sec)'.format(n_processed, elapsed_time, throughput), file=sys.stderr)
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Classifies the CONTRIBUTING files of a list of GitHub repositories.')
+    parser.add_argument('repositories', nargs='?', help="text file with one repository per line, CSV file with a 'Repository' column, or '-' for stdin (default with --local: every repository in the directory)")
+    parser.add_argument('--local', metavar='DIRECTORY', help="read the files from local clones, bare mirrors or archives in this directory instead of GitHub (see scripts/local_repositories.py)")
+    parser.add_argument('-o', '--output', default='-', help="output file (default: stdout)")
+    parser.add_argument('-f', '--format', choices=['csv', 'jsonl'], help="output format (default: inferred from the output file, or csv)")
+    parser.add_argument('--fetch-workers', type=int, default=8, help="maximum number of concurrent downloads (default: 8)")
+    parser.add_argument('--classify-workers', type=int, default=None, help="number of classification processes (default: number of CPUs)")
+    parser.add_argument('--progress', type=int, default=100, help="report throughput every N repositories (default: 100, 0 to disable)")
+    arguments = parser.parse_args(arguments)
+
+    # Served by this process only: the classification workers share its port.
+    metrics.start_metrics_exporter()
+    wait_for_rate_limit_reset()
+
+    if arguments.local:
+        download = functools.partial(read_local_contributing_file, arguments.local)
+
+        if arguments.repositories:
+            repositories = (repository.split('github.com/')[-1].strip('/') for repository in read_repositories(arguments.repositories))
+        else:
+            repositories = find_local_repositories(arguments.local)
+    elif arguments.repositories:
+        download = download_contributing_file
+        repositories = read_repositories(arguments.repositories)
+    else:
+        parser.error("the list of repositories is required without --local")
+
+    output_format = arguments.format or ('jsonl' if arguments.output.endswith(('.jsonl', '.json')) else 'csv')
+    stream = sys.stdout if arguments.output == '-' else open(arguments.output, 'w', encoding='utf-8', newline='')
+
+    try:
+        writer = JSONLinesWriter(stream) if output_format == 'jsonl' else CSVWriter(stream)
+        n_processed, elapsed_time = classify_repositories(repositories, writer,
+                                                          fetch_workers=arguments.fetch_workers,
+                                                          classify_workers=arguments.classify_workers,
+                                                          progress_interval=arguments.progress,
+                                                          download=download)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    if not arguments.progress or n_processed % arguments.progress != 0:
+        report_throughput(n_processed, elapsed_time)
+
+if __name__ == '__main__':
+    main()
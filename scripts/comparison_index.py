@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Precomputed statistics of the corpus of projects, used to compare a CONTRIBUTING file with other projects.
+
+The number of paragraphs per category of every project in
+resources/projects.csv is summarized in resources/projects_index.npz:
+
+    categories       names of the categories (the columns of projects.csv)
+    sorted_values    one sorted row of paragraph counts per category
+    means            mean of each category
+    percentiles      0th to 100th percentiles of each category
+    bin_counts       histograms of every category, one after the other
+    bin_edges        edges of the bins of every category, one after the other
+    bin_offsets      where the bins of each category start in bin_counts
+    source_hash      SHA-256 of the projects.csv file the index was built from
+    segmentation     segmentation of the CONTRIBUTING files counted in projects.csv
+                     ('lines' for the corpus of the study, see get_contributing.iter_paragraphs)
+
+Paragraph counts only compare between files segmented the same way, so the
+web application refuses to compare a file classified with another
+segmentation than the one of the index.
+
+The percentile rank of a project is found by binary search in the sorted
+counts, and the comparison chart is drawn from the histograms, so the web
+application neither downloads nor samples the corpus. When the index is
+missing, older than projects.csv or built by an older version, it is built
+in memory from projects.csv.
+
+Example:
+    python -m scripts.comparison_index
+"""
+
+import os
+import math
+import hashlib
+import argparse
+import numpy
+import pandas
+from functools import lru_cache
+from scripts.artifacts import resources_directory
+
+default_projects_path = os.path.join(resources_directory, 'projects.csv')
+default_index_path = os.path.join(resources_directory, 'projects_index.npz')
+
+# Arrays of an index (see the description above). Indexes built by older
+# versions miss some of them (e.g. segmentation), and are built again.
+index_arrays = ['categories', 'sorted_values', 'means', 'percentiles', 'bin_counts', 'bin_edges', 'bin_offsets', 'source_hash', 'segmentation']
+
+# Categories predicted by the classifier, in the order of projects.csv.
+categories = ['CF – Contribution flow', 'CT – Choose a task', 'TC – Talk to the community', 'BW – Build local workspace',
+              'DC – Deal with the code', 'SC – Submit the changes', 'No categories identified.']
+
+class ComparisonIndex:
+    def __init__(self, arrays):
+        """Wraps the arrays of an index built by build_comparison_index."""
+
+        self.categories = [str(category) for category in arrays['categories']]
+        self.sorted_values = arrays['sorted_values']
+        self.means = arrays['means']
+        self.percentiles = arrays['percentiles']
+        self.bin_counts = arrays['bin_counts']
+        self.bin_edges = arrays['bin_edges']
+        self.bin_offsets = arrays['bin_offsets']
+        self.source_hash = str(arrays['source_hash'])
+        self.segmentation = str(arrays['segmentation'])
+
+    def get_number_of_projects(self):
+        return self.sorted_values.shape[1]
+
+    def get_mean(self, category):
+        return float(self.means[self.categories.index(category)])
+
+    def get_median(self, category):
+        return float(self.percentiles[self.categories.index(category), 50])
+
+    def get_percentile_rank(self, category, value):
+        """Returns the percentage of projects with fewer paragraphs than `value` in a category."""
+
+        sorted_values = self.sorted_values[self.categories.index(category)]
+
+        return 100 * numpy.searchsorted(sorted_values, value, side='left') / len(sorted_values)
+
+    def get_histogram(self, category):
+        """Returns the number of projects in each bin of a category and the edges of the bins.
+
+        Bins include their left edge and exclude their right edge. The last
+        bin covers every value up to the largest one of the corpus.
+        """
+
+        position = self.categories.index(category)
+        start, end = self.bin_offsets[position], self.bin_offsets[position + 1]
+
+        # Each category has one more edge than bins.
+        return self.bin_counts[start:end], self.bin_edges[start + position:end + position + 1]
+
+def get_bin_edges(values, max_bins=20):
+    # Bins are a whole number of paragraphs wide. The long tail above the
+    # 99th percentile is grouped in the last bin.
+    upper_value = int(numpy.percentile(values, 99)) + 1
+    bin_width = max(1, math.ceil(upper_value / max_bins))
+    bin_edges = list(range(0, upper_value + bin_width, bin_width))
+
+    if values.max() >= bin_edges[-1]:
+        bin_edges.append(int(values.max()) + 1)
+
+    return numpy.array(bin_edges, dtype=numpy.int32)
+
+def build_comparison_index(projects_path=default_projects_path, segmentation='lines'):
+    """Computes the statistics of every category of the projects.
+
+    Args:
+        projects_path: Path of a CSV file (encoded in cp1252) with one row per
+            project and the number of paragraphs of each category in columns.
+        segmentation: Segmentation of the files the paragraphs were counted in
+            ('lines' or 'blocks').
+    Returns:
+        A dictionary of NumPy arrays, which can be saved with numpy.savez.
+    """
+
+    with open(projects_path, 'rb') as file:
+        content = file.read()
+
+    projects = pandas.read_csv(projects_path, encoding='cp1252')
+
+    sorted_values = numpy.sort(projects[categories].to_numpy(dtype=numpy.int32).T, axis=1)
+    bin_counts = []
+    bin_edges = []
+
+    for values in sorted_values:
+        edges = get_bin_edges(values)
+        bin_counts.append(numpy.histogram(values, bins=edges)[0])
+        bin_edges.append(edges)
+
+    return {'categories': numpy.array(categories),
+            'sorted_values': sorted_values,
+            'means': sorted_values.mean(axis=1),
+            'percentiles': numpy.percentile(sorted_values, numpy.arange(101), axis=1).T,
+            'bin_counts': numpy.concatenate(bin_counts).astype(numpy.int32),
+            'bin_edges': numpy.concatenate(bin_edges),
+            'bin_offsets': numpy.cumsum([0] + [len(counts) for counts in bin_counts]),
+            'source_hash': numpy.array(hashlib.sha256(content).hexdigest()),
+            'segmentation': numpy.array(segmentation)}
+
+def save_comparison_index(index_path=default_index_path, projects_path=default_projects_path, segmentation='lines'):
+    numpy.savez_compressed(index_path, **build_comparison_index(projects_path, segmentation))
+
+@lru_cache(maxsize=None)
+def get_comparison_index():
+    """Loads the comparison index of the projects, shared by every session of the application.
+
+    The paths of the index and of the projects can be changed with the
+    environment variables CONTRIBUTING_COMPARISON_INDEX and CONTRIBUTING_PROJECTS.
+    When the index is built in memory, the segmentation of the projects is
+    read from CONTRIBUTING_PROJECTS_SEGMENTATION ('lines' by default).
+    """
+
+    index_path = os.getenv('CONTRIBUTING_COMPARISON_INDEX', default_index_path)
+    projects_path = os.getenv('CONTRIBUTING_PROJECTS', default_projects_path)
+
+    if os.path.exists(index_path):
+        with numpy.load(index_path, allow_pickle=False) as arrays:
+            index = ComparisonIndex(dict(arrays)) if set(index_arrays) <= set(arrays.files) else None
+
+        if index is not None and not os.path.exists(projects_path):
+            return index
+
+        if index is not None:
+            with open(projects_path, 'rb') as file:
+                if hashlib.sha256(file.read()).hexdigest() == index.source_hash:
+                    return index
+
+    return ComparisonIndex(build_comparison_index(projects_path, os.getenv('CONTRIBUTING_PROJECTS_SEGMENTATION', 'lines')))
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Builds the comparison index of the projects from projects.csv.')
+    parser.add_argument('--projects', default=default_projects_path, help="CSV file with the predictions of each project (default: resources/projects.csv)")
+    parser.add_argument('-o', '--output', default=default_index_path, help="path of the index (default: resources/projects_index.npz)")
+    parser.add_argument('--segmentation', choices=['lines', 'blocks'], default='lines', help="segmentation of the files counted in the projects (default: lines)")
+    arguments = parser.parse_args(arguments)
+
+    save_comparison_index(arguments.output, arguments.projects, arguments.segmentation)
+    index = ComparisonIndex(dict(numpy.load(arguments.output, allow_pickle=False)))
+
+    print('{} projects ({} segmentation), {} bytes'.format(index.get_number_of_projects(), index.segmentation, os.path.getsize(arguments.output)))
+
+    for category in index.categories:
+        print('{:>28}: mean {:5.2f}, median {:3.0f}, 90th percentile {:3.0f}'.format(
+            category, index.get_mean(category), index.get_median(category), index.percentiles[index.categories.index(category), 90]))
+
+if __name__ == '__main__':
+    main()
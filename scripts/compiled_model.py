@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compiles the vectorizer, the feature selector and the classifier into a single linear model.
+
+The reference pipeline runs three pickled scikit-learn objects in sequence
+(TF-IDF vectorizer -> SelectPercentile -> OneVsRest LinearSVC). Since the
+classifier is linear, the three steps can be collapsed at load time into:
+
+    1. the vectorizer's analyzer (tokenization and n-grams) and idf weights;
+    2. a lookup table from each vocabulary term to its column among the
+       features kept by the selector (or -1, if the term was discarded);
+    3. one coefficient matrix with only the rows of the kept features.
+
+Each request is then a tokenization, a sparse lookup and a single matrix
+product. The idf weight of every vocabulary term is still kept, because
+the TF-IDF rows are L2-normalized over all the terms of the vocabulary,
+and not only over the terms kept by the selector.
+
+A compiled model is saved to a compressed .npz file, which is smaller and
+faster to load than the three pickled objects, and is loaded without
+unpickling anything. resources/compiled_model.npz ships with the
+application, and stores the SHA-256 of the three artifacts it was compiled
+from: when they change, it is no longer used until it is compiled again
+(see classify_content.get_compiled_classifier):
+
+    python -m scripts.compiled_model resources/compiled_model.npz
+"""
+
+import sys
+import json
+import hashlib
+import numpy
+from scipy import sparse
+from scripts import get_features
+
+# Artifacts compiled into the model, in the order of their hashes in source_hashes.
+source_artifacts = ('tf-idf.sav', 'feature_selector.sav', 'classification_model.sav')
+
+class CompiledClassifier:
+    def __init__(self, vectorizer_parameters, terms, idf, statistic_columns, heuristic_columns, coefficients, intercepts, classes, source_hashes=''):
+        """Creates a compiled classifier from its arrays. Use from_artifacts or load instead."""
+
+        self.source_hashes = source_hashes
+        self.vectorizer_parameters = vectorizer_parameters
+        self.terms = terms
+        self.idf = idf
+        self.statistic_columns = statistic_columns
+        self.heuristic_columns = heuristic_columns
+        self.coefficients = coefficients
+        self.intercepts = intercepts
+        self.classes = classes
+
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        # Only the analyzer of an unfitted vectorizer is needed, which is built
+        # from its parameters, without the fitted vocabulary.
+        self.analyzer = TfidfVectorizer(**vectorizer_parameters).build_analyzer()
+        self.vocabulary = dict(zip(terms, range(len(terms))))
+
+        # Rows of the coefficient matrix for statistic and heuristic features.
+        n_statistic_features = int((statistic_columns >= 0).sum())
+        self.statistic_coefficients = coefficients[:n_statistic_features]
+        self.heuristic_coefficients = coefficients[n_statistic_features:]
+
+    @classmethod
+    def from_artifacts(cls, vectorizer, selector, model):
+        """Compiles the fitted vectorizer, feature selector and classifier.
+
+        Args:
+            vectorizer: Fitted TfidfVectorizer (resources/tf-idf.sav).
+            selector: Fitted SelectPercentile (resources/feature_selector.sav).
+            model: Fitted linear classifier (resources/classification_model.sav).
+        Returns:
+            A CompiledClassifier with the same predictions as the reference pipeline.
+        """
+
+        if vectorizer.sublinear_tf or not vectorizer.use_idf or vectorizer.norm != 'l2':
+            raise ValueError('Only TF-IDF vectorizers with raw term frequencies, idf and l2 norm can be compiled.')
+
+        terms = vectorizer.get_feature_names_out()
+        n_terms = len(terms)
+        selected_features = selector.get_support(indices=True)
+
+        # Selected columns are sorted, statistic features come first in the feature matrix.
+        selected_statistic_features = selected_features[selected_features < n_terms]
+        selected_heuristic_features = selected_features[selected_features >= n_terms] - n_terms
+
+        statistic_columns = numpy.full(n_terms, -1, dtype=numpy.int32)
+        statistic_columns[selected_statistic_features] = numpy.arange(len(selected_statistic_features), dtype=numpy.int32)
+
+        if hasattr(model, 'estimators_'):
+            if model.label_binarizer_.y_type_ != 'multiclass':
+                raise ValueError('Only multiclass one-vs-rest classifiers can be compiled.')
+
+            coefficients = numpy.vstack([estimator.coef_.ravel() for estimator in model.estimators_]).T
+            intercepts = numpy.array([estimator.intercept_[0] for estimator in model.estimators_])
+        else:
+            coefficients = model.coef_.T
+            intercepts = model.intercept_
+
+        vectorizer_parameters = {parameter: value for parameter, value in vectorizer.get_params().items()
+                                 if parameter in ('lowercase', 'strip_accents', 'stop_words', 'token_pattern', 'ngram_range', 'analyzer')}
+
+        return cls(vectorizer_parameters,
+                   terms=list(terms),
+                   idf=numpy.asarray(vectorizer.idf_, dtype=numpy.float64),
+                   statistic_columns=statistic_columns,
+                   heuristic_columns=selected_heuristic_features.astype(numpy.int32),
+                   coefficients=numpy.ascontiguousarray(coefficients, dtype=numpy.float64),
+                   intercepts=numpy.asarray(intercepts, dtype=numpy.float64),
+                   classes=numpy.asarray(model.classes_))
+
+    @classmethod
+    def load(cls, path):
+        with numpy.load(path, allow_pickle=False) as arrays:
+            vectorizer_parameters = json.loads(str(arrays['vectorizer_parameters']))
+            vectorizer_parameters['ngram_range'] = tuple(vectorizer_parameters['ngram_range'])
+
+            return cls(vectorizer_parameters,
+                       terms=str(arrays['terms']).split('\n'),
+                       idf=arrays['idf'],
+                       statistic_columns=arrays['statistic_columns'],
+                       heuristic_columns=arrays['heuristic_columns'],
+                       coefficients=arrays['coefficients'],
+                       intercepts=arrays['intercepts'],
+                       classes=arrays['classes'],
+                       source_hashes=str(arrays['source_hashes']) if 'source_hashes' in arrays else '')
+
+    def save(self, path):
+        numpy.savez_compressed(path,
+                               vectorizer_parameters=json.dumps(self.vectorizer_parameters),
+                               terms='\n'.join(self.terms),
+                               idf=self.idf,
+                               statistic_columns=self.statistic_columns,
+                               heuristic_columns=self.heuristic_columns,
+                               coefficients=self.coefficients,
+                               intercepts=self.intercepts,
+                               classes=self.classes,
+                               source_hashes=self.source_hashes)
+
+    def transform(self, paragraphs):
+        """Converts paragraphs into the TF-IDF features kept by the selector.
+
+        Args:
+            paragraphs: List of strings.
+        Returns:
+            A CSR matrix with one row per paragraph and one column per selected statistic feature.
+        """
+
+        vocabulary = self.vocabulary
+        indices = []
+        indptr = [0]
+
+        for paragraph in paragraphs:
+            for term in self.analyzer(paragraph):
+                index = vocabulary.get(term)
+
+                if index is not None:
+                    indices.append(index)
+
+            indptr.append(len(indices))
+
+        n_paragraphs = len(paragraphs)
+        indices = numpy.asarray(indices, dtype=numpy.int32)
+        counts = sparse.csr_matrix((numpy.ones(len(indices)), indices, indptr), shape=(n_paragraphs, len(self.terms)))
+        counts.sum_duplicates()
+
+        # L2 norm of each TF-IDF row, over all the terms of the vocabulary.
+        rows = numpy.repeat(numpy.arange(n_paragraphs), numpy.diff(counts.indptr))
+        weights = counts.data * self.idf[counts.indices]
+        norms = numpy.sqrt(numpy.bincount(rows, weights=weights ** 2, minlength=n_paragraphs))
+        weights = weights / norms[rows]
+
+        # Keeps only the terms selected by the feature selector.
+        columns = self.statistic_columns[counts.indices]
+        selected = columns >= 0
+
+        return sparse.csr_matrix((weights[selected], (rows[selected], columns[selected])),
+                                 shape=(n_paragraphs, len(self.statistic_coefficients)))
+
+    def decision_function(self, paragraphs):
+        heuristic_features = get_features.create_heuristic_features(paragraphs)[:, self.heuristic_columns]
+
+        return (self.transform(paragraphs) @ self.statistic_coefficients
+                + heuristic_features @ self.heuristic_coefficients
+                + self.intercepts)
+
+    def predict(self, paragraphs):
+        """Predicts the category of each paragraph.
+
+        Args:
+            paragraphs: List of strings.
+        Returns:
+            An array with one category per paragraph.
+        """
+
+        scores = numpy.asarray(self.decision_function(paragraphs))
+
+        # As in OneVsRestClassifier, ties are resolved in favour of the last class.
+        n_classes = scores.shape[1]
+        predictions = n_classes - 1 - numpy.argmax(scores[:, ::-1], axis=1)
+
+        return self.classes[predictions]
+
+def get_source_hashes():
+    """Returns the SHA-256 of the local artifacts a compiled model is built from, or None if one is only available remotely."""
+
+    from scripts.artifacts import get_artifact_path
+
+    hashes = []
+
+    for name in source_artifacts:
+        path = get_artifact_path(name)
+
+        if path is None:
+            return None
+
+        with open(path, 'rb') as file:
+            hashes.append(hashlib.sha256(file.read()).hexdigest())
+
+    return ':'.join(hashes)
+
+def main(arguments=None):
+    arguments = sys.argv[1:] if arguments is None else arguments
+
+    if len(arguments) != 1:
+        print('Usage: python -m scripts.compiled_model <output.npz>', file=sys.stderr)
+        sys.exit(1)
+
+    from scripts.classify_content import get_classification_model
+
+    compiled_classifier = CompiledClassifier.from_artifacts(get_features.get_tf_idf_vectorizer(),
+                                                            get_features.get_feature_selector(),
+                                                            get_classification_model())
+    compiled_classifier.source_hashes = get_source_hashes()
+    compiled_classifier.save(arguments[0])
+
+if __name__ == '__main__':
+    main()
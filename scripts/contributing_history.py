@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Classifies every revision of the CONTRIBUTING file of a repository.
+
+The revisions are read from a local clone or bare mirror (see
+scripts/local_repositories.py), following the first parent of each commit
+from the first version of the file to HEAD, or from the commits API of
+GitHub. The result is a time series with the number of paragraphs per
+category of each revision, written to a CSV or JSONL file.
+
+Consecutive revisions of a file share most of their text, so the work is
+shared between them:
+
+    - the file is converted chunk by chunk, and the chunks that did not
+      change since a previous revision are not converted again;
+    - every distinct paragraph of the history is classified once, in a
+      single batch, and unchanged paragraphs reuse its prediction.
+
+Classifying hundreds of revisions thus costs little more than classifying
+the paragraphs that were ever written in the file.
+
+Example:
+    python -m scripts.contributing_history corpus/owner/name -o history.csv
+    python -m scripts.contributing_history https://github.com/owner/name --max-revisions 100
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+import subprocess
+import collections
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+import scripts.scrap_github_api as scraper
+import scripts.metrics as metrics
+from scripts.get_contributing import (download_contributing_file, parse_repository_from_url, get_contributing_path,
+                                      iter_paragraphs)
+from scripts.classify_content import predict_paragraphs
+from scripts.classify_repositories import categories
+from scripts.local_repositories import get_repository_type, get_repository_path, choose_contributing_path
+from scripts.rate_limit import wait_for_rate_limit_reset
+
+Revision = collections.namedtuple('Revision', ['commit', 'date', 'author', 'subject', 'path', 'contributing_file'])
+
+output_columns = (['Revision', 'Date', 'Author', 'Subject', 'Path', '# Paragraphs', '# Changed Paragraphs'] + categories
+                  + ['# Categories Identified', 'Categories Added', 'Categories Removed'])
+
+# Locations of the CONTRIBUTING files that GitHub recognizes (see local_repositories.local_contributing_paths).
+contributing_pathspecs = [':(glob,icase)CONTRIBUTING*', ':(glob,icase).github/CONTRIBUTING*', ':(glob,icase)docs/CONTRIBUTING*']
+
+def read_local_revisions(path, max_revisions=None):
+    """Reads the revisions of the CONTRIBUTING file of a local copy of a repository.
+
+    The history is read with two git commands, whatever the number of
+    revisions: the log of the commits that changed a CONTRIBUTING file, with
+    the blobs they created, and a batch read of those blobs. A revision is
+    recorded whenever the file GitHub would show changes, including when it
+    is moved or removed (its path and content are then None).
+
+    Args:
+        path: Path of a working copy or a bare mirror.
+        max_revisions: Optional number of most recent revisions to read.
+    Returns:
+        A list of Revision tuples, from the oldest to the most recent.
+    """
+
+    repository_type = get_repository_type(path)
+
+    if repository_type == 'working-copy':
+        git_directory = os.path.join(path, '.git')
+    elif repository_type == 'bare':
+        git_directory = path
+    else:
+        raise TypeError("The history of " + path + " cannot be read: only working copies and bare mirrors have one.")
+
+    log = subprocess.run(['git', '-c', 'core.quotePath=false', '--git-dir', git_directory, 'log', '--first-parent', '-m', '--raw', '--no-abbrev',
+                          '--no-renames', '--reverse', '--format=%x1e%H%x1f%ct%x1f%an%x1f%s', 'HEAD', '--'] + contributing_pathspecs,
+                         capture_output=True, check=False)
+
+    if log.returncode != 0:
+        raise TypeError("The history of " + path + " cannot be read: " + log.stderr.decode('utf-8', errors='replace').strip())
+
+    revisions = []
+    blobs = {} # Path of every CONTRIBUTING file of the current commit -> blob
+    previous_file = None
+
+    for entry in log.stdout.decode('utf-8', errors='replace').split('\x1e')[1:]:
+        header, *changes = entry.strip('\n').split('\n')
+        commit, timestamp, author, subject = header.split('\x1f', 3)
+
+        # Lines such as ":100644 100644 <old blob> <new blob> M\tCONTRIBUTING.md"
+        for change in changes:
+            if not change.startswith(':'):
+                continue
+
+            metadata, file_path = change[1:].split('\t', 1)
+            _, new_mode, _, new_blob, status = metadata.split(' ')
+
+            if status == 'D' or new_mode not in ('100644', '100755'):
+                blobs.pop(file_path, None)
+            else:
+                blobs[file_path] = new_blob
+
+        contributing_path = choose_contributing_path(blobs)
+        current_file = (contributing_path, blobs.get(contributing_path))
+
+        if current_file == previous_file or (previous_file is None and contributing_path is None):
+            continue
+
+        revisions.append(Revision(commit, format_timestamp(int(timestamp)), author, subject, contributing_path, current_file[1]))
+        previous_file = current_file
+
+    if max_revisions:
+        revisions = revisions[-max_revisions:]
+
+    contents = read_blobs(git_directory, {revision.contributing_file for revision in revisions if revision.contributing_file})
+
+    return [revision._replace(contributing_file=contents.get(revision.contributing_file)) for revision in revisions]
+
+def read_blobs(git_directory, blobs):
+    """Reads the content of many blobs with a single git process.
+
+    Returns:
+        A dictionary with the decoded content of each blob.
+    """
+
+    blobs = sorted(blobs)
+
+    if not blobs:
+        return {}
+
+    batch = subprocess.run(['git', '--git-dir', git_directory, 'cat-file', '--batch'],
+                           input=''.join(blob + '\n' for blob in blobs).encode('ascii'), capture_output=True, check=True)
+
+    contents = {}
+    output = batch.stdout
+    position = 0
+
+    # Each blob is written as "<blob> blob <size>\n<content>\n".
+    for blob in blobs:
+        header_end = output.index(b'\n', position)
+        header = output[position:header_end].decode('ascii').split(' ')
+
+        if header[1] == 'missing':
+            position = header_end + 1
+            continue
+
+        size = int(header[2])
+        contents[blob] = output[header_end + 1:header_end + 1 + size].decode('utf-8', errors='replace')
+        position = header_end + 1 + size + 1
+
+    return contents
+
+def read_github_revisions(repository_url, max_revisions=None, download_workers=8):
+    """Reads the revisions of the CONTRIBUTING file of a repository hosted on GitHub.
+
+    The commits that changed the file are listed with the commits API (100
+    per request), and each revision is downloaded from raw.githubusercontent.com,
+    which does not use the quota of the API. The commits API does not follow
+    renames, so only the revisions at the current path of the file are read.
+
+    Args:
+        repository_url: String representing the URL of the repository on GitHub.
+        max_revisions: Optional number of most recent revisions to read.
+        download_workers: Maximum number of concurrent downloads.
+    Returns:
+        A list of Revision tuples, from the oldest to the most recent.
+    """
+
+    repository_owner, repository_name = parse_repository_from_url(repository_url)
+    github_api = scraper.Create()
+    contributing_path = find_contributing_path(github_api, repository_url)
+    commits_url = scraper.github_api_url + '/repos/{}/{}/commits'.format(repository_owner, repository_name)
+
+    commits = []
+    page = 1
+
+    while not max_revisions or len(commits) < max_revisions:
+        with metrics.span('github_commits'):
+            page_commits = github_api.request(commits_url, parameters={'path': contributing_path, 'per_page': 100, 'page': page})
+
+        commits += page_commits
+        page += 1
+
+        if len(page_commits) < 100:
+            break
+
+    # Commits are listed from the most recent one.
+    commits = list(reversed(commits[:max_revisions] if max_revisions else commits))
+
+    def download(commit):
+        try:
+            with metrics.span('github_download'):
+                return github_api.request(scraper.github_raw_url + '/{}/{}/{}/{}'.format(repository_owner, repository_name, commit['sha'], contributing_path),
+                                          file_type='text')
+        except scraper.RequestError as exception:
+            # The commit removed the file, other errors would give a wrong history.
+            if exception.status_code == 404:
+                return None
+
+            raise
+
+    with ThreadPoolExecutor(max_workers=download_workers) as executor:
+        contributing_files = list(executor.map(download, commits))
+
+    revisions = []
+
+    for commit, contributing_file in zip(commits, contributing_files):
+        revisions.append(Revision(commit['sha'], commit['commit']['committer']['date'], commit['commit']['author']['name'],
+                                  commit['commit']['message'].split('\n', 1)[0], contributing_path if contributing_file is not None else None,
+                                  contributing_file))
+
+    return revisions
+
+def find_contributing_path(github_api, repository_url):
+    """Returns the path of the CONTRIBUTING file of a repository hosted on GitHub."""
+
+    repository_owner, repository_name = parse_repository_from_url(repository_url)
+
+    # Downloading the file remembers where it was found (see get_contributing.download_raw_contributing_file).
+    download_contributing_file(repository_url)
+    contributing_path = get_contributing_path(repository_owner, repository_name)
+
+    if contributing_path:
+        return contributing_path
+
+    # The file was only found through the community profile, whose description has its path.
+    community_profile = github_api.request(scraper.github_api_url + '/repos/{}/{}/community/profile'.format(repository_owner, repository_name))
+
+    return github_api.request(community_profile['files']['contributing']['url'])['path']
+
+def format_timestamp(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def classify_revisions(revisions):
+    """Counts the paragraphs per category of every revision of a CONTRIBUTING file.
+
+    The chunks of Markdown shared by several revisions are converted once,
+    and the distinct paragraphs of all the revisions are classified in a
+    single batch, so each paragraph is only classified once, in the first
+    revision where it appears.
+
+    Args:
+        revisions: List of Revision tuples, from the oldest to the most recent.
+    Returns:
+        A list with one dictionary per revision, with the columns of output_columns.
+    """
+
+    chunk_cache = {}
+    paragraphs_per_revision = []
+
+    with metrics.span('markdown'):
+        for revision in revisions:
+            paragraphs_per_revision.append([paragraph.text for paragraph in iter_paragraphs(revision.contributing_file or '', chunk_cache=chunk_cache)])
+
+    distinct_paragraphs = list(dict.fromkeys(paragraph for paragraphs in paragraphs_per_revision for paragraph in paragraphs))
+    predictions = dict(zip(distinct_paragraphs, predict_paragraphs(distinct_paragraphs))) if distinct_paragraphs else {}
+
+    results = []
+    previous_paragraphs = set()
+    previous_categories = set()
+
+    for revision, paragraphs in zip(revisions, paragraphs_per_revision):
+        counter = collections.Counter(predictions[paragraph] for paragraph in paragraphs)
+        identified_categories = {category for category in categories[:-1] if counter[category] > 0}
+
+        result = {'Revision': revision.commit, 'Date': revision.date, 'Author': revision.author, 'Subject': revision.subject,
+                  'Path': revision.path or '', '# Paragraphs': len(paragraphs),
+                  '# Changed Paragraphs': sum(paragraph not in previous_paragraphs for paragraph in paragraphs)}
+        result.update({category: counter[category] for category in categories})
+        result['# Categories Identified'] = len(identified_categories)
+        result['Categories Added'] = '; '.join(category for category in categories if category in identified_categories - previous_categories)
+        result['Categories Removed'] = '; '.join(category for category in categories if category in previous_categories - identified_categories)
+
+        results.append(result)
+        previous_paragraphs = set(paragraphs)
+        previous_categories = identified_categories
+
+    return results
+
+def write_results(results, stream, output_format='csv'):
+    if output_format == 'jsonl':
+        for result in results:
+            stream.write(json.dumps(result, ensure_ascii=False) + '\n')
+    else:
+        writer = csv.DictWriter(stream, fieldnames=output_columns)
+        writer.writeheader()
+        writer.writerows(results)
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('repository', help="path of a local clone or bare mirror, or a GitHub repository (URL or owner/name)")
+    parser.add_argument('--local', metavar='DIRECTORY', help="read the repository from the local copies in this directory (see scripts/local_repositories.py)")
+    parser.add_argument('-o', '--output', default='-', help="output file (default: stdout)")
+    parser.add_argument('-f', '--format', choices=['csv', 'jsonl'], help="output format (default: inferred from the output file, or csv)")
+    parser.add_argument('--max-revisions', type=int, help="only classify the N most recent revisions")
+    arguments = parser.parse_args(arguments)
+
+    wait_for_rate_limit_reset()
+    start_time = time.perf_counter()
+
+    if arguments.local:
+        revisions = read_local_revisions(get_repository_path(arguments.local, arguments.repository.split('github.com/')[-1].strip('/')), arguments.max_revisions)
+    elif get_repository_type(arguments.repository):
+        revisions = read_local_revisions(arguments.repository, arguments.max_revisions)
+    else:
+        repository_url = arguments.repository if 'github.com' in arguments.repository else 'https://github.com/' + arguments.repository.strip('/')
+        revisions = read_github_revisions(repository_url, arguments.max_revisions)
+
+    read_time = time.perf_counter() - start_time
+    results = classify_revisions(revisions)
+    classify_time = time.perf_counter() - start_time - read_time
+
+    output_format = arguments.format or ('jsonl' if arguments.output.endswith(('.jsonl', '.json')) else 'csv')
+    stream = sys.stdout if arguments.output == '-' else open(arguments.output, 'w', encoding='utf-8', newline='')
+
+    try:
+        write_results(results, stream, output_format)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    print('{} revisions read in {:.1f}s and classified in {:.1f}s'.format(len(results), read_time, classify_time), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -1,51 +1,218 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
+import re
+import html
+import threading
+import collections
+import markdown
 from io import StringIO
 from markdown import Markdown
+from markdown.blockprocessors import ReferenceProcessor
+from markdown.htmlparser import HTMLExtractor
 from urllib.parse import urlparse
 from urllib.error import URLError
+from functools import lru_cache
+from cachetools import LRUCache
+from concurrent.futures import ThreadPoolExecutor
 import scripts.scrap_github_api as scraper
+import scripts.metrics as metrics
+
+raw_contributing_url = scraper.github_raw_url + '/{}/{}/HEAD/{}'
+
+# Locations of the CONTRIBUTING file, in the order of precedence used by GitHub.
+contributing_paths = ['.github/CONTRIBUTING.md', 'CONTRIBUTING.md', 'docs/CONTRIBUTING.md',
+                      '.github/CONTRIBUTING.rst', 'CONTRIBUTING.rst', 'docs/CONTRIBUTING.rst']
+
+# Path where the CONTRIBUTING file of each repository was found, or an empty
+# string if it was only found through the community profile.
+contributing_path_cache = LRUCache(maxsize=4096)
+contributing_path_lock = threading.Lock()
 
 def get_contributing_file(repository_url):
     """Scraps the text in a CONTRIBUTING file of a repository hosted on GitHub.
 
     Args:
-        owner: String representing the organization or user owner of the repository.
-        name: String representing the repository name.
+        repository_url: String representing the URL of the repository on GitHub.
     Returns:
         A list of paragraphs containing the text content of the documentation file.
     """
 
+    return convert_contributing_file(download_contributing_file(repository_url))
+
+def download_contributing_file(repository_url):
+    """Downloads the raw CONTRIBUTING file of a repository hosted on GitHub.
+
+    Args:
+        repository_url: String representing the URL of the repository on GitHub.
+    Returns:
+        A string with the raw content (usually Markdown) of the documentation file.
+    """
+
     repository_owner, repository_name = parse_repository_from_url(repository_url)
 
     github_api = scraper.Create()
 
+    with metrics.span('github_raw'):
+        contributing_file = download_raw_contributing_file(github_api, repository_owner, repository_name)
+
+    if contributing_file is not None:
+        return contributing_file
+
+    requests = iter_community_profile_requests(repository_owner, repository_name)
+
     try:
-        # The community profile is used to get documentation resources of a repository. 
-        # The definition of community profile is available at the API documentation:
-        # developer.github.com/v3/repos/community.
-        community_profile_url = 'https://api.github.com/repos/{}/{}/community/profile'.format(repository_owner,repository_name)
-        community_profile = github_api.request(community_profile_url)
-        
-        # From the community profile, we get the path where the description of the CONTRIBUTING file
-        # is located. Different projects may define a CONTRIBUTING file in different ways (e.g. CONTRIBUTING.md, CONTRIBUTING.rst),
-        # and that's why we take this ellaborated approach.
-        contributing_url = community_profile['files']['contributing']['url']
-        contributing_description = github_api.request(contributing_url)
-        
-        # From the description of the CONTRIBUTING file, we use the download URL to get the raw version of it.
-        contributing_download_url = contributing_description['download_url']
-        contributing_file = github_api.request(contributing_download_url, file_type='text')
-    except TypeError as e:
-        raise TypeError("The community profile of the requested project does not contain a CONTRIBUTING.md file.")
-    except Exception as e:
-        raise Exception(e)
-
-    escaped_contributing_file = escape_markdown_from_file(contributing_file)
-    paragraphs = escaped_contributing_file.splitlines()
-
-    return paragraphs
+        url, file_type, stage = next(requests)
+
+        while True:
+            with metrics.span(stage):
+                response = github_api.request(url, file_type=file_type)
+
+            url, file_type, stage = requests.send(response)
+    except StopIteration as stop:
+        return stop.value
+    except Exception as exception:
+        raise get_community_profile_error(exception)
+
+def iter_community_profile_requests(repository_owner, repository_name):
+    """Generates the chain of requests that downloads a CONTRIBUTING file through the community profile.
+
+    The requests are made by the caller, synchronously (download_contributing_file)
+    or not (scripts/async_github_api.py), which sends the response of each
+    request back into the generator.
+
+    Yields:
+        Tuples with the URL, the file type ('json' or 'text') and the metrics stage of each request.
+    Returns:
+        The raw content of the CONTRIBUTING file.
+    """
+
+    # The community profile is used to get documentation resources of a repository. 
+    # The definition of community profile is available at the API documentation:
+    # developer.github.com/v3/repos/community.
+    community_profile_url = scraper.github_api_url + '/repos/{}/{}/community/profile'.format(repository_owner,repository_name)
+    community_profile = yield community_profile_url, 'json', 'github_community_profile'
+
+    # From the community profile, we get the path where the description of the CONTRIBUTING file
+    # is located. Different projects may define a CONTRIBUTING file in different ways (e.g. CONTRIBUTING.md, CONTRIBUTING.rst),
+    # and that's why we take this ellaborated approach.
+    contributing_url = community_profile['files']['contributing']['url']
+    contributing_description = yield contributing_url, 'json', 'github_contents'
+
+    # From the description of the CONTRIBUTING file, we use the download URL to get the raw version of it.
+    contributing_download_url = contributing_description['download_url']
+    contributing_file = yield contributing_download_url, 'text', 'github_download'
+
+    remember_contributing_path(repository_owner, repository_name, '')
+
+    return contributing_file
+
+def get_community_profile_error(exception):
+    """Returns the exception raised when the chain of requests of the community profile fails."""
+
+    if isinstance(exception, TypeError):
+        return TypeError("The community profile of the requested project does not contain a CONTRIBUTING.md file.")
+
+    return Exception(exception)
+
+def download_raw_contributing_file(github_api, repository_owner, repository_name):
+    """Downloads the CONTRIBUTING file directly from its most likely locations.
+
+    Most repositories keep their CONTRIBUTING file in one of a few paths, which
+    are requested concurrently from raw.githubusercontent.com. When one of
+    them exists, the file is downloaded with a single round trip and without
+    using the quota of the GitHub API. The path that was found is remembered,
+    so the next lookups of the repository only request that path.
+
+    Set the environment variable GITHUB_RAW_FAST_PATH to 0 to disable it.
+
+    Args:
+        github_api: Instance of scrap_github_api.Create.
+        repository_owner: Owner of the repository.
+        repository_name: Name of the repository.
+    Returns:
+        A string with the raw content of the file, or None if it was not found
+        (the community profile must be used instead).
+    """
+
+    def download(path):
+        try:
+            return github_api.request(raw_contributing_url.format(repository_owner, repository_name, path), file_type='text')
+        except Exception:
+            return None
+
+    for paths in iter_raw_contributing_paths(repository_owner, repository_name):
+        futures = [get_raw_file_executor().submit(download, path) for path in paths]
+        contributing_file = find_raw_contributing_file(repository_owner, repository_name, paths, [future.result() for future in futures])
+
+        if contributing_file is not None:
+            return contributing_file
+
+    return None
+
+def iter_raw_contributing_paths(repository_owner, repository_name):
+    """Generates the paths of the CONTRIBUTING file to request from raw.githubusercontent.com.
+
+    See download_raw_contributing_file. The paths of each list are requested
+    concurrently, and the next list is only needed if none of them exists.
+
+    Yields:
+        Lists of paths, in order of precedence.
+    """
+
+    if os.getenv('GITHUB_RAW_FAST_PATH', '1') == '0':
+        return
+
+    remembered_path = get_contributing_path(repository_owner, repository_name)
+
+    if remembered_path == '':
+        return
+
+    if remembered_path is not None:
+        yield [remembered_path]
+
+        # The file was moved, so every location is tried again.
+        forget_contributing_path(repository_owner, repository_name)
+
+    yield contributing_paths
+
+def find_raw_contributing_file(repository_owner, repository_name, paths, contributing_files):
+    """Returns the file of the first path that exists (None for the others), and remembers its path."""
+
+    # The first path in order of precedence that exists wins, as in GitHub.
+    for path, contributing_file in zip(paths, contributing_files):
+        if contributing_file is not None:
+            remember_contributing_path(repository_owner, repository_name, path)
+            return contributing_file
+
+    return None
+
+@lru_cache(maxsize=None)
+def get_raw_file_executor():
+    # Shared by every lookup, enough to try every location of a few repositories at once.
+    return ThreadPoolExecutor(max_workers=4 * len(contributing_paths))
+
+def get_contributing_path(repository_owner, repository_name):
+    with contributing_path_lock:
+        return contributing_path_cache.get((repository_owner.lower(), repository_name.lower()))
+
+def remember_contributing_path(repository_owner, repository_name, path):
+    with contributing_path_lock:
+        contributing_path_cache[(repository_owner.lower(), repository_name.lower())] = path
+
+def forget_contributing_path(repository_owner, repository_name):
+    with contributing_path_lock:
+        contributing_path_cache.pop((repository_owner.lower(), repository_name.lower()), None)
+
+def convert_contributing_file(contributing_file):
+    """Converts a raw CONTRIBUTING file into a list of plain-text paragraphs.
+
+    Empty paragraphs are not included (see iter_paragraphs).
+    """
+
+    with metrics.span('markdown'):
+        return [paragraph.text for paragraph in iter_paragraphs(contributing_file)]
 
 def parse_repository_from_url(repository_url):
     path_elements = (urlparse(repository_url).path).split('/')
@@ -67,6 +234,172 @@ def markdown_to_plain_text(element, stream=None):
 
     return stream.getvalue()
 
+class PlainTextMarkdown(Markdown):
+    """Markdown converter whose output is plain text instead of HTML.
+
+    The plain output format is registered in the subclass, so the formats of
+    the Markdown class (used by other libraries, e.g. Streamlit) are not changed.
+    """
+
+    output_formats = dict(Markdown.output_formats, plain=markdown_to_plain_text)
+
+    def __init__(self):
+        super().__init__(output_format='plain')
+        self.stripTopLevelTags = False
+
+    def convert_chunk(self, chunk):
+        """Converts a chunk of a document, keeping the references of the document.
+
+        Unlike convert, the state of the converter is not reset, and the
+        output is not stripped, so the conversion of consecutive chunks gives
+        the same lines as the conversion of the whole document.
+        """
+
+        return self.postprocess(self.serializer(self.parse_chunk(chunk)))
+
+    def convert_chunk_into_blocks(self, chunk):
+        """Converts a chunk of a document into the plain text of each of its blocks.
+
+        Paragraphs, headings, list items and code blocks are returned as
+        single blocks, with their lines joined by spaces. Fenced code blocks
+        are not parsed by Markdown, so they are kept whole, without the fences.
+        """
+
+        blocks = []
+
+        for is_code, lines in split_code_fences(chunk.split('\n')):
+            if is_code:
+                blocks.append('\n'.join(lines))
+            else:
+                root = self.parse_chunk('\n'.join(lines))
+                blocks += [self.postprocess(block) for block in iter_block_texts(root)]
+
+        blocks = [' '.join(line.strip() for line in block.splitlines() if line.strip()) for block in blocks]
+
+        return [block for block in blocks if block]
+
+    def parse_chunk(self, chunk):
+        self.htmlStash.reset()
+        lines = chunk.split('\n')
+
+        for preprocessor in self.preprocessors:
+            lines = preprocessor.run(lines)
+
+        root = self.parser.parseDocument(lines).getroot()
+
+        for treeprocessor in self.treeprocessors:
+            new_root = treeprocessor.run(root)
+
+            if new_root is not None:
+                root = new_root
+
+        return root
+
+    def postprocess(self, output):
+        for postprocessor in self.postprocessors:
+            output = postprocessor.run(output)
+
+        return output
+
+list_tags = ('ul', 'ol')
+container_tags = ('blockquote', 'div')
+
+def iter_block_texts(element):
+    """Yields the plain text of each block (paragraph, heading, list item, code block) inside an element.
+
+    Block quotes are not blocks themselves: their content is split too. Lists
+    nested in a list item are split into their own items.
+    """
+
+    for child in element:
+        if child.tag in list_tags:
+            for item in child:
+                yield from iter_list_item_texts(item)
+        elif child.tag in container_tags:
+            yield from iter_block_texts(child)
+        else:
+            yield get_element_text(child)
+
+def iter_list_item_texts(item):
+    text = [item.text or '']
+    nested_lists = []
+
+    for child in item:
+        if child.tag in list_tags:
+            nested_lists.append(child)
+            text.append(child.tail or '')
+        else:
+            text.append(markdown_to_plain_text(child))
+
+    yield ''.join(text)
+
+    for nested_list in nested_lists:
+        for nested_item in nested_list:
+            yield from iter_list_item_texts(nested_item)
+
+def get_element_text(element):
+    # Same as markdown_to_plain_text, without the text that follows the element.
+    return (element.text or '') + ''.join(markdown_to_plain_text(child) for child in element)
+
+fence_pattern = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+
+def split_code_fences(lines):
+    """Splits the lines of a chunk at its fenced code blocks (``` or ~~~).
+
+    Yields:
+        Tuples (is_code, lines), with the lines of the code blocks without their fences.
+    """
+
+    fence = None
+    part = []
+
+    for line in lines:
+        next_fence = get_code_fence(line, fence)
+
+        if fence is None and next_fence is not None:
+            if part:
+                yield False, part
+
+            part = []
+        elif fence is not None and next_fence is None:
+            yield True, part
+            part = []
+        else:
+            part.append(line)
+
+        fence = next_fence
+
+    if part:
+        # Unclosed fences run until the end of the chunk.
+        yield fence is not None, part
+
+def get_code_fence(line, fence):
+    """Returns the fence that is open after a line, given the fence open before it (or None)."""
+
+    match = fence_pattern.match(line)
+
+    if fence is None and match and not (match.group(1)[0] == '`' and '`' in line[match.end():]):
+        return match.group(1)
+
+    if fence is not None and match and match.group(1).startswith(fence) and not line[match.end():].strip():
+        return None
+
+    return fence
+
+converter_storage = threading.local()
+
+def get_markdown_converter():
+    """Returns the plain-text converter of the current thread, reset for a new document.
+
+    Building a converter registers every processor of Markdown, which is more
+    expensive than converting a short file, so each thread reuses its own.
+    """
+
+    if not hasattr(converter_storage, 'converter'):
+        converter_storage.converter = PlainTextMarkdown()
+
+    return converter_storage.converter.reset()
+
 def escape_markdown_from_file(contributing_file):
     """ Escape the markdown syntax and leave only plain-text.
 
@@ -78,8 +411,231 @@ def escape_markdown_from_file(contributing_file):
     to plain-text. It required the developer to have a build of c-mark-gfm installed locally, which could be problematic.
     Hopefully, this solution will have the same effect as c-mark-gfm. Thanks again Pavel!
     """
-    Markdown.output_formats["plain"] = markdown_to_plain_text
-    converter = Markdown(output_format="plain")
-    converter.stripTopLevelTags = False
 
-    return converter.convert(contributing_file)
\ No newline at end of file
+    return get_markdown_converter().convert(contributing_file)
+
+# start_line and end_line are the lines (1-based) of the file a paragraph
+# comes from, and chunk_start_line and chunk_end_line the lines of its chunk.
+Paragraph = collections.namedtuple('Paragraph', ['text', 'start_line', 'end_line', 'chunk_start_line', 'chunk_end_line'])
+
+# Blocks starting with these lines may continue the previous block (indented
+# code, list items, block quotes), so they are converted together with it.
+continuation_pattern = re.compile(r'^(\s|>|[*+-]\s|\d+\.\s)')
+
+word_pattern = re.compile(r'[^\W_]+')
+
+def iter_paragraphs(contributing_file, segmentation=None, chunk_cache=None):
+    """Converts a raw CONTRIBUTING file into plain-text paragraphs, one block at a time.
+
+    The file is split into chunks of blocks separated by blank lines, which are
+    converted one after the other with the same converter, so paragraphs are
+    produced as soon as their block is converted, and memory usage does not
+    grow with the size of the file. Each generator keeps the link references
+    of its own file, so several files can be converted at the same time.
+
+    With the 'lines' segmentation (the default), the paragraphs are the lines
+    of escape_markdown_from_file, except for the empty ones, which are
+    dropped, as in the files the model was trained on. With the 'blocks'
+    segmentation, each paragraph, heading, list item and code block of the
+    file is a single paragraph, whatever the number of lines it is wrapped
+    into. The default can be changed with the environment variable
+    CONTRIBUTING_SEGMENTATION.
+
+    Args:
+        contributing_file: String with the raw content (usually Markdown) of the file.
+        segmentation: 'lines' or 'blocks'.
+        chunk_cache: Optional dictionary where the conversion of each chunk is
+            stored, so the chunks shared by several versions of a file (see
+            scripts/contributing_history.py) are only converted once.
+    Yields:
+        Paragraph tuples with the text of each non-empty block or line, the
+        line of the file it comes from (see find_source_lines), and the first
+        and last lines of its chunk. Blocks join several lines, so their
+        start_line and end_line are the lines of their chunk.
+    """
+
+    segmentation = segmentation or get_segmentation()
+    converter = get_markdown_converter()
+
+    # Same normalization made by Markdown, which keeps the number of lines.
+    contributing_file = contributing_file.replace(markdown.util.STX, '').replace(markdown.util.ETX, '')
+    contributing_file = contributing_file.replace('\r\n', '\n').replace('\r', '\n')
+
+    # References can be used before they are defined, so they are collected upfront.
+    references = {}
+
+    for match in ReferenceProcessor.RE.finditer(contributing_file):
+        references[match.group(1).strip().lower()] = (match.group(2).lstrip('<').rstrip('>'), match.group(5) or match.group(6))
+
+    if segmentation == 'blocks':
+        convert = converter.convert_chunk_into_blocks
+    else:
+        convert = lambda chunk: converter.convert_chunk(chunk).splitlines()
+
+    def convert_chunk(chunk):
+        # The converter is shared by the generators of the thread, which may
+        # be interleaved, so it only holds the references of this file (and
+        # adds the ones the chunk defines) while the chunk is converted.
+        converter.references = references
+
+        try:
+            return convert(chunk)
+        finally:
+            converter.references = {}
+
+    if chunk_cache is not None:
+        convert_chunk = get_cached_chunk_converter(references, convert_chunk, segmentation, chunk_cache)
+
+    if segmentation == 'blocks':
+        for chunk_start_line, chunk_end_line, chunk in iter_chunks(contributing_file.split('\n')):
+            for block in convert_chunk(chunk):
+                yield Paragraph(block, chunk_start_line, chunk_end_line, chunk_start_line, chunk_end_line)
+
+        return
+
+    # The output of Markdown is stripped, so the first paragraph is yielded
+    # without leading whitespace, and the last one without trailing whitespace.
+    previous_paragraph = None
+
+    for chunk_start_line, chunk_end_line, chunk in iter_chunks(contributing_file.split('\n')):
+        lines = [line for line in convert_chunk(chunk) if line.strip()]
+
+        for line, source_line in zip(lines, find_source_lines(chunk.split('\n'), lines)):
+            if previous_paragraph is None:
+                line = line.lstrip()
+            else:
+                yield previous_paragraph
+
+            line_number = chunk_start_line + source_line
+            previous_paragraph = Paragraph(line, line_number, line_number, chunk_start_line, chunk_end_line)
+
+    if previous_paragraph is not None:
+        yield previous_paragraph._replace(text=previous_paragraph.text.rstrip())
+
+def find_source_lines(chunk_lines, converted_lines):
+    """Finds the line of a chunk each of its converted lines comes from.
+
+    Markdown keeps the lines of paragraphs, headings, list items and code
+    blocks, and only removes their markup, so each converted line is matched
+    with the first of the following lines of the chunk that has all of its
+    words, or else with the one that shares the most words with it.
+
+    Args:
+        chunk_lines: Lines of the source of the chunk.
+        converted_lines: Non-empty lines of the conversion of the chunk, in order.
+    Returns:
+        A list with the index of the source line of each converted line.
+    """
+
+    chunk_words = {} # Words of the source lines, split when they are first compared
+    source_lines = []
+    position = 0
+
+    for converted_line in converted_lines:
+        words = set(word_pattern.findall(html.unescape(converted_line).lower()))
+        source_line = min(position, len(chunk_lines) - 1)
+        most_shared_words = 0
+
+        # Lines without words (e.g. rules) are matched with the next line.
+        for index in range(position, len(chunk_lines) if words else 0):
+            if index not in chunk_words:
+                chunk_words[index] = set(word_pattern.findall(chunk_lines[index].lower()))
+
+            if words <= chunk_words[index]:
+                source_line = index
+                break
+
+            shared_words = len(words & chunk_words[index])
+
+            if shared_words > most_shared_words:
+                source_line = index
+                most_shared_words = shared_words
+
+        source_lines.append(source_line)
+        position = source_line + 1
+
+    return source_lines
+
+def get_cached_chunk_converter(references, convert_chunk, segmentation, chunk_cache):
+    """Wraps the conversion of chunks with a cache shared by several files.
+
+    Besides its text, the conversion of a chunk only depends on the link
+    references known before it (references, which are updated in place), and
+    the chunk may also define new ones (e.g. inside a block quote). They are
+    part of the key of each entry, and restored from it when the chunk is not
+    converted again.
+    """
+
+    def convert_cached_chunk(chunk):
+        key = (segmentation, tuple(sorted(references.items())), chunk)
+
+        if key not in chunk_cache:
+            chunk_cache[key] = (convert_chunk(chunk), dict(references))
+
+        paragraphs, chunk_references = chunk_cache[key]
+        references.clear()
+        references.update(chunk_references)
+
+        return paragraphs
+
+    return convert_cached_chunk
+
+def get_segmentation():
+    """Returns the segmentation of CONTRIBUTING files set in CONTRIBUTING_SEGMENTATION ('lines' or 'blocks').
+
+    Blocks are opt-in: the model and the corpus of projects were built from
+    lines, and classifying blocks changes the categories found in some files
+    (see benchmarks/segmentation.py).
+    """
+
+    segmentation = os.getenv('CONTRIBUTING_SEGMENTATION', 'lines')
+
+    if segmentation not in ('blocks', 'lines'):
+        raise ValueError("CONTRIBUTING_SEGMENTATION must be 'lines' or 'blocks', not '" + segmentation + "'.")
+
+    return segmentation
+
+def iter_chunks(lines):
+    """Splits the lines of a file into chunks that can be converted independently.
+
+    Yields:
+        Tuples with the first and last lines (1-based) of each chunk and its text.
+    """
+
+    chunk_start = 0
+    blank_lines = 0
+    fence = None
+
+    for number, line in enumerate(lines):
+        if not line.strip():
+            blank_lines += 1
+            continue
+
+        if number - blank_lines <= chunk_start:
+            # Leading blank lines are not part of the chunk.
+            chunk_start = number
+        elif blank_lines and fence is None and not continuation_pattern.match(line):
+            chunk_end = number - blank_lines
+            chunk = '\n'.join(lines[chunk_start:chunk_end])
+
+            # Raw HTML blocks end at their closing tag, possibly after blank lines.
+            if '<' not in chunk or is_html_closed(chunk):
+                yield chunk_start + 1, chunk_end, chunk
+                chunk_start = number
+
+        # Fenced code blocks are kept in one chunk, even with blank lines inside.
+        fence = get_code_fence(line, fence)
+        blank_lines = 0
+
+    chunk_end = len(lines) - blank_lines
+
+    if chunk_end > chunk_start:
+        yield chunk_start + 1, chunk_end, '\n'.join(lines[chunk_start:chunk_end])
+
+def is_html_closed(chunk):
+    # Parses the chunk as Markdown does to find raw HTML blocks, and checks
+    # that none of them (nor a comment) is still open at its end.
+    parser = HTMLExtractor(converter_storage.converter)
+    parser.feed(chunk + '\n\n')
+
+    return not (parser.inraw or parser.intail or parser.rawdata.strip())
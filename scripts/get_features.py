@@ -1,41 +1,98 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import copy
+import os
 import string
+import numpy
 import pandas
-import streamlit as st
-from functools import partial
-from nltk.corpus import stopwords
-from spacy.lang.en import English
-import nltk
-from nltk.stem import WordNetLemmatizer 
-from nltk.stem.porter import PorterStemmer
-
-nltk.download('stopwords')
-nltk.download('wordnet')
-
-@st.cache(allow_output_mutation=True)
+from scipy import sparse
+from functools import lru_cache
+from scripts.artifacts import load_artifact, resources_directory
+import scripts.metrics as metrics
+
+# spaCy and NLTK take seconds to import, so they are only imported when
+# the heuristic features or the text preprocessing are first used.
+
+@lru_cache(maxsize=None)
+def load_nltk_corpus(name):
+    """Makes sure an NLTK corpus is available, downloading it only if it is missing.
+
+    Corpora are searched in the NLTK data path (e.g. the NLTK_DATA environment
+    variable) and in the `resources/nltk_data` folder, if it exists, so they
+    can be bundled with the application for offline environments.
+
+    Args:
+        name: Name of the corpus, e.g. 'stopwords' or 'wordnet'.
+    """
+
+    import nltk
+
+    bundled_data_directory = os.path.join(resources_directory, 'nltk_data')
+
+    if os.path.isdir(bundled_data_directory) and bundled_data_directory not in nltk.data.path:
+        nltk.data.path.append(bundled_data_directory)
+
+    try:
+        nltk.data.find('corpora/' + name)
+    except LookupError:
+        nltk.download(name, quiet=True)
+
+@lru_cache(maxsize=None)
 def get_feature_selector():
-    selector = pandas.read_pickle('https://github.com/fronchetti/contributing.info/blob/main/resources/feature_selector.sav?raw=true')
+    selector = load_artifact('feature_selector.sav')
     return selector
 
-@st.cache(allow_output_mutation=True)
+@lru_cache(maxsize=None)
 def get_tf_idf_vectorizer():
-    vectorizer = pandas.read_pickle('https://github.com/fronchetti/contributing.info/blob/main/resources/tf-idf.sav?raw=true')
+    vectorizer = load_artifact('tf-idf.sav')
     return vectorizer
 
+@lru_cache(maxsize=None)
+def get_selected_features():
+    """Returns the column indices kept by the fitted feature selector."""
+
+    return get_feature_selector().get_support(indices=True)
+
+@lru_cache(maxsize=None)
+def get_statistic_feature_names():
+    vectorizer = get_tf_idf_vectorizer()
+    return [add_column_name_prefix(name, "stat_") for name in vectorizer.get_feature_names_out()]
+
+@lru_cache(maxsize=None)
+def get_heuristic_feature_names():
+    return [add_column_name_prefix(name, "heur_") for name in get_heuristic_ids()]
+
+def get_feature_names(selected=False):
+    """Returns the names of the feature columns, in the same order of the feature matrix.
+
+    The names are only needed for inspection (e.g. to build a DataFrame),
+    so they are resolved on demand instead of on every request.
+
+    Args:
+        selected: If True, only the names of the columns kept by the feature selector are returned.
+    """
+
+    feature_names = get_statistic_feature_names() + get_heuristic_feature_names()
+
+    if selected:
+        return [feature_names[column] for column in get_selected_features()]
+
+    return feature_names
+
 def select_features(features):
     """Selects the best features to use before prediction
 
     Args:
-        features (Dataframe): Prediction features
+        features (csr_matrix): Prediction features
     Returns:
-        Dataframe: Best features using SelectPercentile (chi-square)
+        csr_matrix: Best features using SelectPercentile (chi-square)
     """
 
-    cloned_selector = copy.deepcopy(get_feature_selector())
-    best_features = cloned_selector.transform(features)
+    # Slicing the columns of the sparse matrix is equivalent to calling
+    # transform on the fitted selector, without converting the features
+    # into a dense matrix.
+    with metrics.span('selection'):
+        best_features = features[:, get_selected_features()]
 
     return best_features
 
@@ -63,15 +120,65 @@ def create_statistic_features(X):
         'analyzer': 'word',
     }
 
-    cloned_vectorizer = copy.deepcopy(get_tf_idf_vectorizer())
-    features = cloned_vectorizer.transform(X)
-    statistic_features = pandas.DataFrame(features.toarray(), columns=cloned_vectorizer.get_feature_names())
+    # The fitted vectorizer is shared by all requests. Its transform method only
+    # reads the vocabulary and the idf weights, so there is no need to copy it.
+    vectorizer = get_tf_idf_vectorizer()
+
+    with metrics.span('tf_idf'):
+        statistic_features = vectorizer.transform(X)
+
+    return statistic_features.tocsr()
+
+@lru_cache(maxsize=None)
+def get_heuristic_matcher():
+    """Builds the spaCy pipeline that matches the heuristic patterns.
+
+    The pipeline is built only once per process and shared by all requests,
+    since adding the patterns to the entity ruler is expensive.
+    """
+
+    from spacy.lang.en import English
+
+    nlp = English()
+    ruler = nlp.add_pipe("entity_ruler")
+    ruler.add_patterns(heuristic_patterns)
 
-    statistic_features = statistic_features.rename(mapper=partial(add_column_name_prefix, prefix="stat_"), axis="columns")
+    return nlp
 
-    return statistic_features
+@lru_cache(maxsize=None)
+def get_keyword_matcher():
+    """Compiles the heuristic patterns into a KeywordMatcher, once per process."""
 
-def create_heuristic_features(X):
+    from scripts.keyword_matcher import KeywordMatcher
+
+    return KeywordMatcher(heuristic_patterns, get_heuristic_ids())
+
+@lru_cache(maxsize=None)
+def get_heuristic_ids():
+    """Returns the identifiers of the heuristic features, in the order of their columns.
+
+    The columns follow the order of the patterns of the entity ruler, which
+    groups them by label, in the order each label first appears.
+    """
+
+    patterns_per_label = {}
+
+    for heuristic in heuristic_patterns:
+        patterns_per_label.setdefault(heuristic['label'], []).append(heuristic)
+
+    return tuple(dict.fromkeys(heuristic['id'] for patterns in patterns_per_label.values() for heuristic in patterns))
+
+def get_heuristic_engine():
+    """Returns the engine of the heuristic features set in CONTRIBUTING_HEURISTICS ('compiled' or 'spacy')."""
+
+    engine = os.getenv('CONTRIBUTING_HEURISTICS', 'compiled')
+
+    if engine not in ('compiled', 'spacy'):
+        raise ValueError("CONTRIBUTING_HEURISTICS must be 'compiled' or 'spacy', not '" + engine + "'.")
+
+    return engine
+
+def create_heuristic_features(X, n_process=1, batch_size=256):
     """Creates a set of features using a rule-based matching approach over paragraphs.
 
     To improve the performance of the classification models, a set of rule-based features were
@@ -90,33 +197,39 @@ def create_heuristic_features(X):
     the `classifier` folder. Learn more about rule-based
     matching at: spacy.io/usage/rule-based-matching
 
+    The patterns are matched by a KeywordMatcher compiled from them (see
+    scripts/keyword_matcher.py), which gives the same features as the spaCy
+    entity ruler many times faster. Set CONTRIBUTING_HEURISTICS to 'spacy'
+    to run the entity ruler instead.
+
     Args:
         X: A string column containing paragraphs.
+        n_process: Number of processes used by spaCy to match the paragraphs.
+        batch_size: Number of paragraphs matched at a time.
     Returns:
         A sparse matrix of heuristic features.
     """
 
-    nlp = English()
-    ruler = nlp.add_pipe("entity_ruler")
-    ruler.add_patterns(heuristic_patterns)
+    X = pandas.Series(X)
 
-    heuristic_features = pandas.DataFrame()
-    heuristic_features['Paragraph'] = X
+    if get_heuristic_engine() == 'compiled':
+        matcher = get_keyword_matcher()
 
-    for heuristic in ruler.patterns:
-        heuristic_features[heuristic['id']] = 0
+        with metrics.span('heuristics'):
+            return matcher.transform(X, batch_size=batch_size)
 
-    for index, row in heuristic_features.iterrows():
-        doc = nlp(row['Paragraph'])
+    nlp = get_heuristic_matcher()
+    heuristic_ids = get_heuristic_ids()
+    heuristic_columns = {heuristic: column for column, heuristic in enumerate(heuristic_ids)}
 
-        for heuristic in doc.ents:
-            heuristic_features.at[index, heuristic.ent_id_] = 1
+    heuristic_features = numpy.zeros((len(X), len(heuristic_ids)), dtype=numpy.int64)
 
-    heuristic_features.drop('Paragraph', axis=1, inplace=True)
+    with metrics.span('heuristics'):
+        for row, doc in enumerate(nlp.pipe(X, batch_size=batch_size, n_process=n_process)):
+            for heuristic in doc.ents:
+                heuristic_features[row, heuristic_columns[heuristic.ent_id_]] = 1
 
-    heuristic_features = heuristic_features.rename(mapper=partial(add_column_name_prefix, prefix="heur_"), axis="columns")
-
-    return heuristic_features
+    return sparse.csr_matrix(heuristic_features)
 
 def text_preprocessing(X, techniques):
     """Applies text processing techniques to a dataframe column of strings (text).
@@ -137,57 +250,88 @@ def text_preprocessing(X, techniques):
 
     X = X.dropna()
 
-    def lowercase(paragraph):
+    if X.empty:
+        return X
+
+    if 'lowercase' in techniques:
         # Transforms uppercase characters into lowercase
-        return paragraph.lower()
+        X = X.str.lower()
 
-    def remove_punctuations(paragraph):
+    if 'remove-punctuations' in techniques:
         # Removes all the punctuations of the text, including: !"#$%&'()*+, -./:;<=>?@[\]^_`{|}~
-        return paragraph.translate(str.maketrans('', '', string.punctuation))
+        X = X.str.translate(punctuation_table)
+
+    # The techniques applied over words are fused into a single pass over the
+    # words of each paragraph, in the same order they would be applied one by one.
+    word_techniques = []
 
-    def remove_stopwords(paragraph):
+    if 'remove-stopwords' in techniques:
         # Removes all the stopwords of the paragraph, such as: "the, for, but, nor"
-        stop_words = set(stopwords.words('english'))
-        return " ".join([word for word in paragraph.split() if word not in stop_words])
+        stop_words = get_stopwords()
+        word_techniques.append(lambda words: [word for word in words if word not in stop_words])
 
-    def stemming(paragraph):
+    if 'stemming' in techniques:
         # Applies a stemmer technique for each word
         # Read about stemming at:
         # nlp.stanford.edu/IR-book/html/htmledition/stemming-and-lemmatization-1.html
-        stemmer = PorterStemmer()
-        return " ".join([stemmer.stem(word) for word in paragraph.split()])
+        word_techniques.append(lambda words: [stem_word(word) for word in words])
 
-    def lemmatization(paragraph):
+    if 'lemmatization' in techniques:
         # Applies a lemattizer for each word
         # Read about lemmatization at:
         # nlp.stanford.edu/IR-book/html/htmledition/stemming-and-lemmatization-1.html
-        lemmatizer = WordNetLemmatizer()
-        return " ".join([lemmatizer.lemmatize(word) for word in paragraph.split()])
+        word_techniques.append(lambda words: [lemmatize_word(word) for word in words])
 
-    if 'lowercase' in techniques:
-        X = X.apply(lambda paragraph: lowercase(paragraph))
+    def apply_word_techniques(paragraph):
+        words = paragraph.split()
 
-    if 'remove-punctuations' in techniques:        
-        X = X.apply(lambda paragraph: remove_punctuations(paragraph))
+        for technique in word_techniques:
+            words = technique(words)
 
-    if 'remove-stopwords' in techniques:
-        X = X.apply(lambda paragraph: remove_stopwords(paragraph))
-    
-    if 'stemming' in techniques:
-        X = X.apply(lambda paragraph: stemming(paragraph))
+        return " ".join(words)
 
-    if 'lemmatization' in techniques:
-        X = X.apply(lambda paragraph: lemmatization(paragraph))
+    if word_techniques:
+        X = X.map(apply_word_techniques)
 
     return X
 
+punctuation_table = str.maketrans('', '', string.punctuation)
+
+@lru_cache(maxsize=None)
+def get_stopwords():
+    from nltk.corpus import stopwords
+
+    load_nltk_corpus('stopwords')
+
+    return frozenset(stopwords.words('english'))
+
+@lru_cache(maxsize=None)
+def get_stemmer():
+    from nltk.stem.porter import PorterStemmer
+
+    return PorterStemmer()
+
+@lru_cache(maxsize=None)
+def get_lemmatizer():
+    from nltk.stem import WordNetLemmatizer
+
+    load_nltk_corpus('wordnet')
+
+    return WordNetLemmatizer()
+
+# Vocabularies follow Zipf's law, so a small table of the most frequent words
+# avoids most calls to the stemmer and the lemmatizer.
+@lru_cache(maxsize=2 ** 16)
+def stem_word(word):
+    return get_stemmer().stem(word)
+
+@lru_cache(maxsize=2 ** 16)
+def lemmatize_word(word):
+    return get_lemmatizer().lemmatize(word)
+
 def convert_paragraphs_into_features(paragraphs):
     dataframe = pandas.Series(paragraphs)
 
-    # print("Applying preprocessing techniques on paragraphs column.")
-    preprocessing_techniques = ['remove-stopwords', 'remove-punctuations', 'lemmatization']
-    paragraphs = text_preprocessing(dataframe, preprocessing_techniques)
-
     # print("Converting paragraphs into statistic features.")
     statistic_features = create_statistic_features(dataframe)
 
@@ -195,7 +339,7 @@ def convert_paragraphs_into_features(paragraphs):
     heuristic_features = create_heuristic_features(dataframe)
 
     # print("Selecting features with SelectPercentile (chi2).")
-    best_features = select_features(pandas.concat([statistic_features, heuristic_features], axis=1))
+    best_features = select_features(sparse.hstack([statistic_features, heuristic_features], format='csr'))
 
     return best_features
 
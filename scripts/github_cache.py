@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Persistent cache of GitHub API responses, revalidated with ETags.
+
+Popular repositories are requested over and over, and each analysis makes
+the same chain of requests (community profile -> contents -> raw file).
+Responses are stored in a SQLite database together with their ETag and
+Last-Modified headers:
+
+    - within the time-to-live (GITHUB_CACHE_TTL, 300 seconds by default),
+      a cached response is returned without contacting GitHub;
+    - after that, a conditional request (If-None-Match/If-Modified-Since)
+      is made. GitHub answers 304 Not Modified without charging the rate
+      limit, and the cached response is reused.
+
+The database is bounded (GITHUB_CACHE_MAX_BYTES, 64 MiB by default) and the
+least recently used responses are evicted first. It is stored at the path
+given by GITHUB_CACHE, or in $XDG_CACHE_HOME/contributing-github (~/.cache
+by default). Set GITHUB_CACHE to an empty string to disable the cache.
+
+Cached responses are trusted: the URLs they give are requested with the
+GitHub tokens, and responses fetched with a token may come from private
+repositories. The database must be in a directory private to the current
+user, and is created with mode 0600, as are its WAL files. Otherwise, the
+cache is disabled (see scripts/private_cache.py). Responses are also
+stored per pool of credentials (see scrap_github_api.Create), so a process
+with other tokens never reuses them.
+"""
+
+import os
+import re
+import sys
+import time
+import sqlite3
+import threading
+from functools import lru_cache
+from scripts.private_cache import get_cache_home, is_private_path, make_private_directory, make_private_file
+
+repository_pattern = re.compile(r'^https?://[^/]+/repos/([^/]+)/([^/?\s]+)')
+
+class ResponseCache:
+    def __init__(self, path, ttl=300, max_size=64 * 2 ** 20):
+        """Opens (or creates) a cache database.
+
+        Args:
+            path: Path of the SQLite database file.
+            ttl: Seconds during which a response is used without revalidation.
+            max_size: Maximum number of bytes of response bodies kept in the cache.
+        """
+
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'revalidations': 0, 'evictions': 0}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        # The connection is shared by the threads of the process (guarded by the
+        # lock), while other processes are synchronized by SQLite itself.
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('''CREATE TABLE IF NOT EXISTS responses (
+                                       url TEXT PRIMARY KEY,
+                                       owner TEXT,
+                                       repository TEXT,
+                                       body TEXT NOT NULL,
+                                       etag TEXT,
+                                       last_modified TEXT,
+                                       size INTEGER NOT NULL,
+                                       fetched_at REAL NOT NULL,
+                                       accessed_at REAL NOT NULL)''')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS responses_repository ON responses (owner, repository)')
+
+    def get(self, url):
+        """Returns the cached response of a URL.
+
+        Args:
+            url: Key of the response, i.e. its URL (see scrap_github_api.Create.get_cache_key).
+        Returns:
+            A dictionary with the keys 'body', 'etag', 'last_modified' and
+            'fresh' (True if it is still within the time-to-live), or None.
+        """
+
+        with self.lock:
+            row = self.connection.execute('SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?', (url,)).fetchone()
+
+            if row is None:
+                return None
+
+            self.connection.execute('UPDATE responses SET accessed_at = ? WHERE url = ?', (time.time(), url))
+
+        body, etag, last_modified, fetched_at = row
+
+        return {'body': body, 'etag': etag, 'last_modified': last_modified, 'fresh': time.time() - fetched_at < self.ttl}
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """Stores a response, evicting the least recently used ones if the cache is full."""
+
+        owner, repository = parse_repository(url)
+        size = len(body.encode('utf-8'))
+        now = time.time()
+
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                    (url, owner, repository, body, etag, last_modified, size, now, now))
+            self.evict()
+
+    def refresh(self, url):
+        """Marks a cached response as fresh again (e.g. after a 304 Not Modified)."""
+
+        now = time.time()
+
+        with self.lock:
+            self.connection.execute('UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?', (now, now, url))
+
+    def invalidate(self, owner, repository):
+        """Removes every cached response of a repository."""
+
+        with self.lock:
+            self.connection.execute('DELETE FROM responses WHERE owner = ? AND repository = ?', (owner.lower(), repository.lower()))
+
+    def evict(self):
+        total_size = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+        if total_size <= self.max_size:
+            return
+
+        evicted_urls = []
+
+        for url, size in self.connection.execute('SELECT url, size FROM responses ORDER BY accessed_at'):
+            if total_size <= self.max_size:
+                break
+
+            evicted_urls.append((url,))
+            total_size -= size
+
+        self.connection.executemany('DELETE FROM responses WHERE url = ?', evicted_urls)
+        self.counters['evictions'] += len(evicted_urls)
+
+    def count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def stats(self):
+        """Returns the hit, miss, revalidation and eviction counters, and the current size of the cache."""
+
+        with self.lock:
+            n_responses, size = self.connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+            requests = self.counters['hits'] + self.counters['revalidations'] + self.counters['misses']
+
+            return dict(self.counters,
+                        hit_rate=(self.counters['hits'] + self.counters['revalidations']) / requests if requests else 0,
+                        responses=n_responses,
+                        size=size)
+
+def parse_repository(url):
+    match = repository_pattern.match(url)
+
+    if match:
+        return match.group(1).lower(), match.group(2).lower()
+
+    return None, None
+
+def is_private_database(path):
+    """Creates the database file, and its directory, private to the current user if they do not exist.
+
+    Returns:
+        True if the directory, the database and its WAL files are private to the current user.
+    """
+
+    if not make_private_directory(os.path.dirname(os.path.abspath(path))) or not make_private_file(path):
+        return False
+
+    # SQLite creates the WAL files with the mode of the database.
+    return all(is_private_path(path + suffix, secret=True) for suffix in ('-wal', '-shm') if os.path.lexists(path + suffix))
+
+@lru_cache(maxsize=None)
+def get_github_cache():
+    """Returns the response cache shared by the process, or None if it is disabled."""
+
+    path = os.getenv('GITHUB_CACHE', os.path.join(get_cache_home(), 'contributing-github', 'responses.sqlite'))
+
+    if not path:
+        return None
+
+    if not is_private_database(path):
+        print('The GitHub cache ' + path + ' is not private to the current user, responses are not cached.', file=sys.stderr)
+        return None
+
+    return ResponseCache(path,
+                         ttl=float(os.getenv('GITHUB_CACHE_TTL', 300)),
+                         max_size=int(os.getenv('GITHUB_CACHE_MAX_BYTES', 64 * 2 ** 20)))
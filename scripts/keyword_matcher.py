@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Matches the heuristic patterns without running the spaCy entity ruler.
+
+The heuristic features used to be computed by a spaCy pipeline with an
+entity ruler: every paragraph was tokenized, matched against every pattern,
+and the overlapping matches were resolved into entities, whose ids are the
+heuristic features. Almost every pattern is a single lowercase token or a
+short fixed phrase, so the matcher is compiled once into:
+
+    1. a table of the hashes of single-token patterns (LOWER or TEXT), which
+       are looked up with a binary search over all the tokens of a batch;
+    2. the few multi-token patterns (and the ones with IS_PUNCT, IS_STOP or
+       IS_DIGIT tokens), which are matched by comparing shifted columns of
+       the token attributes of the batch.
+
+Paragraphs are still tokenized by the spaCy tokenizer, and the token
+attributes are read with Doc.to_array, so tokens are the same as before.
+The overlapping matches of a paragraph are then resolved as the entity
+ruler does (see spacy.pipeline.EntityRuler.match and set_annotations): the
+longest matches win, then the ones that start first, and a match is
+dropped if its first or last token is part of a match that was kept.
+Unlike the spaCy pipeline, paragraphs longer than nlp.max_length are matched
+instead of raising a ValueError.
+
+Use `python -m benchmarks.keyword_matcher` to check that the features are
+the same as the ones of the entity ruler.
+"""
+
+import numpy
+from scipy import sparse
+
+# Token attributes supported in the patterns, in the order of the columns of the token arrays.
+token_attributes = ('LOWER', 'TEXT', 'IS_PUNCT', 'IS_STOP', 'IS_DIGIT')
+
+class KeywordMatcher:
+    def __init__(self, patterns, heuristic_ids):
+        """Compiles a list of entity ruler patterns.
+
+        Args:
+            patterns: List of dictionaries with a label, an id and a pattern
+                (list of token dictionaries), as given to the entity ruler.
+            heuristic_ids: Ids of the heuristic features, in the order of their columns.
+        Raises:
+            ValueError: If a pattern uses other token attributes or operators,
+                or if two different patterns can match the same tokens (the
+                entity ruler would then choose between them by hash order).
+        """
+
+        from spacy.lang.en import English
+        from spacy.attrs import LOWER, ORTH, IS_PUNCT, IS_STOP, IS_DIGIT
+
+        self.tokenizer = English().tokenizer
+        self.array_attributes = [LOWER, ORTH, IS_PUNCT, IS_STOP, IS_DIGIT]
+        self.n_columns = len(heuristic_ids)
+
+        heuristic_columns = {heuristic: column for column, heuristic in enumerate(heuristic_ids)}
+
+        # The entity ruler matches every pattern of a label and id with the same key.
+        keys = {}
+        single_tokens = {} # (attribute, hash) -> key
+        sequences = [] # (key, [(attribute, value), ...])
+
+        for pattern in patterns:
+            key = keys.setdefault((pattern['label'], pattern['id']), len(keys))
+            tokens = [self.compile_token(token) for token in pattern['pattern']]
+
+            if len(tokens) == 1 and token_attributes[tokens[0][0]] in ('LOWER', 'TEXT'):
+                if single_tokens.setdefault(tokens[0], key) != key:
+                    raise ValueError("Two heuristic patterns match the same tokens: " + str(pattern['pattern']) + ".")
+            elif (key, tokens) not in sequences:
+                sequences.append((key, tokens))
+
+        self.check_ambiguity(single_tokens, sequences)
+
+        self.key_columns = numpy.zeros(len(keys), dtype=numpy.int64)
+
+        for (_, heuristic), key in keys.items():
+            self.key_columns[key] = heuristic_columns[heuristic]
+
+        # Sorted hashes of the single-token patterns, for each attribute.
+        self.single_token_tables = []
+
+        for attribute in (0, 1):
+            table = sorted((value, key) for (token_attribute, value), key in single_tokens.items() if token_attribute == attribute)
+            self.single_token_tables.append((attribute,
+                                             numpy.array([value for value, _ in table], dtype=numpy.uint64),
+                                             numpy.array([key for _, key in table], dtype=numpy.int64)))
+
+        self.sequences = sequences
+
+    def compile_token(self, token):
+        if len(token) != 1 or next(iter(token)) not in token_attributes:
+            raise ValueError("Only patterns with one of " + ', '.join(token_attributes) + " per token can be compiled, not " + str(token) + ".")
+
+        attribute, value = next(iter(token.items()))
+
+        if attribute in ('LOWER', 'TEXT'):
+            # Hashes of strings are the same in every vocabulary.
+            return token_attributes.index(attribute), self.tokenizer.vocab.strings.add(value)
+
+        return token_attributes.index(attribute), int(bool(value))
+
+    def check_ambiguity(self, single_tokens, sequences):
+        # Fixed tokens (LOWER or TEXT) conflict when their lowercase forms are different.
+        def get_lowercase(token):
+            attribute, value = token
+
+            if token_attributes[attribute] == 'LOWER':
+                return value
+
+            if token_attributes[attribute] == 'TEXT':
+                return self.tokenizer.vocab.strings.add(self.tokenizer.vocab.strings[value].lower())
+
+            return None
+
+        patterns = [(key, [token]) for token, key in single_tokens.items()] + sequences
+
+        for position, (key, tokens) in enumerate(patterns):
+            for other_key, other_tokens in patterns[position + 1:]:
+                if key == other_key or len(tokens) != len(other_tokens):
+                    continue
+
+                if all(get_lowercase(token) is None or get_lowercase(other_token) is None or get_lowercase(token) == get_lowercase(other_token)
+                       for token, other_token in zip(tokens, other_tokens)):
+                    raise ValueError("Two heuristic patterns with different ids can match the same tokens.")
+
+    def get_token_arrays(self, paragraphs, batch_size=256):
+        """Tokenizes the paragraphs and returns the attributes of all their tokens, and the first token of each paragraph."""
+
+        arrays = [doc.to_array(self.array_attributes) for doc in self.tokenizer.pipe(paragraphs, batch_size=batch_size)]
+        offsets = numpy.zeros(len(arrays) + 1, dtype=numpy.int64)
+        offsets[1:] = numpy.cumsum([len(array) for array in arrays])
+
+        if offsets[-1] == 0:
+            return numpy.zeros((0, len(self.array_attributes)), dtype=numpy.uint64), offsets
+
+        return numpy.concatenate([array.reshape(-1, len(self.array_attributes)) for array in arrays]), offsets
+
+    def find_matches(self, tokens, paragraph_of_token):
+        """Finds every match of every pattern in the tokens of a batch.
+
+        Returns:
+            Arrays with the first token, the number of tokens and the key of each match.
+        """
+
+        starts, lengths, keys = [], [], []
+
+        for attribute, hashes, table_keys in self.single_token_tables:
+            if len(hashes) == 0:
+                continue
+
+            values = tokens[:, attribute]
+            positions = numpy.minimum(numpy.searchsorted(hashes, values), len(hashes) - 1)
+            matched = numpy.flatnonzero(hashes[positions] == values)
+
+            starts.append(matched)
+            lengths.append(numpy.ones(len(matched), dtype=numpy.int64))
+            keys.append(table_keys[positions[matched]])
+
+        for key, pattern in self.sequences:
+            n_starts = len(tokens) - len(pattern) + 1
+
+            if n_starts <= 0:
+                continue
+
+            matched = numpy.ones(n_starts, dtype=bool)
+
+            for offset, (attribute, value) in enumerate(pattern):
+                matched &= tokens[offset:offset + n_starts, attribute] == value
+
+            # Matches cannot cross the boundary between two paragraphs.
+            matched &= paragraph_of_token[:n_starts] == paragraph_of_token[len(pattern) - 1:]
+            matched = numpy.flatnonzero(matched)
+
+            starts.append(matched)
+            lengths.append(numpy.full(len(matched), len(pattern), dtype=numpy.int64))
+            keys.append(numpy.full(len(matched), key, dtype=numpy.int64))
+
+        if not starts:
+            return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64)
+
+        return numpy.concatenate(starts), numpy.concatenate(lengths), numpy.concatenate(keys)
+
+    def transform(self, paragraphs, batch_size=256):
+        """Creates the heuristic features of a list of paragraphs.
+
+        Returns:
+            A sparse matrix with one row per paragraph and one column per
+            heuristic id, with 1 where the paragraph has an entity of that id.
+        """
+
+        paragraphs = list(paragraphs)
+        tokens, offsets = self.get_token_arrays(paragraphs, batch_size)
+        paragraph_of_token = numpy.repeat(numpy.arange(len(paragraphs)), numpy.diff(offsets))
+
+        starts, lengths, keys = self.find_matches(tokens, paragraph_of_token)
+        rows = paragraph_of_token[starts]
+
+        # Longest matches first, then the ones that start first, as in the entity ruler.
+        order = numpy.lexsort((starts, -lengths, rows))
+        starts, lengths, keys, rows = starts[order], lengths[order], keys[order], rows[order]
+
+        # Matches that do not overlap any other match of their paragraph are always kept.
+        ends = starts + lengths
+        previous_end = numpy.zeros(len(starts), dtype=numpy.int64)
+        kept = numpy.ones(len(starts), dtype=bool)
+        overlapping_rows = set()
+
+        if len(starts):
+            by_position = numpy.lexsort((starts, rows))
+            sorted_rows, sorted_starts, sorted_ends = rows[by_position], starts[by_position], ends[by_position]
+            previous_end[1:] = numpy.maximum.accumulate(sorted_ends)[:-1]
+            overlaps = (sorted_starts[1:] < previous_end[1:]) & (sorted_rows[1:] == sorted_rows[:-1])
+            overlapping_rows = set(sorted_rows[1:][overlaps].tolist())
+
+        for row in overlapping_rows:
+            # Same resolution as EntityRuler.set_annotations.
+            seen_tokens = set()
+
+            for match in numpy.flatnonzero(rows == row):
+                start, end = starts[match], ends[match]
+
+                if start not in seen_tokens and end - 1 not in seen_tokens:
+                    seen_tokens.update(range(start, end))
+                else:
+                    kept[match] = False
+
+        features = sparse.csr_matrix((numpy.ones(kept.sum(), dtype=numpy.int64), (rows[kept], self.key_columns[keys[kept]])),
+                                     shape=(len(paragraphs), self.n_columns))
+
+        # Several entities of the same id set the feature to 1, not to their count.
+        features.sum_duplicates()
+        features.data[:] = 1
+
+        return features
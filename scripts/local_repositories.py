@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Reads CONTRIBUTING files from local copies of repositories, without the GitHub API.
+
+For corpus-scale jobs (e.g. re-scoring every repository in the resources
+folder), downloading one file at a time is limited by the API quota. This
+module reads the files from a directory with local copies instead:
+
+    corpus/
+        owner/name/          working copy (git clone, possibly sparse or --no-checkout)
+        owner/name.git/      bare mirror (git clone --mirror or --bare)
+        owner/name.tar.gz    release tarball or GitHub archive (.tar, .tar.gz, .tgz, .zip)
+
+Repositories may also be placed directly in the directory (corpus/name).
+Only the CONTRIBUTING file is read: from bare mirrors, its location is
+found by listing the root, .github and docs trees and its content is read
+from the object database, without checking out the repository.
+
+Example:
+    python -m scripts.classify_repositories --local corpus/ -o predictions.csv
+"""
+
+import os
+import tarfile
+import zipfile
+import subprocess
+from scripts.get_contributing import contributing_paths
+
+# Every name GitHub accepts for a CONTRIBUTING file, in order of precedence.
+local_contributing_paths = contributing_paths + [directory + 'CONTRIBUTING' + extension
+                                                 for extension in ('.txt', '')
+                                                 for directory in ('.github/', '', 'docs/')]
+
+archive_extensions = ('.tar.gz', '.tgz', '.tar', '.zip')
+
+def find_local_repositories(directory):
+    """Finds the local copies of repositories inside a directory.
+
+    Args:
+        directory: Path of a directory with repositories, or with one folder
+            per owner containing their repositories.
+    Returns:
+        A generator of repository names (e.g. 'owner/name'), relative to the
+        directory and without the extension of bare mirrors and archives.
+    """
+
+    for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+        if get_repository_type(entry.path):
+            yield get_repository_name(entry.name)
+        elif entry.is_dir() and not entry.name.startswith('.'):
+            for subentry in sorted(os.scandir(entry.path), key=lambda entry: entry.name):
+                if get_repository_type(subentry.path):
+                    yield entry.name + '/' + get_repository_name(subentry.name)
+
+def get_repository_name(file_name):
+    for extension in ('.git',) + archive_extensions:
+        if file_name.endswith(extension):
+            return file_name[:-len(extension)]
+
+    return file_name
+
+def get_repository_type(path):
+    """Returns 'working-copy', 'bare', 'archive', or None if the path is not a repository."""
+
+    if os.path.isfile(path):
+        return 'archive' if path.endswith(archive_extensions) else None
+
+    if os.path.exists(os.path.join(path, '.git')):
+        return 'working-copy'
+
+    if all(os.path.exists(os.path.join(path, name)) for name in ('HEAD', 'objects', 'refs')):
+        return 'bare'
+
+    return None
+
+def get_repository_path(directory, repository_name):
+    """Returns the path of the local copy of a repository, trying each known extension."""
+
+    for extension in ('', '.git') + archive_extensions:
+        path = os.path.join(directory, repository_name + extension)
+
+        if get_repository_type(path):
+            return path
+
+    raise FileNotFoundError("There is no local copy of the repository " + repository_name + " in " + directory + ".")
+
+def choose_contributing_path(paths):
+    """Chooses the CONTRIBUTING file that GitHub would show among the paths of a repository.
+
+    Args:
+        paths: Iterable of file paths, relative to the root of the repository.
+    Returns:
+        The chosen path, or None if there is no CONTRIBUTING file.
+    """
+
+    paths_by_name = {}
+
+    for path in paths:
+        paths_by_name.setdefault(path.lower(), path)
+
+    for candidate in local_contributing_paths:
+        if candidate.lower() in paths_by_name:
+            return paths_by_name[candidate.lower()]
+
+    return None
+
+def read_contributing_file(path):
+    """Reads the raw CONTRIBUTING file of a local copy of a repository.
+
+    Args:
+        path: Path of a working copy, a bare mirror or an archive.
+    Returns:
+        A string with the raw content of the documentation file.
+    """
+
+    repository_type = get_repository_type(path)
+
+    if repository_type == 'working-copy':
+        contributing_file = read_from_working_copy(path)
+
+        # Clones made with --no-checkout or a sparse checkout may not have
+        # the file in the working tree, but they have it in the object database.
+        if contributing_file is None:
+            contributing_file = read_from_git(os.path.join(path, '.git'))
+    elif repository_type == 'bare':
+        contributing_file = read_from_git(path)
+    elif repository_type == 'archive':
+        contributing_file = read_from_archive(path)
+    else:
+        raise FileNotFoundError("The path " + path + " is not a repository, a bare mirror or an archive.")
+
+    if contributing_file is None:
+        raise TypeError("The repository " + path + " does not contain a CONTRIBUTING.md file.")
+
+    return contributing_file
+
+def read_local_contributing_file(directory, repository_name):
+    """Reads the raw CONTRIBUTING file of a repository found by find_local_repositories."""
+
+    return read_contributing_file(get_repository_path(directory, repository_name))
+
+def read_from_working_copy(path):
+    paths = []
+
+    for subdirectory in ('', '.github', 'docs'):
+        if os.path.isdir(os.path.join(path, subdirectory)):
+            prefix = subdirectory + '/' if subdirectory else ''
+            paths += [prefix + name for name in os.listdir(os.path.join(path, subdirectory))]
+
+    contributing_path = choose_contributing_path(paths)
+
+    if contributing_path is None or not os.path.isfile(os.path.join(path, contributing_path)):
+        return None
+
+    with open(os.path.join(path, contributing_path), encoding='utf-8', errors='replace') as file:
+        return file.read()
+
+def read_from_git(git_directory):
+    # Lists the root, .github and docs trees of HEAD, without reading the rest of the repository.
+    listing = subprocess.run(['git', '--git-dir', git_directory, 'ls-tree', '--name-only', '-z', 'HEAD', '--', '.', '.github/', 'docs/'],
+                             capture_output=True, check=False)
+
+    if listing.returncode != 0:
+        return None
+
+    contributing_path = choose_contributing_path(listing.stdout.decode('utf-8', errors='replace').split('\0'))
+
+    if contributing_path is None:
+        return None
+
+    blob = subprocess.run(['git', '--git-dir', git_directory, 'cat-file', 'blob', 'HEAD:' + contributing_path],
+                          capture_output=True, check=False)
+
+    if blob.returncode != 0:
+        return None
+
+    return blob.stdout.decode('utf-8', errors='replace')
+
+def read_from_archive(path):
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            members = [name for name in archive.namelist() if not name.endswith('/')]
+            names = strip_archive_prefix(members)
+            contributing_path = choose_contributing_path(names)
+
+            if contributing_path is None:
+                return None
+
+            return archive.read(members[names.index(contributing_path)]).decode('utf-8', errors='replace')
+
+    with tarfile.open(path) as archive:
+        members = [member for member in archive if member.isfile()]
+        names = strip_archive_prefix([member.name for member in members])
+        contributing_path = choose_contributing_path(names)
+
+        if contributing_path is None:
+            return None
+
+        return archive.extractfile(members[names.index(contributing_path)]).read().decode('utf-8', errors='replace')
+
+def strip_archive_prefix(names):
+    """Removes the top-level folder that archives usually have (e.g. 'name-1.0/' or 'owner-name-sha/')."""
+
+    names = [name[2:] if name.startswith('./') else name for name in names]
+    prefixes = {name.split('/', 1)[0] for name in names}
+
+    if len(prefixes) == 1 and all('/' in name for name in names):
+        return [name.split('/', 1)[1] for name in names]
+
+    return names
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Lightweight instrumentation of the stages of a request.
+
+Each stage (GitHub requests, Markdown conversion, feature extraction,
+prediction, rendering) is wrapped in a span:
+
+    with metrics.span('markdown'):
+        paragraphs = ...
+
+Instrumentation is turned on with CONTRIBUTING_METRICS=1. When it is off, a
+span is a shared no-op context manager, so its cost is a function call.
+When it is on, the duration of every span is added to a histogram per
+stage, and the counters of the caches and the quota of the GitHub tokens
+are collected from their own statistics when the metrics are exported.
+
+The metrics can be exported in the Prometheus text format or as JSON lines:
+
+    - CONTRIBUTING_METRICS_PORT starts an HTTP server in the background,
+      which serves /metrics (Prometheus) and /metrics.jsonl. It is only
+      started by the entry points (the web application and the main
+      process of classify_repositories, see start_metrics_exporter), not by
+      the worker processes, which would all try to bind the same port;
+    - CONTRIBUTING_METRICS_JSONL appends one JSON line per span to a file,
+      which also works with the pool of processes of classify_repositories.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import threading
+import contextlib
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+metrics_enabled = os.getenv('CONTRIBUTING_METRICS', '0') == '1'
+
+# Upper bounds of the buckets of the histograms, in seconds.
+duration_buckets = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+no_span = contextlib.nullcontext()
+
+class Span:
+    __slots__ = ('registry', 'stage', 'start_time')
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.registry.observe(self.stage, time.perf_counter() - self.start_time, exception_type is None)
+
+class MetricsRegistry:
+    def __init__(self, jsonl_path=None):
+        """Creates an empty registry.
+
+        Args:
+            jsonl_path: Optional path of a file where every span is appended as a JSON line.
+        """
+
+        self.jsonl_path = jsonl_path
+        self.jsonl_file = None
+        self.lock = threading.Lock()
+        self.histograms = {} # Stage -> [count per bucket..., count, sum of durations]
+        self.counters = {} # (name, labels) -> value
+        self.errors = {} # Stage -> number of spans that raised an exception
+
+    def observe(self, stage, duration, succeeded=True):
+        with self.lock:
+            histogram = self.histograms.setdefault(stage, [0] * len(duration_buckets) + [0, 0.0])
+
+            for position, bucket in enumerate(duration_buckets):
+                if duration <= bucket:
+                    histogram[position] += 1
+
+            histogram[-2] += 1
+            histogram[-1] += duration
+
+            if not succeeded:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+
+            if self.jsonl_path:
+                try:
+                    if self.jsonl_file is None:
+                        self.jsonl_file = open(self.jsonl_path, 'a', encoding='utf-8', buffering=1)
+
+                    self.jsonl_file.write(json.dumps({'time': time.time(), 'pid': os.getpid(), 'stage': stage,
+                                                      'seconds': duration, 'error': not succeeded}) + '\n')
+                except OSError as exception:
+                    # Metrics must never fail the request they measure.
+                    print('Metrics are not written to {}: {}'.format(self.jsonl_path, exception), file=sys.stderr)
+                    self.jsonl_path = None
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def collect(self):
+        """Returns every metric as a list of (name, type, labels, value) tuples."""
+
+        samples = []
+
+        with self.lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                for bucket, count in zip(duration_buckets, histogram):
+                    samples.append(('contributing_stage_duration_seconds_bucket', 'histogram', {'stage': stage, 'le': str(bucket)}, count))
+
+                samples.append(('contributing_stage_duration_seconds_bucket', 'histogram', {'stage': stage, 'le': '+Inf'}, histogram[-2]))
+                samples.append(('contributing_stage_duration_seconds_count', 'histogram', {'stage': stage}, histogram[-2]))
+                samples.append(('contributing_stage_duration_seconds_sum', 'histogram', {'stage': stage}, histogram[-1]))
+
+            for stage, count in sorted(self.errors.items()):
+                samples.append(('contributing_stage_errors_total', 'counter', {'stage': stage}, count))
+
+            for (name, labels), value in sorted(self.counters.items()):
+                samples.append((name, 'counter', dict(labels), value))
+
+        return samples + collect_cache_metrics() + collect_quota_metrics()
+
+    def to_prometheus(self):
+        lines = []
+        declared_metrics = set()
+
+        # The samples of a histogram share the name of their metric, and the
+        # samples of a metric must be consecutive.
+        get_metric_name = lambda sample: re.sub('_(bucket|count|sum)$', '', sample[0]) if sample[1] == 'histogram' else sample[0]
+
+        for name, metric_type, labels, value in sorted(self.collect(), key=get_metric_name):
+            metric_name = get_metric_name((name, metric_type))
+
+            if metric_name not in declared_metrics:
+                lines.append('# TYPE {} {}'.format(metric_name, metric_type))
+                declared_metrics.add(metric_name)
+
+            label_text = ','.join('{}="{}"'.format(key, str(label).replace('\\', '\\\\').replace('"', '\\"')) for key, label in labels.items())
+            lines.append('{}{} {}'.format(name, '{' + label_text + '}' if label_text else '', value))
+
+        return '\n'.join(lines) + '\n'
+
+    def to_json_lines(self):
+        timestamp = time.time()
+
+        return ''.join(json.dumps({'time': timestamp, 'name': name, 'type': metric_type, 'labels': labels, 'value': value}) + '\n'
+                       for name, metric_type, labels, value in self.collect())
+
+def collect_cache_metrics():
+    # Only the caches that were already created are collected.
+    from scripts.result_cache import get_result_cache, get_paragraph_cache
+    from scripts.github_cache import get_github_cache
+
+    samples = []
+
+    for cache_name, get_cache in (('result', get_result_cache), ('paragraph', get_paragraph_cache), ('github', get_github_cache)):
+        if get_cache.cache_info().currsize == 0 or get_cache() is None:
+            continue
+
+        stats = get_cache().stats()
+
+        for counter in ('hits', 'misses', 'revalidations'):
+            if counter in stats:
+                samples.append(('contributing_cache_{}_total'.format(counter), 'counter', {'cache': cache_name}, stats[counter]))
+
+    return samples
+
+def collect_quota_metrics():
+    from scripts.rate_limit import get_rate_limit_scheduler
+
+    if get_rate_limit_scheduler.cache_info().currsize == 0:
+        return []
+
+    stats = get_rate_limit_scheduler().stats()
+    samples = [('contributing_github_requests_total', 'counter', {}, stats['requests']),
+               ('contributing_github_wait_seconds_total', 'counter', {}, stats['wait_time']),
+               ('contributing_github_rate_limited_total', 'counter', {}, stats['rate_limited'])]
+
+    for token in stats['tokens']:
+        if token['remaining'] is not None:
+            samples.append(('contributing_github_quota_remaining', 'gauge', {'token': token['token']}, token['remaining']))
+
+    return samples
+
+@lru_cache(maxsize=None)
+def get_metrics_registry():
+    """Returns the registry shared by the whole process."""
+
+    return MetricsRegistry(os.getenv('CONTRIBUTING_METRICS_JSONL') or None)
+
+@lru_cache(maxsize=None)
+def start_metrics_exporter():
+    """Starts the HTTP server of the metrics if CONTRIBUTING_METRICS_PORT is set, once per process.
+
+    Only the main process of an application should call it. If the port
+    cannot be bound (e.g. it is used by another process), a warning is
+    printed and the metrics are not served, but everything else goes on.
+
+    Returns:
+        The ThreadingHTTPServer, or None if the metrics are not served.
+    """
+
+    if not metrics_enabled or not os.getenv('CONTRIBUTING_METRICS_PORT'):
+        return None
+
+    try:
+        return start_metrics_server(get_metrics_registry(), int(os.getenv('CONTRIBUTING_METRICS_PORT')))
+    except (OSError, ValueError) as exception:
+        print('The metrics are not served on port {}: {}'.format(os.getenv('CONTRIBUTING_METRICS_PORT'), exception), file=sys.stderr)
+        return None
+
+def start_metrics_server(registry, port, host=''):
+    """Serves the metrics of a registry over HTTP, in a background thread.
+
+    Returns:
+        The ThreadingHTTPServer, which can be stopped with its shutdown method.
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = registry.to_prometheus(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.jsonl':
+                body, content_type = registry.to_json_lines(), 'application/x-ndjson'
+            else:
+                self.send_error(404)
+                return
+
+            body = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *arguments):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+def span(stage):
+    """Returns a context manager that measures the duration of a stage, or a no-op one if metrics are off."""
+
+    if not metrics_enabled:
+        return no_span
+
+    return Span(get_metrics_registry(), stage)
+
+def observe(stage, duration):
+    """Adds the duration (in seconds) of a stage measured by the caller if metrics are on."""
+
+    if metrics_enabled:
+        get_metrics_registry().observe(stage, duration)
+
+def increment(name, value=1, **labels):
+    """Increments a counter (e.g. 'contributing_paragraphs_classified_total') if metrics are on."""
+
+    if metrics_enabled:
+        get_metrics_registry().increment(name, value, **labels)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Keeps the files cached by the application in directories private to the current user.
+
+Cached files are trusted when they are read back: the memory-mapped
+artifacts run pickled code (see scripts/artifacts.py), and the GitHub
+responses give the URLs that are then requested with the GitHub tokens
+(see scripts/github_cache.py). A file in a directory others can write to
+could be replaced or created in advance by another user, so caches are
+kept in $XDG_CACHE_HOME (~/.cache by default), in directories created with
+mode 0700, and are not used when they belong to another user or can be
+written by others.
+"""
+
+import os
+import stat
+
+def get_cache_home():
+    return os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+
+def is_private_path(path, secret=False):
+    """Checks that a file or directory belongs to the current user and cannot be written by others.
+
+    Args:
+        path: Path of an existing file or directory.
+        secret: If True, the group and others must not be able to read it either.
+    """
+
+    status = os.lstat(path)
+    shared_permissions = stat.S_IWGRP | stat.S_IWOTH
+
+    if secret:
+        shared_permissions |= stat.S_IRGRP | stat.S_IROTH
+
+    if stat.S_ISLNK(status.st_mode) or status.st_mode & shared_permissions:
+        return False
+
+    # Windows has no owners in os.stat.
+    return not hasattr(os, 'getuid') or status.st_uid == os.getuid()
+
+def make_private_directory(path):
+    """Creates a directory with mode 0700 if it does not exist.
+
+    Returns:
+        True if the directory is private to the current user (see is_private_path).
+    """
+
+    os.makedirs(path, mode=0o700, exist_ok=True)
+
+    return is_private_path(path)
+
+def make_private_file(path):
+    """Creates an empty file with mode 0600 if it does not exist, without following symbolic links.
+
+    Returns:
+        True if the file is private to the current user and cannot be read by others.
+    """
+
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_WRONLY | getattr(os, 'O_NOFOLLOW', 0), 0o600))
+    except OSError:
+        return False
+
+    return is_private_path(path, secret=True)
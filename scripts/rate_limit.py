@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Schedules the requests to the GitHub API within its rate limit.
+
+GitHub reports the quota of each token in the X-RateLimit-Remaining and
+X-RateLimit-Reset headers. Instead of failing once the quota runs out, every
+request of the process asks the scheduler for a token before it is sent:
+
+    - the token with the most remaining requests is chosen, so a pool of
+      tokens (GITHUB_TOKENS, comma-separated, and GITHUB_TOKEN) is used
+      evenly;
+    - requests are spread across the rate limit window with a token bucket:
+      up to GITHUB_RATE_LIMIT_BURST requests (50 by default) are sent at
+      once, and the bucket is refilled at the rate that uses the remaining
+      quota until the reset time;
+    - when every token is exhausted, the request waits until the first
+      reset. If it would wait longer than GITHUB_RATE_LIMIT_MAX_WAIT seconds,
+      a ConnectionError is raised instead.
+
+The web application answers users interactively, so its requests wait at
+most 5 seconds by default. Batch jobs (e.g. scripts/classify_repositories.py)
+call wait_for_rate_limit_reset, so their requests wait until the quota is
+reset, however long it takes. GITHUB_RATE_LIMIT_MAX_WAIT overrides both
+('none' to wait until the reset).
+"""
+
+import os
+import time
+import threading
+from functools import lru_cache
+
+default_max_wait = 5
+
+class TokenQuota:
+    def __init__(self, credentials, burst):
+        self.credentials = credentials # (user, token) tuple, or None for anonymous requests
+        self.limit = None # Requests per window, unknown until the first response
+        self.remaining = None # Requests remaining in the window
+        self.reset = None # Unix time when the window is reset
+        self.tokens = burst # Requests that can be sent right away
+        self.refilled_at = time.monotonic()
+        self.used = 0
+
+    def get_name(self):
+        # Tokens are never exposed, only their last characters.
+        if self.credentials is None:
+            return 'anonymous'
+
+        return '...' + self.credentials[1][-4:]
+
+    def refill(self, burst):
+        now = time.monotonic()
+
+        if self.reset is not None and time.time() >= self.reset:
+            # The window was reset, so the quota is unknown until the next response.
+            self.remaining = None
+            self.reset = None
+
+        if self.remaining is None:
+            self.tokens = burst
+        else:
+            window = max(self.reset - time.time(), 1)
+            self.tokens = min(burst, self.tokens + (now - self.refilled_at) * self.remaining / window)
+
+        self.refilled_at = now
+
+    def get_delay(self, reserve):
+        """Returns the number of seconds until a request can be sent with this token."""
+
+        if self.remaining is None:
+            return 0
+
+        if self.remaining <= reserve:
+            return max(self.reset - time.time(), 0) + 1
+
+        if self.tokens >= 1:
+            return 0
+
+        window = max(self.reset - time.time(), 1)
+
+        return (1 - self.tokens) * window / self.remaining
+
+class RateLimitScheduler:
+    def __init__(self, credentials=None, burst=50, reserve=1, max_wait=default_max_wait):
+        """Creates a scheduler for a pool of tokens.
+
+        Args:
+            credentials: List of (user, token) tuples. By default, requests
+                are made without authentication.
+            burst: Maximum number of requests sent at once with a token.
+            reserve: Number of requests of each token that are never used.
+            max_wait: Maximum number of seconds a request waits for the quota,
+                or None to wait until the rate limit is reset.
+        """
+
+        self.burst = burst
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.quotas = [TokenQuota(credential, burst) for credential in credentials or [None]]
+        self.condition = threading.Condition()
+        self.counters = {'requests': 0, 'waits': 0, 'wait_time': 0.0, 'max_wait_time': 0.0, 'rate_limited': 0}
+
+    def acquire(self, wait=True):
+        """Chooses the credentials of the next request, waiting for the quota if needed.
+
+        Args:
+            wait: If False, the credentials with the most remaining requests are
+                returned right away, without using the quota. It is meant for
+                requests that are not charged (e.g. raw file downloads).
+        Returns:
+            A (user, token) tuple, or None for an anonymous request.
+        Raises:
+            ConnectionError: If the quota would not be available within max_wait seconds.
+        """
+
+        start_time = time.monotonic()
+
+        with self.condition:
+            while True:
+                for quota in self.quotas:
+                    quota.refill(self.burst)
+
+                quota = min(self.quotas, key=lambda quota: (quota.get_delay(self.reserve), -(quota.remaining if quota.remaining is not None else float('inf'))))
+
+                if not wait:
+                    return quota.credentials
+
+                delay = quota.get_delay(self.reserve)
+                waited_time = time.monotonic() - start_time
+
+                if delay <= 0:
+                    quota.tokens -= 1
+                    quota.used += 1
+
+                    if quota.remaining is not None:
+                        quota.remaining -= 1
+
+                    self.counters['requests'] += 1
+
+                    if waited_time > 0.001:
+                        self.counters['waits'] += 1
+                        self.counters['wait_time'] += waited_time
+                        self.counters['max_wait_time'] = max(self.counters['max_wait_time'], waited_time)
+
+                    return quota.credentials
+
+                if self.max_wait is not None and waited_time + delay > self.max_wait:
+                    self.counters['rate_limited'] += 1
+                    minutes_remaining = int((waited_time + delay) / 60)
+                    raise ConnectionError("Sorry, our request limit for GitHub API is over. Wait " + str(minutes_remaining) + " minutes and try again.")
+
+                # Woken up earlier when a response updates the quota.
+                self.condition.wait(delay)
+
+    def update(self, credentials, headers):
+        """Updates the quota of a token with the rate limit headers of a response.
+
+        Returns:
+            True if the token has no remaining requests. Responses to other
+            credentials (e.g. of another scheduler) are ignored.
+        """
+
+        if 'X-RateLimit-Remaining' not in headers or 'X-RateLimit-Reset' not in headers:
+            return False
+
+        with self.condition:
+            quota = next((quota for quota in self.quotas if quota.credentials == credentials), None)
+
+            if quota is None:
+                return False
+
+            quota.remaining = int(headers.get('X-RateLimit-Remaining'))
+            quota.reset = int(headers.get('X-RateLimit-Reset'))
+
+            if 'X-RateLimit-Limit' in headers:
+                quota.limit = int(headers.get('X-RateLimit-Limit'))
+
+            self.condition.notify_all()
+
+            return quota.remaining <= 0
+
+    def stats(self):
+        """Returns the number of requests, the time spent waiting and the quota of each token."""
+
+        with self.condition:
+            tokens = [{'token': quota.get_name(),
+                       'limit': quota.limit,
+                       'remaining': quota.remaining,
+                       'reset': quota.reset,
+                       'used': quota.used} for quota in self.quotas]
+
+            return dict(self.counters, tokens=tokens)
+
+def get_credentials():
+    """Returns the credentials of the tokens set in GITHUB_TOKENS and GITHUB_TOKEN."""
+
+    tokens = [token.strip() for token in os.getenv('GITHUB_TOKENS', '').split(',') if token.strip()]
+
+    if os.getenv('GITHUB_TOKEN'):
+        tokens.append(os.getenv('GITHUB_TOKEN'))
+
+    return [(os.getenv('GITHUB_USER'), token) for token in dict.fromkeys(tokens)] or [None]
+
+def get_max_wait():
+    """Returns the maximum number of seconds set in GITHUB_RATE_LIMIT_MAX_WAIT, or None if it is 'none'."""
+
+    max_wait = os.getenv('GITHUB_RATE_LIMIT_MAX_WAIT') or str(default_max_wait)
+
+    if max_wait.lower() == 'none':
+        return None
+
+    return float(max_wait)
+
+def wait_for_rate_limit_reset():
+    """Makes the requests of a batch job wait until the rate limit is reset, instead of failing after a few seconds.
+
+    It must be called before the first request, and has no effect if
+    GITHUB_RATE_LIMIT_MAX_WAIT is set. The environment is used, so the
+    processes started by the job inherit the setting.
+    """
+
+    if not os.getenv('GITHUB_RATE_LIMIT_MAX_WAIT'):
+        os.environ['GITHUB_RATE_LIMIT_MAX_WAIT'] = 'none'
+
+@lru_cache(maxsize=None)
+def get_rate_limit_scheduler():
+    """Returns the scheduler shared by every request of the process."""
+
+    return RateLimitScheduler(get_credentials(),
+                              burst=int(os.getenv('GITHUB_RATE_LIMIT_BURST', 50)),
+                              max_wait=get_max_wait())
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""In-memory caches of classification results.
+
+ResultCache stores the results of whole CONTRIBUTING files: when a file
+has not changed, its paragraphs and predictions are reused, skipping the
+markdown conversion, the feature extraction and the prediction. Entries
+are keyed by a SHA-256 digest of the raw file and by a version string of
+the models (see classify_content.get_models_version), so results computed
+with other artifacts are never returned. Whenever the version changes, the
+cache is emptied.
+
+Entries are stored compressed: the paragraphs and the index of the
+predicted category of each one are serialized as JSON and compressed with
+zlib. The cache keeps at most CONTRIBUTING_RESULT_CACHE_SIZE entries (256
+by default, 0 disables the cache), evicting the least recently used ones,
+and entries expire after CONTRIBUTING_RESULT_CACHE_TTL seconds if it is set.
+
+ParagraphCache stores the predictions of individual paragraphs, so the
+paragraphs that many files share (codes of conduct, licensing notices,
+pull request instructions) are only classified once. Only the paragraphs
+that are not cached are converted into features, in a single batch.
+"""
+
+import os
+import json
+import zlib
+import hashlib
+import threading
+import numpy
+from functools import lru_cache
+from cachetools import LFUCache, LRUCache, TTLCache
+
+class ResultCache:
+    def __init__(self, maxsize=256, ttl=None):
+        """Creates an empty cache.
+
+        Args:
+            maxsize: Maximum number of files kept in the cache.
+            ttl: Optional number of seconds after which an entry expires.
+        """
+
+        self.entries = TTLCache(maxsize, ttl) if ttl else LRUCache(maxsize)
+        self.version = None
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get_key(self, contributing_file, version):
+        return hashlib.sha256(contributing_file.encode('utf-8')).hexdigest() + ':' + version
+
+    def check_version(self, version):
+        # Must be called with the lock held.
+        if version != self.version:
+            if self.version is not None:
+                self.entries.clear()
+                self.counters['invalidations'] += 1
+            self.version = version
+
+    def get(self, contributing_file, version):
+        """Returns the cached paragraphs and predictions of a file, or None."""
+
+        key = self.get_key(contributing_file, version)
+
+        with self.lock:
+            self.check_version(version)
+            entry = self.entries.get(key)
+            self.counters['hits' if entry else 'misses'] += 1
+
+        if entry is None:
+            return None
+
+        categories, compressed_result = entry
+        paragraphs, category_indices = json.loads(zlib.decompress(compressed_result))
+
+        return paragraphs, categories[category_indices]
+
+    def store(self, contributing_file, version, paragraphs, predictions):
+        key = self.get_key(contributing_file, version)
+        categories, category_indices = numpy.unique(numpy.asarray(predictions), return_inverse=True)
+        compressed_result = zlib.compress(json.dumps([list(paragraphs), category_indices.tolist()]).encode('utf-8'))
+
+        with self.lock:
+            self.check_version(version)
+            self.entries[key] = (categories, compressed_result)
+
+    def stats(self):
+        with self.lock:
+            requests = self.counters['hits'] + self.counters['misses']
+
+            return dict(self.counters,
+                        hit_rate=self.counters['hits'] / requests if requests else 0,
+                        entries=len(self.entries))
+
+@lru_cache(maxsize=None)
+def get_result_cache():
+    """Returns the result cache shared by the process, or None if it is disabled."""
+
+    maxsize = int(os.getenv('CONTRIBUTING_RESULT_CACHE_SIZE', 256))
+    ttl = os.getenv('CONTRIBUTING_RESULT_CACHE_TTL')
+
+    if maxsize <= 0:
+        return None
+
+    return ResultCache(maxsize, float(ttl) if ttl else None)
+
+class ParagraphCache:
+    def __init__(self, maxsize=65536, policy='lru'):
+        """Creates an empty cache of predictions per paragraph.
+
+        Many CONTRIBUTING files share boilerplate paragraphs (e.g. the
+        Contributor Covenant, fork-and-branch instructions or CLA notices),
+        whose predictions can be reused across repositories.
+
+        Args:
+            maxsize: Maximum number of paragraphs kept in the cache.
+            policy: 'lru' evicts the least recently used paragraphs, 'lfu'
+                the least frequently used ones.
+        """
+
+        self.entries = LFUCache(maxsize) if policy == 'lfu' else LRUCache(maxsize)
+        self.version = None
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def normalize(self, paragraph):
+        # Leading and trailing whitespace does not change the features of a paragraph.
+        return paragraph.strip()
+
+    def check_version(self, version):
+        # Must be called with the lock held.
+        if version != self.version:
+            if self.version is not None:
+                self.entries.clear()
+                self.counters['invalidations'] += 1
+            self.version = version
+
+    def predict(self, paragraphs, version, predict):
+        """Predicts the category of each paragraph, reusing cached predictions.
+
+        Args:
+            paragraphs: List of strings.
+            version: Version of the models (see classify_content.get_models_version).
+            predict: Function that predicts the categories of a list of
+                paragraphs. It is called once, with the paragraphs that are not
+                in the cache (without duplicates).
+        Returns:
+            An array with one category per paragraph.
+        """
+
+        keys = [self.normalize(paragraph) for paragraph in paragraphs]
+
+        with self.lock:
+            self.check_version(version)
+            predictions = {key: self.entries[key] for key in set(keys) if key in self.entries}
+
+        missing_keys = list(dict.fromkeys(key for key in keys if key not in predictions))
+
+        if missing_keys:
+            predictions.update(zip(missing_keys, predict(missing_keys)))
+
+        with self.lock:
+            self.check_version(version)
+
+            for key in missing_keys:
+                self.entries[key] = predictions[key]
+
+            # Repeated paragraphs are classified once, so only the first occurrence is a miss.
+            self.counters['misses'] += len(missing_keys)
+            self.counters['hits'] += len(keys) - len(missing_keys)
+
+        return numpy.asarray([predictions[key] for key in keys])
+
+    def stats(self):
+        with self.lock:
+            requests = self.counters['hits'] + self.counters['misses']
+
+            return dict(self.counters,
+                        hit_rate=self.counters['hits'] / requests if requests else 0,
+                        entries=len(self.entries))
+
+@lru_cache(maxsize=None)
+def get_paragraph_cache():
+    """Returns the paragraph cache shared by the process, or None if it is disabled.
+
+    The cache keeps at most CONTRIBUTING_PARAGRAPH_CACHE_SIZE paragraphs
+    (65536 by default, 0 disables the cache), evicted according to
+    CONTRIBUTING_PARAGRAPH_CACHE_POLICY ('lru', the default, or 'lfu').
+    """
+
+    maxsize = int(os.getenv('CONTRIBUTING_PARAGRAPH_CACHE_SIZE', 65536))
+
+    if maxsize <= 0:
+        return None
+
+    return ParagraphCache(maxsize, os.getenv('CONTRIBUTING_PARAGRAPH_CACHE_POLICY', 'lru'))
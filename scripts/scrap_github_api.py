@@ -2,16 +2,140 @@
 # -*- coding: utf-8 -*-
 
 import os
+import json
+import hashlib
 import requests
-from datetime import datetime
+import threading
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
+from scripts.github_cache import get_github_cache
+from scripts.rate_limit import get_rate_limit_scheduler, get_credentials
+
+# Base URLs of GitHub, which can point to another server (e.g. benchmarks/github_stub.py).
+github_api_url = os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+github_raw_url = os.getenv('GITHUB_RAW_URL', 'https://raw.githubusercontent.com').rstrip('/')
+
+sessions = {} # HTTP sessions shared by the whole process, one per pool size and maximum wait
+sessions_lock = threading.Lock()
+
+default_cache = object() # Default of Create, which uses the cache of the process
+
+class RequestError(Exception):
+    """Raised when GitHub answers a request with an error status."""
+
+    def __init__(self, status_code):
+        super().__init__("Problem in connection with GitHub API (Status: " + str(status_code) + ").")
+        self.status_code = status_code
+
+class GitHubRetry(Retry):
+    """Retry policy of the requests to GitHub, whose waits are bounded by the rate limit scheduler.
+
+    GitHub answers 403 Forbidden with a Retry-After header when too many
+    requests are sent at once (its secondary rate limit), so these responses
+    are retried too. Neither the exponential backoff nor the Retry-After
+    header make a request wait longer than max_wait seconds, as in
+    scripts/rate_limit.py.
+    """
+
+    def __init__(self, max_wait=None, **kwargs):
+        super().__init__(**kwargs)
+        self.max_wait = max_wait
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.max_wait = self.max_wait
+
+        return retry
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 403 and has_retry_after and self.respect_retry_after_header:
+            return self._is_method_retryable(method)
+
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+
+        if retry_after is not None and self.max_wait is not None:
+            return min(retry_after, self.max_wait)
+
+        return retry_after
+
+def get_retry(max_wait):
+    """Returns the retry policy of the requests, given the maximum wait of the rate limit scheduler.
+
+    Batch jobs wait until the rate limit is reset (max_wait is None), so
+    their requests are retried up to 10 times and wait as long as GitHub
+    asks. The web application answers users interactively, so its requests
+    are only retried 3 times, and never wait longer than max_wait seconds
+    between two attempts.
+    """
+
+    if max_wait is None:
+        return GitHubRetry(total=10,
+                           backoff_factor=0.5,
+                           status_forcelist=(429, 500, 502, 503, 504),
+                           respect_retry_after_header=True,
+                           raise_on_status=False)
+
+    return GitHubRetry(max_wait=max_wait,
+                       total=3,
+                       backoff_factor=0.5,
+                       backoff_max=max_wait,
+                       status_forcelist=(429, 500, 502, 503, 504),
+                       respect_retry_after_header=True,
+                       raise_on_status=False)
+
+def get_session(pool_size=None):
+    """Returns a pooled HTTP session shared by every request of the process.
+
+    Connections are kept alive and reused across requests, so consecutive
+    calls to the GitHub API do not pay for a new TLS handshake. Failed
+    requests (connection errors, 429 and 5xx responses, and 403 responses of
+    the secondary rate limit) are retried with exponential backoff,
+    honouring the Retry-After header sent by GitHub (see get_retry).
+
+    Args:
+        pool_size: Maximum number of connections kept open per host. Defaults
+            to the environment variable GITHUB_POOL_SIZE, or 10.
+    Returns:
+        A requests.Session, which can be used concurrently by multiple threads.
+    """
+
+    pool_size = int(pool_size or os.getenv('GITHUB_POOL_SIZE', 10))
+    max_wait = get_rate_limit_scheduler().max_wait
+
+    with sessions_lock:
+        if (pool_size, max_wait) not in sessions:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=get_retry(max_wait))
+
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            sessions[pool_size, max_wait] = session
+
+        return sessions[pool_size, max_wait]
 
 class Create:
-    def __init__(self):
+    def __init__(self, pool_size=None, timeout=30, cache=default_cache):
         
         self.rate_limit_remaining = 0 # Number of requests remaining
         self.rate_limit_reset = None # Datetime when new requests will be available
+        self.session = get_session(pool_size) # Pooled session shared by all instances
+        self.timeout = timeout # Seconds to wait for the server before giving up
+        self.cache = get_github_cache() if cache is default_cache else cache # Persistent cache of responses (None to disable it)
+        self.scheduler = get_rate_limit_scheduler() # Rate limit shared by all instances
+        self.credentials_digest = hashlib.sha256(json.dumps(get_credentials()).encode('utf-8')).hexdigest()[:16] # Part of the cache keys
+
+    def get_cache_key(self, url, parameters):
+        """Returns the key of a response in the cache: its URL and a digest of the credentials of the process.
+
+        Responses fetched with a token may come from private repositories, and
+        the URLs they give are requested with the token, so they are only
+        reused by processes with the same credentials.
+        """
+
+        return requests.Request('GET', url, params=parameters).prepare().url + ' ' + self.credentials_digest
 
     def request(self, url, parameters={}, headers={}, file_type='json'):
         """Executes a request to GitHub API.
@@ -26,6 +150,10 @@ class Create:
             By default, it returns a JSON dictionary. If file_type='text' is 
             specified, then it returns a string.
         Note:
+            Responses are cached (see scripts/github_cache.py). Expired
+            responses are revalidated with conditional requests, which GitHub
+            answers with 304 Not Modified without charging the rate limit.
+
             To increase the number of possible requests to the GitHub API,
             we add access tokens to the header of our request using 
             environment variables.
@@ -33,50 +161,82 @@ class Create:
             Create your own access tokens following the tutorial below:
             https://developer.github.com/v3/auth/
             And use the environment variables GITHUB_USER and GITHUB_TOKEN
-            to store them in your operating system.
+            to store them in your operating system. A pool of tokens can be
+            given in GITHUB_TOKENS, separated by commas.
+
+            When the rate limit is exhausted, the request waits until it is
+            reset (see scripts/rate_limit.py).
         """
         
         try:
-            session = requests.Session()
-            session.auth = (os.getenv('GITHUB_USER'), os.getenv('GITHUB_TOKEN'))
-            retries = Retry(total = 10)
-            session.mount('https://', HTTPAdapter(max_retries=retries))
-            response = session.get(url, params=parameters, headers=headers)
-            self.verify_rate_limit(response.headers)
+            cache_key = self.get_cache_key(url, parameters)
+            cached_response = self.cache.get(cache_key) if self.cache else None
+
+            if cached_response and cached_response['fresh']:
+                self.cache.count('hits')
+                return self.parse_response(cached_response['body'], file_type)
+
+            headers = dict(headers)
+
+            if cached_response and cached_response['etag']:
+                headers['If-None-Match'] = cached_response['etag']
+            if cached_response and cached_response['last_modified']:
+                headers['If-Modified-Since'] = cached_response['last_modified']
+
+            # Only the requests to the API are charged, raw files are downloaded right away.
+            charged = url.startswith(github_api_url)
+
+            for _ in range(3):
+                # Credentials are given per request, the session is shared.
+                authentication = self.scheduler.acquire(wait=charged)
+                response = self.session.get(url, params=parameters, headers=headers, auth=authentication, timeout=self.timeout)
+                exhausted = self.verify_rate_limit(response.headers, authentication)
+
+                # The quota ran out while the request was in flight, so it is scheduled again.
+                if not (response.status_code in (403, 429) and exhausted):
+                    break
+
+            if response.status_code == 304 and cached_response:
+                self.cache.refresh(cache_key)
+                self.cache.count('revalidations')
+                return self.parse_response(cached_response['body'], file_type)
 
             if response.status_code != 200:
-                raise Exception("Problem in connection with GitHub API (Status: " + str(response.status_code) + ").")
+                raise RequestError(response.status_code)
+
+            if self.cache:
+                self.cache.store(cache_key, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                self.cache.count('misses')
 
-            if file_type == 'json':
-                return response.json()
-            if file_type == 'text':   
-                return response.text
+            return self.parse_response(response.text, file_type)
 
         except Exception as exception:
             raise(exception)
 
-    def verify_rate_limit(self, header):
-        """Guarantees that there is a limit of requests remaining to the GitHub API.
+    def parse_response(self, body, file_type):
+        if file_type == 'json':
+            return json.loads(body)
+        if file_type == 'text':
+            return body
+
+    def verify_rate_limit(self, header, authentication=None):
+        """Records the number of requests remaining to the GitHub API.
 
         The number of requests to the GitHub API is limited by GitHub, even with
-        authentication. This method verifies the number of requests remaining and
-        holds the process for thirty seconds until it receives the permission
-        to execute new requests.
+        authentication. The quota given in the header is shared with the
+        scheduler of the process, which holds the next requests until
+        GitHub gives the permission to execute new requests.
 
         Args:
             header: Dictionary representing the header of the last request made
                 in the GitHub API.
+            authentication: Credentials used in the last request.
+        Returns:
+            True if there are no requests remaining for these credentials.
         """
 
         if 'X-RateLimit-Remaining' in header and 'X-RateLimit-Reset' in header:
             self.rate_limit_remaining = int(header.get('X-RateLimit-Remaining'))
             self.rate_limit_reset = int(header.get('X-RateLimit-Reset'))
 
-            datetime_format = '%Y-%m-%d %H:%M:%S'
-            reset_time = datetime.fromtimestamp(self.rate_limit_reset).strftime(datetime_format)
-            current_time = datetime.now().strftime(datetime_format)
-            minutes_remaining = int((datetime.fromtimestamp(self.rate_limit_reset) - datetime.now()).total_seconds() / 60)
-
-            if self.rate_limit_remaining <= 1:
-                if reset_time >= current_time:
-                    raise ConnectionError("Sorry, our request limit for GitHub API is over. Wait " + str(minutes_remaining) +  " minutes and try again.")
+        return self.scheduler.update(authentication, header)
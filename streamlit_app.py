@@ -5,6 +5,7 @@ import streamlit as page
 from about_section import write_about_section
 from motivation_section import write_motivation_section
 from classifier_section import write_contributing_analysis
+import scripts.metrics as metrics
 
 page.set_page_config(
      page_title="contributing.streamlit.app",
@@ -80,6 +81,9 @@ page.markdown(
     unsafe_allow_html=True,
 )
 
+# Serves the metrics of the application if CONTRIBUTING_METRICS_PORT is set (once per process).
+metrics.start_metrics_exporter()
+
 #page.markdown('<p class="custom-page-header"><b>contributing.streamlit.app</b></p>', unsafe_allow_html=True)
 
 classifier, about, motivation = page.tabs(["Classifier", "Categories", "Motivation"])
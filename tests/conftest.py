@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Fixtures shared by the tests: the paragraphs of the CONTRIBUTING files in benchmarks/fixtures."""
+
+import os
+import pytest
+from scripts.get_contributing import iter_paragraphs
+from benchmarks.common import get_fixture_paths, read_fixture
+
+fixture_paths = get_fixture_paths()
+
+def get_paragraphs(path):
+    return [paragraph.text for paragraph in iter_paragraphs(read_fixture(path), 'lines')]
+
+@pytest.fixture(params=fixture_paths, ids=[os.path.basename(path) for path in fixture_paths])
+def paragraphs(request):
+    """The paragraphs (lines) of each fixture, one test per fixture."""
+
+    return get_paragraphs(request.param)
+
+@pytest.fixture(scope='session')
+def all_paragraphs():
+    """The paragraphs (lines) of every fixture, in a single list."""
+
+    return [paragraph for path in fixture_paths for paragraph in get_paragraphs(path)]
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Checks that the asynchronous client stops requesting GitHub only while the rate limit is exhausted."""
+
+import time
+import asyncio
+import pytest
+from scripts.async_github_api import AsyncGitHubClient
+
+class FakeGitHub:
+    """Fails like the rate limit scheduler while `exhausted` is set, and records the requests it receives."""
+
+    def __init__(self, seconds_to_reset):
+        self.scheduler = self
+        self.reset = time.time() + seconds_to_reset
+        self.exhausted = True
+        self.requests = 0
+
+    def request(self, url, parameters={}, headers={}, file_type='json'):
+        self.requests += 1
+
+        if self.exhausted:
+            raise ConnectionError("Sorry, our request limit for GitHub API is over.")
+
+        return 'Contributing.'
+
+    def stats(self):
+        return {'tokens': [{'reset': self.reset}]}
+
+@pytest.fixture
+def client():
+    client = AsyncGitHubClient(concurrency=2, github_api=FakeGitHub(seconds_to_reset=0.3))
+    yield client
+    client.close()
+
+def test_requests_fail_fast_until_the_rate_limit_is_reset(client):
+    async def request_twice():
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await client.request('https://api.github.com/repos/owner/name', file_type='text')
+
+        # The quota is reset.
+        await asyncio.sleep(0.4)
+        client.github_api.exhausted = False
+
+        return await client.request('https://api.github.com/repos/owner/name', file_type='text')
+
+    assert asyncio.run(request_twice()) == 'Contributing.'
+    assert client.github_api.requests == 2
+    assert client.rate_limit_error is None
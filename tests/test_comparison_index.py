@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Checks that the comparison index of the projects is only loaded when it is up to date."""
+
+import numpy
+import pytest
+from scripts.comparison_index import build_comparison_index, get_comparison_index, default_projects_path
+
+@pytest.fixture
+def comparison_index(monkeypatch, tmp_path):
+    index_path = str(tmp_path / 'projects_index.npz')
+    monkeypatch.setenv('CONTRIBUTING_COMPARISON_INDEX', index_path)
+    monkeypatch.setenv('CONTRIBUTING_PROJECTS', default_projects_path)
+    monkeypatch.delenv('CONTRIBUTING_PROJECTS_SEGMENTATION', raising=False)
+    get_comparison_index.cache_clear()
+    yield index_path
+    get_comparison_index.cache_clear()
+
+def test_up_to_date_indexes_are_loaded(comparison_index):
+    numpy.savez_compressed(comparison_index, **dict(build_comparison_index(), segmentation=numpy.array('blocks')))
+
+    assert get_comparison_index().segmentation == 'blocks'
+
+def test_indexes_without_segmentation_are_built_again(comparison_index):
+    arrays = build_comparison_index()
+    del arrays['segmentation']
+    numpy.savez_compressed(comparison_index, **arrays)
+
+    index = get_comparison_index()
+
+    assert index.segmentation == 'lines'
+    assert index.get_number_of_projects() == build_comparison_index()['sorted_values'].shape[1]
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Checks that the compiled classifier predicts the same categories as the reference pipeline."""
+
+import numpy
+from scripts import get_features
+from scripts.classify_content import get_classification_model, get_compiled_classifier
+from scripts.compiled_model import CompiledClassifier, get_source_hashes
+from scripts.artifacts import get_artifact_path
+
+def predict_reference(paragraphs):
+    return get_classification_model().predict(get_features.convert_paragraphs_into_features(paragraphs))
+
+def test_compiled_classifier_matches_reference(paragraphs):
+    # The compiled classifier, loaded from the bundled model.
+    assert numpy.array_equal(get_compiled_classifier().predict(paragraphs), predict_reference(paragraphs))
+
+def test_bundled_compiled_model_is_up_to_date():
+    # Otherwise, get_compiled_classifier silently compiles the pickles on every start.
+    bundled_classifier = CompiledClassifier.load(get_artifact_path('compiled_model.npz'))
+
+    assert bundled_classifier.source_hashes == get_source_hashes()
+
+def test_compiled_classifier_matches_compiled_artifacts(all_paragraphs):
+    compiled_classifier = CompiledClassifier.from_artifacts(get_features.get_tf_idf_vectorizer(),
+                                                            get_features.get_feature_selector(),
+                                                            get_classification_model())
+
+    assert numpy.array_equal(compiled_classifier.predict(all_paragraphs), get_compiled_classifier().predict(all_paragraphs))
+
+def test_saved_model_predicts_the_same(tmp_path, all_paragraphs):
+    path = str(tmp_path / 'compiled_model.npz')
+    get_compiled_classifier().save(path)
+
+    assert numpy.array_equal(CompiledClassifier.load(path).predict(all_paragraphs), get_compiled_classifier().predict(all_paragraphs))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Checks the history of CONTRIBUTING files: reading the revisions, and classifying them incrementally."""
+
+import subprocess
+import pytest
+import scripts.scrap_github_api as scraper
+import scripts.contributing_history as contributing_history
+from scripts.contributing_history import Revision, read_local_revisions, read_github_revisions, classify_revisions
+from scripts.classify_repositories import categories
+from scripts.get_contributing import iter_paragraphs
+from benchmarks.common import get_fixture_paths, read_fixture
+
+fixture_paths = get_fixture_paths()
+
+def git(repository, *arguments):
+    subprocess.run(['git', '-C', str(repository), '-c', 'user.name=Author', '-c', 'user.email=author@example.com'] + list(arguments),
+                   capture_output=True, check=True)
+
+def commit(repository, subject, files=None, removed=()):
+    for path, content in (files or {}).items():
+        (repository / path).parent.mkdir(parents=True, exist_ok=True)
+        (repository / path).write_text(content)
+        git(repository, 'add', path)
+
+    for path in removed:
+        git(repository, 'rm', '-q', path)
+
+    git(repository, 'commit', '-q', '--allow-empty', '-m', subject)
+
+@pytest.fixture
+def repository(tmp_path):
+    """A repository whose CONTRIBUTING file is added, edited, changed by a merge, moved and removed."""
+
+    repository = tmp_path / 'repository'
+    repository.mkdir()
+    git(repository, 'init', '-q', '-b', 'main')
+
+    commit(repository, 'Add', {'CONTRIBUTING.md': 'First version.\n'})
+    commit(repository, 'Unrelated', {'README.md': 'Read me.\n'})
+    commit(repository, 'Edit', {'CONTRIBUTING.md': 'Second version.\n'})
+
+    git(repository, 'checkout', '-q', '-b', 'side')
+    commit(repository, 'Side edit', {'CONTRIBUTING.md': 'Third version.\n'})
+    git(repository, 'checkout', '-q', 'main')
+    commit(repository, 'Main edit', {'README.md': 'Read me again.\n'})
+    git(repository, 'merge', '-q', '--no-ff', '-m', 'Merge side', 'side')
+
+    (repository / 'docs').mkdir()
+    git(repository, 'mv', 'CONTRIBUTING.md', 'docs/CONTRIBUTING.md')
+    commit(repository, 'Move')
+    commit(repository, 'Remove', removed=['docs/CONTRIBUTING.md'])
+
+    return repository
+
+def test_revisions_follow_the_file_github_shows(repository):
+    revisions = read_local_revisions(str(repository))
+
+    # Side branches are only seen through their merge, unrelated commits are skipped.
+    assert [(revision.subject, revision.path, revision.contributing_file) for revision in revisions] == [
+        ('Add', 'CONTRIBUTING.md', 'First version.\n'),
+        ('Edit', 'CONTRIBUTING.md', 'Second version.\n'),
+        ('Merge side', 'CONTRIBUTING.md', 'Third version.\n'),
+        ('Move', 'docs/CONTRIBUTING.md', 'Third version.\n'),
+        ('Remove', None, None)]
+
+def test_only_the_most_recent_revisions_are_read(repository):
+    revisions = read_local_revisions(str(repository), max_revisions=2)
+
+    assert [(revision.subject, revision.contributing_file) for revision in revisions] == [('Move', 'Third version.\n'), ('Remove', None)]
+
+class FakeGitHub:
+    """Lists two commits of CONTRIBUTING.md, and answers the download of the most recent one with the given status."""
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def request(self, url, parameters={}, headers={}, file_type='json'):
+        if url.endswith('/commits'):
+            return [{'sha': sha, 'commit': {'committer': {'date': date}, 'author': {'name': 'Author'}, 'message': subject}}
+                    for sha, date, subject in [('b', '2024-01-02T00:00:00Z', 'Remove'), ('a', '2024-01-01T00:00:00Z', 'Add')]]
+
+        if '/b/' in url:
+            raise scraper.RequestError(self.status_code)
+
+        return 'First version.\n'
+
+def test_missing_github_revisions_are_removals(monkeypatch):
+    monkeypatch.setattr(scraper, 'Create', lambda: FakeGitHub(404))
+    monkeypatch.setattr(contributing_history, 'find_contributing_path', lambda github_api, repository_url: 'CONTRIBUTING.md')
+
+    revisions = read_github_revisions('https://github.com/owner/name')
+
+    assert [(revision.subject, revision.path, revision.contributing_file) for revision in revisions] == [
+        ('Add', 'CONTRIBUTING.md', 'First version.\n'), ('Remove', None, None)]
+
+def test_failed_github_downloads_are_raised(monkeypatch):
+    monkeypatch.setattr(scraper, 'Create', lambda: FakeGitHub(500))
+    monkeypatch.setattr(contributing_history, 'find_contributing_path', lambda github_api, repository_url: 'CONTRIBUTING.md')
+
+    with pytest.raises(scraper.RequestError):
+        read_github_revisions('https://github.com/owner/name')
+
+def test_revisions_are_classified_as_separate_files():
+    # Paragraphs and chunks shared by the revisions are only converted and classified once.
+    first_file, second_file = read_fixture(fixture_paths[0]), read_fixture(fixture_paths[1])
+    edited_file = '\n\n'.join(first_file.split('\n\n')[1:])
+    contents = [first_file, edited_file, edited_file + '\n\n' + second_file, second_file, None]
+    revisions = [Revision(str(index), '', '', '', 'CONTRIBUTING.md' if content else None, content) for index, content in enumerate(contents)]
+
+    columns = ['# Paragraphs'] + categories + ['# Categories Identified']
+    results = classify_revisions(revisions)
+
+    for revision, result in zip(revisions, results):
+        expected = classify_revisions([revision])[0]
+
+        assert {column: result[column] for column in columns} == {column: expected[column] for column in columns}
+
+    assert results[0]['# Changed Paragraphs'] == results[0]['# Paragraphs']
+    assert results[-1]['# Paragraphs'] == 0
+
+@pytest.mark.parametrize('segmentation', ['lines', 'blocks'])
+def test_chunk_cache_matches_conversion(segmentation):
+    # The chunks shared by the revisions of a file are only converted once.
+    chunk_cache = {}
+
+    for _ in range(2):
+        for path in fixture_paths:
+            contributing_file = read_fixture(path)
+
+            assert list(iter_paragraphs(contributing_file, segmentation, chunk_cache)) == list(iter_paragraphs(contributing_file, segmentation))
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Checks that the fitted artifacts shared by the pipeline give the same results as deep copies of them.
+
+The reference implementation, which deep-copied the vectorizer and the
+selector for each file, is kept in benchmarks/shared_artifacts.py.
+
+Example:
+    python -m pytest tests/test_equivalence.py
+"""
+
+import numpy
+import pandas
+from concurrent.futures import ThreadPoolExecutor
+from scripts import get_features
+from benchmarks import shared_artifacts
+
+def test_shared_artifacts_match_deep_copies(paragraphs):
+    # The fitted vectorizer and selector are shared by the threads instead of being deep-copied.
+    vectorizer = get_features.get_tf_idf_vectorizer()
+    selector = get_features.get_feature_selector()
+    paragraphs = pandas.Series(paragraphs)
+
+    expected = shared_artifacts.transform(vectorizer, selector, paragraphs, deep_copy=True)
+    assert numpy.array_equal(expected, shared_artifacts.transform(vectorizer, selector, paragraphs, deep_copy=False))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = executor.map(lambda _: shared_artifacts.transform(vectorizer, selector, paragraphs, deep_copy=False), range(8))
+        assert all(numpy.array_equal(expected, result) for result in results)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Checks the conversion of CONTRIBUTING files into paragraphs."""
+
+import os
+import html
+import pytest
+from scripts.get_contributing import iter_paragraphs, convert_contributing_file, get_segmentation, word_pattern
+from benchmarks.common import get_fixture_paths, read_fixture
+from benchmarks.markdown_stream import convert_whole_document
+
+fixture_paths = get_fixture_paths()
+fixture_names = [os.path.basename(path) for path in fixture_paths]
+
+@pytest.mark.parametrize('copies', [1, 3])
+@pytest.mark.parametrize('path', fixture_paths, ids=fixture_names)
+def test_streaming_lines_match_whole_document(path, copies):
+    # The file is converted one chunk at a time, with the same result.
+    contributing_file = '\n\n'.join([read_fixture(path)] * copies)
+    lines = [line for line in convert_whole_document(contributing_file) if line.strip()]
+
+    assert [paragraph.text for paragraph in iter_paragraphs(contributing_file, 'lines')] == lines
+
+def test_paragraphs_record_their_lines():
+    contributing_file = '# Title\n\nA paragraph wrapped\ninto two lines.\n\n\n## Setup\n\n* An item\n* Another item\n'
+
+    assert list(iter_paragraphs(contributing_file, 'lines')) == [('Title', 1, 1, 1, 1), ('A paragraph wrapped', 3, 3, 3, 4),
+                                                                 ('into two lines.', 4, 4, 3, 4), ('Setup', 7, 7, 7, 10),
+                                                                 ('An item', 9, 9, 7, 10), ('Another item', 10, 10, 7, 10)]
+    assert list(iter_paragraphs(contributing_file, 'blocks')) == [('Title', 1, 1, 1, 1), ('A paragraph wrapped into two lines.', 3, 4, 3, 4),
+                                                                  ('Setup', 7, 10, 7, 10), ('An item', 7, 10, 7, 10), ('Another item', 7, 10, 7, 10)]
+
+@pytest.mark.parametrize('segmentation', ['lines', 'blocks'])
+def test_interleaved_files_keep_their_references(segmentation):
+    # The generators of a thread share its converter.
+    first_file = 'Some [text][g].\n\nMore [text][g].\n\nLast [text][g].\n\n[g]: https://example.com\n'
+    second_file = 'Other [words][h].\n\n[h]: https://example.org\n'
+
+    first_paragraphs = iter_paragraphs(first_file, segmentation)
+    first_paragraph = next(first_paragraphs)
+    second_paragraphs = list(iter_paragraphs(second_file, segmentation))
+
+    assert [first_paragraph.text] + [paragraph.text for paragraph in first_paragraphs] == ['Some text.', 'More text.', 'Last text.']
+    assert [paragraph.text for paragraph in second_paragraphs] == ['Other words.']
+
+@pytest.mark.parametrize('path', fixture_paths, ids=fixture_names)
+def test_lines_are_found_in_the_file(path):
+    contributing_file = read_fixture(path)
+    lines = contributing_file.replace('\r\n', '\n').split('\n')
+    words = lambda text: set(word_pattern.findall(html.unescape(text).lower()))
+    previous_line = 0
+
+    for paragraph in iter_paragraphs(contributing_file, 'lines'):
+        assert paragraph.chunk_start_line <= paragraph.start_line == paragraph.end_line <= paragraph.chunk_end_line
+        assert previous_line < paragraph.start_line
+        assert words(paragraph.text) <= words(lines[paragraph.start_line - 1])
+
+        previous_line = paragraph.start_line
+
+def test_lines_are_the_default_segmentation(monkeypatch):
+    # Blocks are opt-in, the model was trained on lines.
+    monkeypatch.delenv('CONTRIBUTING_SEGMENTATION', raising=False)
+
+    assert get_segmentation() == 'lines'
+
+    for path in fixture_paths:
+        contributing_file = read_fixture(path)
+
+        assert convert_contributing_file(contributing_file) == [paragraph.text for paragraph in iter_paragraphs(contributing_file, 'lines')]
+
+def test_unknown_segmentations_are_configuration_errors(monkeypatch):
+    # A TypeError would be shown as a missing CONTRIBUTING file by the web application.
+    monkeypatch.setenv('CONTRIBUTING_SEGMENTATION', 'sentences')
+
+    with pytest.raises(ValueError):
+        get_segmentation()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Checks the cache of GitHub responses: time-to-live, revalidation, eviction and privacy."""
+
+import os
+import stat
+import pytest
+import scripts.scrap_github_api as scraper
+from scripts.github_cache import ResponseCache, get_github_cache
+
+profile_url = scraper.github_api_url + '/repos/owner/name/community/profile'
+
+class FakeResponse:
+    def __init__(self, status_code, text='', headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+class FakeSession:
+    """Answers the requests of a client with the given responses, and records their headers."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, params=None, headers=None, auth=None, timeout=None):
+        self.requests.append(dict(headers or {}))
+
+        return self.responses.pop(0)
+
+def age(cache, seconds):
+    cache.connection.execute('UPDATE responses SET fetched_at = fetched_at - ?', (seconds,))
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / 'responses.sqlite'), ttl=60, max_size=100)
+
+@pytest.fixture
+def private_github_cache():
+    get_github_cache.cache_clear()
+    yield get_github_cache
+    get_github_cache.cache_clear()
+
+def test_responses_are_fresh_within_the_time_to_live(cache):
+    cache.store(profile_url, '{}', etag='"1"')
+
+    assert cache.get(profile_url) == {'body': '{}', 'etag': '"1"', 'last_modified': None, 'fresh': True}
+
+    age(cache, 61)
+
+    assert cache.get(profile_url)['fresh'] is False
+    assert cache.get(scraper.github_api_url + '/repos/owner/other/community/profile') is None
+
+def test_expired_responses_are_revalidated(cache):
+    client = scraper.Create(cache=cache)
+    client.session = FakeSession([FakeResponse(200, '{"files": {}}', {'ETag': '"1"'}), FakeResponse(304)])
+
+    assert client.request(profile_url) == {'files': {}}
+    assert client.request(profile_url) == {'files': {}}
+    assert len(client.session.requests) == 1
+
+    age(cache, 61)
+
+    assert client.request(profile_url) == {'files': {}}
+    assert client.session.requests[1]['If-None-Match'] == '"1"'
+    assert cache.get(client.get_cache_key(profile_url, {}))['fresh']
+    assert cache.stats()['hits'] == 1 and cache.stats()['revalidations'] == 1 and cache.stats()['misses'] == 1
+
+def test_changed_responses_replace_the_cached_ones(cache):
+    client = scraper.Create(cache=cache)
+    client.session = FakeSession([FakeResponse(200, 'old', {'ETag': '"1"'}), FakeResponse(200, 'new', {'ETag': '"2"'})])
+
+    assert client.request(profile_url, file_type='text') == 'old'
+    age(cache, 61)
+
+    assert client.request(profile_url, file_type='text') == 'new'
+    assert cache.get(client.get_cache_key(profile_url, {}))['etag'] == '"2"'
+
+def test_least_recently_used_responses_are_evicted(cache):
+    cache.store('a', 'a' * 40)
+    cache.store('b', 'b' * 40)
+    cache.connection.execute("UPDATE responses SET accessed_at = accessed_at - 10 WHERE url = 'a'")
+    cache.get('a')
+    cache.connection.execute("UPDATE responses SET accessed_at = accessed_at - 5 WHERE url = 'b'")
+
+    # 'b' is now the least recently used response.
+    cache.store('c', 'c' * 40)
+
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.get('b') is None
+    assert cache.stats()['evictions'] == 1 and cache.stats()['size'] == 80
+
+def test_responses_are_invalidated_per_repository(cache):
+    cache.store(profile_url + ' digest', '{}')
+    cache.store(scraper.github_api_url + '/repos/owner/other/contents/CONTRIBUTING.md digest', '{}')
+    cache.invalidate('Owner', 'Name')
+
+    assert cache.get(profile_url + ' digest') is None
+    assert cache.stats()['responses'] == 1
+
+def test_cache_keys_depend_on_the_credentials(monkeypatch, cache):
+    monkeypatch.delenv('GITHUB_TOKENS', raising=False)
+    monkeypatch.delenv('GITHUB_TOKEN', raising=False)
+    anonymous_key = scraper.Create(cache=cache).get_cache_key(profile_url, {})
+
+    monkeypatch.setenv('GITHUB_TOKEN', 'secret-token')
+    authenticated_key = scraper.Create(cache=cache).get_cache_key(profile_url, {})
+
+    assert anonymous_key != authenticated_key
+    assert 'secret-token' not in authenticated_key
+
+def test_cache_can_be_disabled_per_client(private_github_cache, monkeypatch, tmp_path):
+    monkeypatch.setenv('GITHUB_CACHE', str(tmp_path / 'cache' / 'responses.sqlite'))
+
+    assert scraper.Create().cache is not None
+    assert scraper.Create(cache=None).cache is None
+
+def test_default_cache_is_private(private_github_cache, monkeypatch, tmp_path):
+    monkeypatch.delenv('GITHUB_CACHE', raising=False)
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+
+    cache = private_github_cache()
+
+    assert cache.path == str(tmp_path / 'contributing-github' / 'responses.sqlite')
+    assert stat.S_IMODE(os.stat(tmp_path / 'contributing-github').st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(cache.path).st_mode) == 0o600
+
+def test_shared_directories_are_not_used(private_github_cache, monkeypatch, tmp_path):
+    shared_directory = tmp_path / 'shared'
+    shared_directory.mkdir()
+    shared_directory.chmod(0o777)
+    monkeypatch.setenv('GITHUB_CACHE', str(shared_directory / 'responses.sqlite'))
+
+    assert private_github_cache() is None
+
+def test_readable_databases_are_not_used(private_github_cache, monkeypatch, tmp_path):
+    path = tmp_path / 'responses.sqlite'
+    path.write_text('')
+    path.chmod(0o644)
+    tmp_path.chmod(0o700)
+    monkeypatch.setenv('GITHUB_CACHE', str(path))
+
+    assert private_github_cache() is None
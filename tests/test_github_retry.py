@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Checks the retry policy of the requests to GitHub: secondary rate limits, and waits bounded by the scheduler."""
+
+import time
+import threading
+import requests
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from requests.adapters import HTTPAdapter
+from scripts.scrap_github_api import get_retry
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+class SecondaryRateLimitHandler(BaseHTTPRequestHandler):
+    """Answers the first request with a secondary rate limit of one minute, and the next ones with 200 OK."""
+
+    def do_GET(self):
+        self.server.requests += 1
+
+        if self.server.requests == 1:
+            self.send_response(403)
+            self.send_header('Retry-After', '60')
+        else:
+            self.send_response(200)
+
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *arguments):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SecondaryRateLimitHandler)
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_secondary_rate_limits_are_retried():
+    retry = get_retry(5)
+
+    assert retry.is_retry('GET', 403, has_retry_after=True)
+    assert not retry.is_retry('GET', 403, has_retry_after=False)
+    assert retry.is_retry('GET', 429, has_retry_after=False)
+
+def test_web_waits_are_bounded_by_the_scheduler():
+    retry = get_retry(5)
+
+    assert retry.total == 3 and retry.backoff_max == 5
+    assert retry.get_retry_after(FakeResponse({'Retry-After': '60'})) == 5
+    assert retry.new(total=2).get_retry_after(FakeResponse({'Retry-After': '60'})) == 5
+
+def test_batch_jobs_wait_as_long_as_github_asks():
+    retry = get_retry(None)
+
+    assert retry.total == 10
+    assert retry.get_retry_after(FakeResponse({'Retry-After': '60'})) == 60
+
+def test_web_requests_retry_secondary_rate_limits_quickly(server):
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(max_retries=get_retry(0.1)))
+    start_time = time.monotonic()
+
+    response = session.get('http://127.0.0.1:{}/repos/owner/name'.format(server.server_port), timeout=5)
+
+    assert response.status_code == 200 and server.requests == 2
+    assert time.monotonic() - start_time < 5
@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Checks that the heavy dependencies are only imported on first use (see benchmarks/import_time.py)."""
+
+import pytest
+from benchmarks import import_time
+
+@pytest.mark.parametrize('module', ['scripts.get_features', 'scripts.classify_content', 'scripts.classify_repositories'])
+def test_heavy_modules_are_not_imported(module):
+    # spaCy, NLTK, scikit-learn and Plotly are imported in a fresh interpreter, if at all.
+    _, imported_heavy_modules = import_time.measure(module)
+
+    assert imported_heavy_modules == []
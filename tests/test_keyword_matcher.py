@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Checks that the keyword matcher creates the same heuristic features as the spaCy entity ruler."""
+
+import numpy
+import pytest
+from scripts.keyword_matcher import KeywordMatcher
+from scripts.get_features import get_keyword_matcher, get_heuristic_engine
+from benchmarks.keyword_matcher import create_spacy_features
+
+def test_keyword_matcher_matches_entity_ruler(all_paragraphs):
+    compiled_features = get_keyword_matcher().transform(all_paragraphs)
+
+    assert numpy.array_equal(compiled_features.toarray(), create_spacy_features(all_paragraphs))
+
+def test_overlapping_and_empty_paragraphs_match_entity_ruler():
+    paragraphs = ['', 'Pull requests and pull request reviews.', 'Open a pull request on GitHub, then open an issue.', '   ', '#', 'git']
+
+    assert numpy.array_equal(get_keyword_matcher().transform(paragraphs).toarray(), create_spacy_features(paragraphs))
+
+@pytest.mark.parametrize('patterns', [[{'label': 'CF', 'id': 'fork', 'pattern': [{'LEMMA': 'fork'}]}],
+                                      [{'label': 'CF', 'id': 'fork', 'pattern': [{'LOWER': 'fork'}]},
+                                       {'label': 'CF', 'id': 'clone', 'pattern': [{'TEXT': 'Fork'}]}]])
+def test_patterns_that_cannot_be_compiled_are_configuration_errors(patterns):
+    with pytest.raises(ValueError):
+        KeywordMatcher(patterns, ['fork', 'clone'])
+
+def test_unknown_heuristic_engines_are_configuration_errors(monkeypatch):
+    monkeypatch.setenv('CONTRIBUTING_HEURISTICS', 'regex')
+
+    with pytest.raises(ValueError):
+        get_heuristic_engine()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Checks the scheduling of the requests to the GitHub API within its rate limit."""
+
+import time
+import threading
+import pytest
+from scripts.rate_limit import RateLimitScheduler
+
+first_token = ('user', 'first-token')
+second_token = ('user', 'second-token')
+
+def get_headers(remaining, seconds_to_reset=3600):
+    return {'X-RateLimit-Remaining': str(remaining), 'X-RateLimit-Reset': str(int(time.time() + seconds_to_reset)), 'X-RateLimit-Limit': '5000'}
+
+def test_tokens_are_refilled_until_the_reset():
+    scheduler = RateLimitScheduler([first_token], burst=2, max_wait=None)
+    scheduler.update(first_token, get_headers(100, seconds_to_reset=100))
+    quota = scheduler.quotas[0]
+
+    assert scheduler.acquire() == first_token and scheduler.acquire() == first_token
+    assert quota.tokens < 0.1 and quota.remaining == 98
+
+    # The remaining requests are spread over the window: about one per second.
+    assert 0.5 < quota.get_delay(scheduler.reserve) <= 1.1
+
+    quota.refilled_at -= 1.5
+    quota.refill(scheduler.burst)
+
+    assert 1.4 < quota.tokens < 1.6 and quota.get_delay(scheduler.reserve) == 0
+
+    quota.refilled_at -= 10
+    quota.refill(scheduler.burst)
+
+    assert quota.tokens == scheduler.burst
+
+def test_requests_wait_for_an_exhausted_token():
+    scheduler = RateLimitScheduler([first_token], max_wait=None)
+    scheduler.update(first_token, get_headers(0))
+
+    # A response with the new quota wakes up the waiting request.
+    threading.Timer(0.2, scheduler.update, (first_token, get_headers(100))).start()
+    start_time = time.monotonic()
+
+    assert scheduler.acquire() == first_token
+    assert 0.1 < time.monotonic() - start_time < 5
+    assert scheduler.stats()['waits'] == 1
+
+def test_requests_fail_when_the_wait_is_too_long():
+    scheduler = RateLimitScheduler([first_token], max_wait=1)
+    scheduler.update(first_token, get_headers(0))
+
+    with pytest.raises(ConnectionError):
+        scheduler.acquire()
+
+    assert scheduler.stats()['rate_limited'] == 1
+
+    # Requests that are not charged are still sent.
+    assert scheduler.acquire(wait=False) == first_token
+
+def test_tokens_with_more_remaining_requests_are_chosen():
+    scheduler = RateLimitScheduler([first_token, second_token], max_wait=0)
+    scheduler.update(first_token, get_headers(10))
+    scheduler.update(second_token, get_headers(500))
+
+    assert scheduler.acquire() == second_token
+
+    assert scheduler.update(second_token, get_headers(0))
+    assert scheduler.acquire() == first_token
+
+def test_responses_to_unknown_credentials_are_ignored():
+    scheduler = RateLimitScheduler([first_token])
+
+    assert not scheduler.update(('user', 'other-token'), get_headers(0))
+    assert scheduler.quotas[0].remaining is None
+    assert scheduler.acquire() == first_token
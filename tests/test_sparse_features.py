@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Checks that the sparse feature pipeline predicts the same categories as the dense one (see benchmarks/sparse_features.py)."""
+
+import numpy
+from scripts import get_features
+from scripts.classify_content import get_classification_model
+from benchmarks import sparse_features
+
+def test_sparse_features_match_dense(paragraphs):
+    sparse_predictions = get_classification_model().predict(get_features.convert_paragraphs_into_features(paragraphs))
+
+    assert numpy.array_equal(sparse_features.predict_dense(paragraphs), sparse_predictions)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Checks that the fused text preprocessing gives the same text as applying each technique separately."""
+
+import pandas
+import pytest
+from scripts.get_features import text_preprocessing
+from benchmarks.text_preprocessing import text_preprocessing_per_technique
+
+@pytest.mark.parametrize('techniques', [
+    ['lowercase'],
+    ['remove-punctuations'],
+    ['stemming'],
+    ['lowercase', 'remove-punctuations', 'stemming'],
+    ['remove-stopwords', 'lemmatization'],
+    ['lowercase', 'remove-punctuations', 'remove-stopwords', 'stemming', 'lemmatization'],
+])
+def test_fused_text_preprocessing_matches_per_technique(all_paragraphs, techniques):
+    import nltk
+
+    # The corpora are not downloaded by the tests.
+    for technique, corpus in [('remove-stopwords', 'stopwords'), ('lemmatization', 'wordnet')]:
+        if technique in techniques:
+            try:
+                nltk.data.find('corpora/' + corpus)
+            except LookupError:
+                pytest.skip('the NLTK corpus ' + corpus + ' is not available')
+
+    X = pandas.Series(all_paragraphs)
+
+    assert text_preprocessing_per_technique(X, techniques).equals(text_preprocessing(X, techniques))
+
+def test_missing_paragraphs_are_dropped():
+    X = pandas.Series(['First paragraph.', None, 'Second paragraph.'])
+
+    assert text_preprocessing(X, ['lowercase']).tolist() == ['first paragraph.', 'second paragraph.']